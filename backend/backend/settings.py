@@ -90,8 +90,12 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "backend.middleware.ErrorHandlingMiddleware",   # Custom Middleware for API Error Handling
+    "utils.middleware.DecryptionCacheMiddleware",   # Only active with DECRYPTION_REQUEST_CACHE
 ]
 
+# Decrypt each encrypted student field at most once per request
+DECRYPTION_REQUEST_CACHE = os.getenv('DECRYPTION_REQUEST_CACHE', 'False') == 'True'
+
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
 # URL routing configuration
@@ -175,13 +179,18 @@ REST_FRAMEWORK = {
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
-    )
+    ),
+    # Opt-in: lists are paginated only when the client sends page_size or cursor
+    'DEFAULT_PAGINATION_CLASS': 'utils.pagination.OptInCursorPagination',
 }
 
 # Media file settings (for file uploads like profile pics, documents, etc.)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Upper bound, in characters, on each chunk of lesson text streamed to the LLM during adaptation
+LESSON_CHUNK_CHARS = int(os.getenv('LESSON_CHUNK_CHARS', '16000'))
+
 # Channels (WebSocket) settings using Redis
 ASGI_APPLICATION = 'backend.asgi.application'
 CHANNEL_LAYERS = {
@@ -9,14 +9,16 @@ from rest_framework import serializers
 from .models import Classes
 from students.models import Student
 from students.serializers import StudentSerializer
+from utils.serializers import SparseFieldsetsMixin
 
-class ClassSerializer(serializers.ModelSerializer):
+class ClassSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     """
     Serializer for the Classes model.
 
     Includes nested serialization of related students using StudentSerializer.
     The students field is read-only and returns a list of serialized students
-    enrolled in the class.
+    enrolled in the class. Reads may trim it with ?fields=, e.g.
+    fields=id,class_name or fields=id,students.first_name.
     """
     students = StudentSerializer(many=True, read_only=True)
 
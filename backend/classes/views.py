@@ -9,8 +9,6 @@ Provides endpoints to:
 - Update and delete classes
 """
 
-import csv
-import io
 from rest_framework.decorators import api_view, parser_classes, authentication_classes
 from django.views.decorators.csrf import csrf_exempt
 from django.http import HttpResponse
@@ -23,8 +21,11 @@ from django.utils.decorators import method_decorator
 from rest_framework import status
 from .models import Classes
 from students.models import Student
+from students.services.roster_import import RosterImportError, import_roster
 from teachers.models import Teacher
 from .serializers import ClassSerializer
+from utils.pagination import paginated_response
+from utils.serializers import requested_fields
 
 
 # Create class object
@@ -60,15 +61,28 @@ def create_class(request):
 def get_all_classes(request):
     """
     Retrieve a list of all classes for the authenticated teacher.
+
+    Query params (all optional):
+        year_level: Only classes of this year level.
+        page_size, cursor, ordering: Opt-in cursor pagination (see utils.pagination);
+            ordering may be class_name, year_level or pk.
+        fields: Sparse fieldset (see utils.serializers), e.g. id,class_name.
     """
     try:
         # Get the teacher linked to the current user
         teacher = Teacher.objects.get(user=request.user)
 
-        # Filter only their classes
+        # Filter only their classes; enrolled students, if returned, are fetched in one query
         classes = Classes.objects.filter(teacher=teacher)
-        serializer = ClassSerializer(classes, many=True)
-        return Response(serializer.data)
+        wanted = requested_fields(request)
+        if wanted is None or 'students' in wanted:
+            classes = classes.prefetch_related('students')
+        year_level = request.query_params.get('year_level')
+        if year_level is not None:
+            classes = classes.filter(year_level=year_level)
+
+        return paginated_response(request, classes, ClassSerializer,
+                                  ordering_fields=('class_name', 'year_level', 'pk'))
 
     except Teacher.DoesNotExist:
         return Response(
@@ -104,6 +118,9 @@ def add_student_to_class(request, class_id):
 def upload_students_csv(request):
     """
     Upload a CSV file to add multiple students to a class.
+
+    Rows are imported in bulk by students.services.roster_import; invalid rows are skipped
+    and listed under "errors".
     """
     if request.method == 'GET':
         return HttpResponse(
@@ -128,39 +145,16 @@ def upload_students_csv(request):
         return Response({"error": "CSV file is required"}, status=400)
 
     try:
-        decoded_file = csv_file.read().decode("utf-8")
-        io_string = io.StringIO(decoded_file)
-        reader = csv.DictReader(io_string)
-
-        added_to_class = []
-        already_in_class = []
-
-        for row in reader:
-            email = row.get("student_email", "").strip().lower()
-            student, created = Student.objects.get_or_create(
-                student_email=email,
-                defaults={
-                    "first_name": row.get("first_name", ""),
-                    "last_name": row.get("last_name", ""),
-                    "year_level": row.get("year_level", None),
-                    "disability_info": row.get("disability_info", "")
-                }
-            )
-
-            if not class_obj.students.filter(id=student.id).exists():
-                class_obj.students.add(student)
-                added_to_class.append(email)
-            else:
-                already_in_class.append(email)
-
-        return Response({
-            "message": "Upload completed",
-            "added_to_class": added_to_class,
-            "already_in_class": already_in_class
-        }, status=201)
-
-    except Exception as e:
-        return Response({"error": str(e)}, status=500)
+        result = import_roster(csv_file, class_obj)
+    except RosterImportError as e:
+        return Response({"error": str(e)}, status=400)
+
+    return Response({
+        "message": "Upload completed",
+        "added_to_class": result.added,
+        "already_in_class": result.already_in_class,
+        "errors": result.errors,
+    }, status=201)
 
 
 @api_view(["PUT", "DELETE"])
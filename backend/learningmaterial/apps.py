@@ -9,3 +9,9 @@ class LearningmaterialConfig(AppConfig):
     # Default app config for managing learning material-related features
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'learningmaterial'
+
+    def ready(self):
+        """
+        Imports the signal handlers so files on disk are cleaned up with their material or lesson.
+        """
+        import learningmaterial.signals
@@ -0,0 +1,3 @@
+"""
+Benchmarks and generated document corpora for the learningmaterial services.
+"""
@@ -0,0 +1,121 @@
+"""
+Generators for synthetic lesson documents used by the extraction benchmarks.
+
+Documents are built locally with the same libraries the services use, so benchmarks run
+offline and produce the same corpus on every machine.
+"""
+
+import io
+import os
+
+import fitz
+from docx import Document
+from docx.shared import Inches
+from pptx import Presentation
+from pptx.util import Inches as PptxInches
+
+LOREM = (
+    "Photosynthesis converts light energy into chemical energy stored in glucose. "
+    "Chlorophyll in the chloroplasts absorbs mostly red and blue light. "
+)
+
+
+def make_image_bytes(seed, size=64):
+    """
+    Return PNG bytes for a small gradient image that is unique per seed.
+    """
+    pix = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, size, size), 0)
+    for x in range(size):
+        for y in range(0, size, 8):
+            pix.set_pixel(x, y, ((seed * 37) % 256, (x * 4) % 256, (y * 4) % 256))
+    return pix.tobytes("png")
+
+
+def generate_pdf(path, pages=50, paragraphs_per_page=12, images_per_page=1, shared_logo=True):
+    """
+    Build a PDF with headings, body text and embedded images on every page.
+
+    Args:
+        path (str): Output file path.
+        pages (int): Number of pages.
+        paragraphs_per_page (int): Body paragraphs written under each page heading.
+        images_per_page (int): Distinct images inserted on each page.
+        shared_logo (bool): Also place one logo (a single xref) on every page.
+
+    Returns:
+        str: The output path.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    logo = make_image_bytes(0, size=32)
+    with fitz.open() as doc:
+        logo_xref = 0
+        for page_number in range(pages):
+            page = doc.new_page()
+            page.insert_text((72, 60), f"Section {page_number + 1}", fontsize=16)
+            y = 90
+            for paragraph in range(paragraphs_per_page):
+                page.insert_text((72, y), f"{paragraph + 1}. {LOREM[:90]}", fontsize=9)
+                y += 14
+            for index in range(images_per_page):
+                rect = fitz.Rect(72 + index * 90, y + 10, 152 + index * 90, y + 90)
+                page.insert_image(rect, stream=make_image_bytes(page_number * 100 + index + 1))
+            if shared_logo:
+                logo_xref = page.insert_image(fitz.Rect(500, 20, 540, 60), stream=logo, xref=logo_xref)
+        doc.save(path)
+    return path
+
+
+def generate_docx(path, sections=50, paragraphs_per_section=12, images_per_section=1):
+    """
+    Build a DOCX with a heading, body paragraphs and inline images per section.
+
+    Args:
+        path (str): Output file path.
+        sections (int): Number of Heading 1 sections.
+        paragraphs_per_section (int): Body paragraphs written under each heading.
+        images_per_section (int): Distinct images inserted in each section.
+
+    Returns:
+        str: The output path.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    doc = Document()
+    for section in range(sections):
+        doc.add_heading(f"Section {section + 1}", level=1)
+        for paragraph in range(paragraphs_per_section):
+            doc.add_paragraph(f"{paragraph + 1}. {LOREM}")
+        for index in range(images_per_section):
+            doc.add_picture(io.BytesIO(make_image_bytes(section * 100 + index + 1)), width=Inches(1))
+    doc.save(path)
+    return path
+
+
+def generate_pptx(path, slides=50, bullets_per_slide=6, images_per_slide=1):
+    """
+    Build a PPTX with a title, bullet body and pictures on every slide.
+
+    Args:
+        path (str): Output file path.
+        slides (int): Number of slides.
+        bullets_per_slide (int): Body paragraphs in each slide's content placeholder.
+        images_per_slide (int): Distinct pictures placed on each slide.
+
+    Returns:
+        str: The output path.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    prs = Presentation()
+    layout = prs.slide_layouts[1]  # Title and Content
+    for number in range(slides):
+        slide = prs.slides.add_slide(layout)
+        slide.shapes.title.text = f"Slide {number + 1}"
+        body = slide.placeholders[1].text_frame
+        body.text = LOREM[:80]
+        for bullet in range(1, bullets_per_slide):
+            body.add_paragraph().text = f"{bullet + 1}. {LOREM[:80]}"
+        for index in range(images_per_slide):
+            slide.shapes.add_picture(
+                io.BytesIO(make_image_bytes(number * 100 + index + 1)),
+                PptxInches(1 + index * 1.5), PptxInches(5.5), width=PptxInches(1))
+    prs.save(path)
+    return path
@@ -0,0 +1,261 @@
+"""
+Timed, memory-tracked benchmarks for the learningmaterial extractors and renderers.
+
+run_suite builds a corpus with corpus.py and times every extractor and renderer: PDFs
+serially and across the parallel page-range pool, DOCX/PPTX with both the object-model and
+zip/XML engines, each in every extraction mode, and every output format. Variants of the
+same extraction must produce identical output; any that do not are listed as mismatches.
+
+Each benchmark also gets two untimed, instrumented runs:
+
+- one under tracemalloc, for the peak Python heap ('peak_kib');
+- one in a fresh spawned process, for the peak resident memory it added ('rss_kib') and
+  the largest resident size reached by a process it started ('child_rss_kib'), e.g. a PDF
+  page-range worker or the image sandbox. tracemalloc cannot see the native allocations
+  of MuPDF, PIL or lxml; the kernel's resident counters (VmHWM, and ru_maxrss for
+  children) can.
+
+Results are plain dicts so they can be saved as JSON baselines and compared against later
+runs with compare_results.
+"""
+
+import json
+import multiprocessing
+import os
+import platform
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+from django.conf import settings
+from django.test import override_settings
+
+from learningmaterial.benchmarks.corpus import generate_docx, generate_pdf, generate_pptx
+from learningmaterial.services import file_extractors
+from learningmaterial.services.file_creators import (
+    create_docx_from_text, create_pdf_from_text, create_pptx_from_text
+)
+from learningmaterial.services.image_store import ImageStore
+
+# Default allowed slowdown / memory growth before a benchmark counts as a regression
+REGRESSION_THRESHOLD = 0.2
+
+# Resident memory differences below this many KiB are treated as noise
+RSS_NOISE_KIB = 1024
+
+_MEMORY_KEYS = ("peak_kib", "rss_kib", "child_rss_kib")
+
+
+def _memory_status():
+    """
+    Return this process's current and peak resident size in KiB, from /proc/self/status.
+
+    ru_maxrss is no use for the process itself: Linux carries it over from the process that
+    was exec'ed, so a spawned process reports at least its parent's size.
+    """
+    with open("/proc/self/status") as f:
+        fields = dict(line.split(":", 1) for line in f)
+    return int(fields["VmRSS"].split()[0]), int(fields["VmHWM"].split()[0])
+
+
+def _resident_run(media_root, fn, args, kwargs):
+    """
+    Process pool worker: run one benchmark call and return (peak resident growth, largest
+    child process peak resident size), in KiB.
+    """
+    with override_settings(MEDIA_ROOT=media_root):
+        try:
+            # Reset the peak so start-up imports do not hide the call's own
+            with open("/proc/self/clear_refs", "w") as f:
+                f.write("5")
+        except OSError:
+            pass
+        before, _ = _memory_status()
+        fn(*args, **kwargs)
+        _, peak = _memory_status()
+        # Workers only count towards RUSAGE_CHILDREN once they have exited
+        file_extractors.shutdown_pdf_pool()
+        children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(peak - before, 0), children
+
+
+def _measure(call, repeat):
+    """
+    Return (best seconds over `repeat` runs, output of the last run, memory dict).
+
+    Timing runs are not instrumented, since tracemalloc slows allocation-heavy code down.
+    """
+    fn, args, kwargs = call
+    best, output = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = fn(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        fn(*args, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    memory = {"peak_kib": round(peak / 1024, 1)}
+
+    # Resident memory is read from /proc, so it is only recorded on Linux
+    if resource is not None and os.path.exists("/proc/self/status"):
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            own, children = pool.submit(_resident_run, settings.MEDIA_ROOT, fn, args, kwargs).result()
+        memory.update(rss_kib=own, child_rss_kib=children)
+    return best, output, memory
+
+
+def _build_corpus(directory, scale, images):
+    """
+    Generate one document of each supported type with `scale` pages/sections/slides.
+    """
+    return {
+        'pdf': generate_pdf(os.path.join(directory, "corpus.pdf"), pages=scale, images_per_page=images),
+        'docx': generate_docx(os.path.join(directory, "corpus.docx"), sections=scale, images_per_section=images),
+        'pptx': generate_pptx(os.path.join(directory, "corpus.pptx"), slides=scale, images_per_slide=images),
+    }
+
+
+def _benchmarks(corpus, directory):
+    """
+    Yield (name, (fn, args, kwargs), reference) for every extractor and renderer benchmark.
+
+    reference names the benchmark whose output this one must match, or is None. Calls are
+    picklable so they can also run in a fresh process.
+    """
+    # One store for every extraction, so variants resolve images to the same paths
+    store = ImageStore(os.path.join(directory, "images"))
+    modes = (file_extractors.MODE_TEXT, file_extractors.MODE_FULL)
+    for mode in modes:
+        serial = f"extract.pdf.{mode}.serial"
+        yield serial, (file_extractors.extract_text_from_pdf, (corpus['pdf'], store, mode), {'parallel': False}), None
+        yield f"extract.pdf.{mode}.parallel", (
+            file_extractors.extract_text_from_pdf, (corpus['pdf'], store, mode), {'parallel': True}), serial
+
+    office = {'docx': file_extractors.extract_text_from_docx, 'pptx': file_extractors.extract_text_from_pptx}
+    for file_type, extract in office.items():
+        for mode in modes:
+            reference = f"extract.{file_type}.{mode}.object"
+            yield reference, (extract, (corpus[file_type], store, mode, file_extractors.ENGINE_OBJECT), {}), None
+            yield f"extract.{file_type}.{mode}.xml", (
+                extract, (corpus[file_type], store, mode, file_extractors.ENGINE_XML), {}), reference
+
+    # Renderers get the full extraction of the matching source document as input
+    pdf_text, pdf_slides = file_extractors.extract_content(corpus['pdf'], store)
+    docx_text, docx_slides = file_extractors.extract_content(corpus['docx'], store)
+    _, pptx_slides = file_extractors.extract_content(corpus['pptx'], store)
+    slide_pairs = [(s['title'], s['content'], s['images']) for s in pptx_slides]
+    out = os.path.join(directory, "out")
+    os.makedirs(out, exist_ok=True)
+
+    yield "render.pdf", (create_pdf_from_text, (pdf_text, os.path.join(out, "render.pdf")),
+                         {'images': pdf_slides[0]['images']}), None
+    yield "render.docx", (create_docx_from_text, (docx_text, os.path.join(out, "render.docx")),
+                          {'images': docx_slides[0]['images']}), None
+    yield "render.pptx", (create_pptx_from_text, (slide_pairs, os.path.join(out, "render.pptx")), {}), None
+
+
+def run_suite(directory, scale=20, images=1, repeat=3, only=None):
+    """
+    Build a corpus in `directory` and run every benchmark on it.
+
+    Args:
+        directory (str): Scratch directory for the corpus, image store and rendered files.
+        scale (int): Pages (PDF), sections (DOCX) or slides (PPTX) per document.
+        images (int): Images per page/section/slide.
+        repeat (int): Timed runs per benchmark; the best time is kept.
+        only (list, optional): Name prefixes to restrict the run to, e.g. ["extract.pdf"].
+
+    Returns:
+        dict: {"meta": {...}, "results": {name: {"seconds", "peak_kib", "rss_kib",
+            "child_rss_kib"}}, "mismatches": [name, ...]}
+    """
+    corpus = _build_corpus(directory, scale, images)
+    results, outputs, mismatches = {}, {}, []
+    for name, call, reference in _benchmarks(corpus, directory):
+        if only and not any(name.startswith(prefix) for prefix in only):
+            continue
+        seconds, outputs[name], memory = _measure(call, repeat)
+        results[name] = {"seconds": round(seconds, 6), **memory}
+        if reference in outputs and outputs[reference] != outputs[name]:
+            mismatches.append(name)
+
+    return {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "pdf_workers": file_extractors.PDF_WORKERS,
+            "scale": scale,
+            "images": images,
+            "repeat": repeat,
+        },
+        "results": results,
+        "mismatches": mismatches,
+    }
+
+
+def save_results(results, path):
+    """
+    Write suite results to a JSON baseline file.
+    """
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+
+
+def load_results(path):
+    """
+    Read suite results from a JSON baseline file.
+    """
+    with open(path) as f:
+        return json.load(f)
+
+
+def _ratio(now, before, noise=0):
+    """
+    Return now / before, or 1.0 when there is no baseline or the difference is noise.
+    """
+    if not before or now is None or abs(now - before) <= noise:
+        return 1.0
+    return now / before
+
+
+def compare_results(current, baseline, threshold=REGRESSION_THRESHOLD):
+    """
+    Compare two suite runs benchmark by benchmark.
+
+    A benchmark regresses when its time, peak heap or either resident memory figure grew
+    by more than `threshold` (0.2 = 20%) over the baseline. Benchmarks missing from either
+    run are skipped, as are memory figures a baseline did not record.
+
+    Returns:
+        list: One dict per shared benchmark with name, both measurements, the ratios
+            and a 'regressed' flag.
+    """
+    rows = []
+    for name in sorted(set(current["results"]) & set(baseline["results"])):
+        now, before = current["results"][name], baseline["results"][name]
+        row = {
+            "name": name,
+            "seconds": now["seconds"],
+            "baseline_seconds": before["seconds"],
+            "time_ratio": _ratio(now["seconds"], before["seconds"]),
+        }
+        for key in _MEMORY_KEYS:
+            row[key] = now.get(key)
+            row[f"baseline_{key}"] = before.get(key)
+            row[f"{key}_ratio"] = _ratio(now.get(key), before.get(key), 0 if key == "peak_kib" else RSS_NOISE_KIB)
+        row["memory_ratio"] = max(row[f"{key}_ratio"] for key in _MEMORY_KEYS)
+        row["regressed"] = row["time_ratio"] > 1 + threshold or row["memory_ratio"] > 1 + threshold
+        rows.append(row)
+    return rows
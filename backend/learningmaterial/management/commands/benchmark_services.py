@@ -0,0 +1,88 @@
+"""
+Management command running the extraction and rendering benchmark suite.
+
+Usage:
+    python manage.py benchmark_services --scale 50 --save baseline.json
+    python manage.py benchmark_services --scale 50 --compare baseline.json --threshold 0.2
+
+The suite covers serial vs parallel PDF extraction and the object-model vs zip/XML
+DOCX/PPTX engines as separate benchmarks. The command fails when the variants of an
+extraction disagree, and with --compare also when any benchmark is slower, or uses more
+peak heap or resident memory, than the baseline by more than the threshold, so it can gate CI.
+"""
+
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from learningmaterial.benchmarks.suite import (
+    REGRESSION_THRESHOLD, compare_results, load_results, run_suite, save_results
+)
+
+
+class Command(BaseCommand):
+    help = "Benchmark every extractor and renderer on a generated corpus, optionally against a baseline."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=int, default=20,
+                            help="Pages, sections or slides per generated document.")
+        parser.add_argument('--images', type=int, default=1,
+                            help="Images per page, section or slide.")
+        parser.add_argument('--repeat', type=int, default=3,
+                            help="Timed runs per benchmark; the best time is kept.")
+        parser.add_argument('--only', nargs='+',
+                            help="Benchmark name prefixes to run, e.g. extract.pdf render.")
+        parser.add_argument('--save', metavar='PATH', help="Write the results to a JSON baseline.")
+        parser.add_argument('--compare', metavar='PATH', help="Compare the results with a JSON baseline.")
+        parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                            help="Allowed relative growth before a benchmark counts as a regression.")
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as tmp, override_settings(MEDIA_ROOT=tmp):
+            results = run_suite(tmp, options['scale'], options['images'], options['repeat'], options['only'])
+
+        if options['save']:
+            save_results(results, options['save'])
+            self.stdout.write(f"Saved baseline to {options['save']}")
+
+        if not options['compare']:
+            self.stdout.write(f"{'benchmark':<26} {'seconds':>9} {'peak KiB':>10} {'RSS KiB':>10} {'child KiB':>10}")
+            for name, result in results["results"].items():
+                self.stdout.write(
+                    f"{name:<26} {result['seconds']:>9.4f} {result['peak_kib']:>10.1f} "
+                    f"{_kib(result.get('rss_kib')):>10} {_kib(result.get('child_rss_kib')):>10}")
+            self._check_parity(results)
+            return
+
+        baseline = load_results(options['compare'])
+        if baseline["meta"].get("scale") != options['scale']:
+            self.stderr.write(f"Warning: baseline was recorded at scale {baseline['meta'].get('scale')}")
+
+        rows = compare_results(results, baseline, options['threshold'])
+        self.stdout.write(f"{'benchmark':<26} {'seconds':>9} {'base':>9} {'ratio':>6} "
+                          f"{'peak KiB':>10} {'RSS KiB':>10} {'child KiB':>10} {'mem ratio':>9}")
+        for row in rows:
+            line = (f"{row['name']:<26} {row['seconds']:>9.4f} {row['baseline_seconds']:>9.4f} "
+                    f"{row['time_ratio']:>6.2f} {row['peak_kib']:>10.1f} {_kib(row['rss_kib']):>10} "
+                    f"{_kib(row['child_rss_kib']):>10} {row['memory_ratio']:>9.2f}")
+            self.stdout.write(self.style.ERROR(line) if row['regressed'] else line)
+
+        self._check_parity(results)
+        regressed = [row['name'] for row in rows if row['regressed']]
+        if regressed:
+            raise CommandError(
+                f"{len(regressed)} benchmark(s) regressed by more than {options['threshold']:.0%}: "
+                + ", ".join(regressed))
+        self.stdout.write(self.style.SUCCESS("No regressions."))
+
+    def _check_parity(self, results):
+        """
+        Fail when extraction variants (serial/parallel, object/xml) produced different output.
+        """
+        if results["mismatches"]:
+            raise CommandError("Output differs from the reference extraction: " + ", ".join(results["mismatches"]))
+
+
+def _kib(value):
+    return "-" if value is None else f"{value:.0f}"
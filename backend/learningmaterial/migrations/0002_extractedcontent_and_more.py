@@ -0,0 +1,33 @@
+# Generated by Django 5.0.3 on 2026-10-19 10:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learningmaterial', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExtractedContent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file_hash', models.CharField(max_length=64)),
+                ('extractor_version', models.CharField(max_length=20)),
+                ('file_type', models.CharField(max_length=10)),
+                ('text', models.TextField(blank=True)),
+                ('slides', models.JSONField(blank=True, default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Extracted content',
+                'verbose_name_plural': 'Extracted content',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='extractedcontent',
+            constraint=models.UniqueConstraint(fields=('file_hash', 'extractor_version'), name='unique_extraction_per_version'),
+        ),
+    ]
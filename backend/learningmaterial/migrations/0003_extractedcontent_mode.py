@@ -0,0 +1,18 @@
+# Generated by Django 5.0.3 on 2026-10-19 10:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learningmaterial', '0002_extractedcontent_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='extractedcontent',
+            name='mode',
+            field=models.CharField(choices=[('text', 'Text only'), ('metadata', 'Text and image metadata'), ('full', 'Full')], default='full', max_length=10),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.0.3 on 2026-10-19 10:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learningmaterial', '0003_extractedcontent_mode'),
+        ('students', '0002_alter_student_student_email'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AdaptedLesson',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('adapted_title', models.CharField(blank=True, max_length=255)),
+                ('adapted_objectives', models.JSONField(blank=True, default=list)),
+                ('adapted_content', models.TextField(blank=True)),
+                ('document', models.JSONField(blank=True, default=dict)),
+                ('content_hash', models.CharField(max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('material', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='adapted_lessons', to='learningmaterial.learningmaterials')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='adapted_lessons', to='students.student')),
+            ],
+            options={
+                'verbose_name': 'Adapted lesson',
+                'verbose_name_plural': 'Adapted lessons',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='adaptedlesson',
+            constraint=models.UniqueConstraint(fields=('material', 'student'), name='unique_adaptation_per_student'),
+        ),
+    ]
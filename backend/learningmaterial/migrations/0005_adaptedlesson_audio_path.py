@@ -0,0 +1,18 @@
+# Generated by Django 5.0.3 on 2026-10-19 10:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learningmaterial', '0004_adaptedlesson_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='adaptedlesson',
+            name='audio_path',
+            field=models.CharField(blank=True, max_length=500),
+        ),
+    ]
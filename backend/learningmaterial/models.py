@@ -39,3 +39,93 @@ class LearningMaterials(models.Model):
 
     def __str__(self):
         return self.title
+
+
+class ExtractedContent(models.Model):
+    """
+    Cached extraction output for an uploaded lesson file.
+
+    Rows are keyed by the sha256 of the file's bytes together with the extractor
+    version, so the alignment check, lesson adaptation and any other caller that
+    needs the parsed text can reuse it instead of re-opening the document.
+
+    Attributes:
+        file_hash (str): Hex sha256 digest of the source file.
+        extractor_version (str): Version of the extraction code that produced the row.
+        file_type (str): File extension of the source file (pdf, docx, pptx).
+        mode (str): Extraction mode the row was produced with (text, metadata or full).
+        text (str): The flattened base text used for prompts.
+        slides (list): Slide structure for PPTX files, or a single entry holding the image references for PDF/DOCX.
+        created_at (datetime): When the extraction was cached.
+    """
+    file_hash = models.CharField(max_length=64)
+    extractor_version = models.CharField(max_length=20)
+    file_type = models.CharField(max_length=10)
+    mode = models.CharField(
+        max_length=10,
+        choices=[('text', 'Text only'), ('metadata', 'Text and image metadata'), ('full', 'Full')],
+        default='full'
+    )
+    text = models.TextField(blank=True)
+    slides = models.JSONField(default=list, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Extracted content"
+        verbose_name_plural = "Extracted content"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['file_hash', 'extractor_version'], name='unique_extraction_per_version'),
+        ]
+
+    def __str__(self):
+        return f"{self.file_type} {self.file_hash[:12]} (v{self.extractor_version})"
+
+
+class AdaptedLesson(models.Model):
+    """
+    Adapted version of a learning material for one student, rendered to files on demand.
+
+    The adaptation result is stored instead of eagerly written output files; the download
+    endpoint renders it to the requested format the first time it is asked for.
+
+    Attributes:
+        material (LearningMaterials): The original lesson.
+        student (Student): The student the lesson was adapted for.
+        adapted_title (str): Title returned by the adaptation.
+        adapted_objectives (list): Adapted learning objectives.
+        adapted_content (str): Raw adapted content returned by the LLM.
+        document (dict): The parsed LessonDocument (see services.lesson_document); empty for
+            audio-only adaptations.
+        content_hash (str): sha256 over the document, the source file and the render version;
+            identifies the rendered output and doubles as its ETag.
+        audio_path (str): MEDIA_ROOT-relative path of the narration track, if one was generated.
+        updated_at (datetime): When the adaptation last changed (Last-Modified).
+    """
+    material = models.ForeignKey(LearningMaterials, on_delete=models.CASCADE, related_name='adapted_lessons')
+    student = models.ForeignKey('students.Student', on_delete=models.CASCADE, related_name='adapted_lessons')
+    adapted_title = models.CharField(max_length=255, blank=True)
+    adapted_objectives = models.JSONField(default=list, blank=True)
+    adapted_content = models.TextField(blank=True)
+    document = models.JSONField(default=dict, blank=True)
+    content_hash = models.CharField(max_length=64)
+    audio_path = models.CharField(max_length=500, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Adapted lesson"
+        verbose_name_plural = "Adapted lessons"
+        constraints = [
+            models.UniqueConstraint(fields=['material', 'student'], name='unique_adaptation_per_student'),
+        ]
+
+    def __str__(self):
+        return f"{self.material} for student {self.student_id}"
+
+    @property
+    def has_document(self):
+        """
+        Whether there is adapted content to render (audio-only adaptations have none).
+        """
+        return bool(self.document.get('blocks') or self.document.get('slides'))
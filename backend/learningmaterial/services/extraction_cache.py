@@ -0,0 +1,111 @@
+"""
+Persistent cache of extracted lesson file content.
+
+Uploaded files are parsed once per (sha256, extractor version) and the result is stored in
+the ExtractedContent model. The upload alignment check, lesson adaptation and get_base_text
+all go through get_extracted_content, so repeat adaptations skip PyMuPDF/python-docx/python-pptx.
+
+Parsing and image materialisation run in the extraction sandbox, so a hostile upload
+surfaces as ExtractionError instead of stalling the calling worker.
+
+Cached rows only hold content-addressed image references; they are resolved against the
+requesting material's ImageStore on every read, so one row can serve several materials.
+"""
+
+import hashlib
+
+from django.db import IntegrityError
+
+from learningmaterial.models import ExtractedContent
+from learningmaterial.services.extraction_sandbox import (
+    extract_content_sandboxed, materialize_images_sandboxed
+)
+from learningmaterial.services.file_extractors import (
+    EXTRACTOR_VERSION, MODE_FULL, MODE_METADATA, MODE_RANK, tmp_dir
+)
+from learningmaterial.services.image_store import ImageStore
+
+
+def hash_file(path, chunk_size=1024 * 1024):
+    """
+    Return the hex sha256 digest of a file, read in chunks to keep memory flat.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _strip_paths(slides):
+    """
+    Drop store-specific image paths so the cached row only holds stable references.
+    """
+    return [
+        {**slide, 'images': [{k: v for k, v in img.items() if k != 'path'} for img in slide.get('images', [])]}
+        for slide in slides
+    ]
+
+
+def _resolve_paths(slides, store):
+    """
+    Attach the absolute path of each already materialised image reference within the given store.
+    """
+    for slide in slides:
+        for img in slide.get('images', []):
+            if img.get('ref'):
+                img['path'] = store.path(img['ref'])
+    return slides
+
+
+def get_extracted_content(path, material_id=None, mode=MODE_FULL, file_hash=None):
+    """
+    Return (text, slides) for a lesson file, parsing it only on a cache miss.
+
+    A cached row satisfies any request of the same or a cheaper mode. FULL requests are
+    also served from METADATA rows: the image bytes are materialised from the recorded
+    locators without re-parsing the text, and the row is upgraded to FULL.
+
+    Args:
+        path (str): Filesystem path of the uploaded lesson file.
+        material_id (int, optional): Learning material the images belong to. Images are
+            stored in that material's ImageStore, or a shared temp store when omitted.
+        mode (str): One of MODE_TEXT, MODE_METADATA or MODE_FULL.
+        file_hash (str, optional): sha256 of the file, when the caller already has it.
+
+    Returns:
+        tuple: The same (text, slides) pair produced by extract_content.
+
+    Raises:
+        ExtractionError: If the file cannot be parsed within the sandbox limits.
+    """
+    store = ImageStore.for_material(material_id) if material_id else ImageStore(tmp_dir)
+    file_hash = file_hash or hash_file(path)
+    cached = ExtractedContent.objects.filter(
+        file_hash=file_hash, extractor_version=EXTRACTOR_VERSION).first()
+
+    required_rank = min(MODE_RANK[mode], MODE_RANK[MODE_METADATA])
+    if cached and MODE_RANK[cached.mode] >= required_rank:
+        if mode != MODE_FULL:
+            return cached.text, _resolve_paths(cached.slides, store)
+        slides = materialize_images_sandboxed(path, cached.slides, store)
+        if cached.mode != MODE_FULL:
+            cached.mode = MODE_FULL
+            cached.slides = _strip_paths(slides)
+            cached.save(update_fields=['mode', 'slides'])
+        return cached.text, slides
+
+    text, slides = extract_content_sandboxed(path, store, mode)
+    defaults = {
+        'file_type': path.split('.')[-1].lower(),
+        'mode': mode,
+        'text': text,
+        'slides': _strip_paths(slides),
+    }
+    try:
+        ExtractedContent.objects.update_or_create(
+            file_hash=file_hash, extractor_version=EXTRACTOR_VERSION, defaults=defaults)
+    except IntegrityError:
+        # Another request cached the same file concurrently; its row is equivalent
+        pass
+    return text, slides
@@ -0,0 +1,229 @@
+"""
+Isolated subprocesses for parsing uploaded lesson files.
+
+PyMuPDF, python-docx and python-pptx run on untrusted uploads. A malformed or hostile file
+can spin or allocate without bound, so every extraction job runs in its own spawned process
+instead of the web worker:
+
+- at most SANDBOX_WORKERS jobs run at once; the others wait for a slot, and that wait does
+  not count against their limits;
+- the wall-clock limit starts when the job starts inside its process. A job that overruns
+  has its process group (including any PDF page-range workers it started) killed, and no
+  other job is affected, since nothing is shared between jobs;
+- resident memory is capped at SANDBOX_MEMORY_MB: the parent samples the RSS of the job's
+  process tree while it waits and kills the tree once it goes over. Linux does not enforce
+  RLIMIT_RSS, so a setrlimit cap could only limit address space, which PyMuPDF's mmaps and
+  thread stacks inflate far beyond real use. RLIMIT_AS is still set, at the much larger
+  SANDBOX_ADDRESS_SPACE_MB, as a backstop against allocations faster than the sampling.
+
+Failures reach the caller as ExtractionError, whose code tells a bad file apart from a
+limit being hit. Its message is safe to show to clients; parser details are only logged.
+"""
+
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+import time
+import traceback
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; only the wall-clock limit applies there
+    resource = None
+
+from learningmaterial.services.file_extractors import MODE_FULL, extract_content, materialize_images
+
+logger = logging.getLogger(__name__)
+
+# Concurrent jobs, per-job wall-clock limit (seconds), resident memory limit and
+# address-space backstop (MiB, 0 disables either)
+SANDBOX_WORKERS = 2
+SANDBOX_TIMEOUT = 60
+SANDBOX_MEMORY_MB = 1024
+SANDBOX_ADDRESS_SPACE_MB = 8192
+
+# Seconds a new process may take to import the extractors before the job starts, and
+# interval at which a running job's memory is sampled
+SANDBOX_STARTUP_TIMEOUT = 60
+SANDBOX_POLL_INTERVAL = 0.05
+
+# ExtractionError codes
+ERROR_TIMEOUT = "timeout"
+ERROR_MEMORY = "memory_limit"
+ERROR_CRASHED = "worker_crashed"
+ERROR_INVALID_FILE = "invalid_file"
+
+_slots = threading.BoundedSemaphore(SANDBOX_WORKERS)
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+class ExtractionError(Exception):
+    """
+    Raised when a lesson file could not be extracted in the sandbox.
+
+    Attributes:
+        code (str): One of the ERROR_* codes above.
+        message (str): Human readable reason, safe to return to the client.
+    """
+
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+    def as_dict(self):
+        """
+        Return the error in the {"code", "message"} shape used in API responses.
+        """
+        return {"code": self.code, "message": self.message}
+
+
+def _run_job(conn, address_space_mb, fn, args):
+    """
+    Entry point of a sandbox process: start a new process group, cap its address space,
+    report that the job started, then send back ("ok", result), ("memory", None) or
+    ("error", traceback).
+    """
+    if hasattr(os, "setsid"):
+        # Own process group, so a kill also reaches the PDF page-range workers it spawns
+        os.setsid()
+    if resource is not None and address_space_mb:
+        limit = address_space_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    conn.send(("started", None))
+    try:
+        outcome = ("ok", fn(*args))
+    except MemoryError:
+        outcome = ("memory", None)
+    except Exception:
+        outcome = ("error", traceback.format_exc())
+    try:
+        conn.send(outcome)
+    except Exception:
+        conn.send(("error", traceback.format_exc()))
+    conn.close()
+
+
+def _tree_rss(pid):
+    """
+    Return the resident memory in bytes of a process and its descendants, or None where
+    /proc is unavailable.
+    """
+    total = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f"/proc/{current}/statm") as f:
+                total += int(f.read().split()[1]) * _PAGE_SIZE
+            with open(f"/proc/{current}/task/{current}/children") as f:
+                pending += [int(child) for child in f.read().split()]
+        except (OSError, ValueError, IndexError):
+            if current == pid and not os.path.exists(f"/proc/{pid}"):
+                return None
+    return total
+
+
+def _kill(process):
+    """
+    Kill a sandbox process together with its process group and reap it.
+    """
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except (AttributeError, OSError):
+        # No process groups, or the job died before leaving its parent's group
+        process.kill()
+    process.join()
+
+
+def _wait(process, conn, timeout):
+    """
+    Wait for the outcome of a started job, enforcing the wall-clock and memory limits.
+    """
+    deadline = time.monotonic() + timeout
+    memory_limit = SANDBOX_MEMORY_MB * 1024 * 1024
+    while not conn.poll(SANDBOX_POLL_INTERVAL):
+        if not process.is_alive() and not conn.poll():
+            raise ExtractionError(ERROR_CRASHED, "The extraction worker stopped unexpectedly.")
+        if time.monotonic() >= deadline:
+            raise ExtractionError(ERROR_TIMEOUT, f"Extraction took longer than {timeout} seconds.")
+        rss = _tree_rss(process.pid) if memory_limit else None
+        if rss is not None and rss > memory_limit:
+            raise ExtractionError(ERROR_MEMORY, "Extraction exceeded the memory limit.")
+    try:
+        return conn.recv()
+    except (EOFError, OSError):
+        raise ExtractionError(ERROR_CRASHED, "The extraction worker stopped unexpectedly.")
+
+
+def _start(fn, args):
+    """
+    Start a sandbox process for fn(*args), retrying once if the process cannot be created.
+
+    Returns:
+        tuple: (process, receiving end of its pipe).
+    """
+    context = multiprocessing.get_context("spawn")
+    for attempt in range(2):
+        conn, child_conn = context.Pipe(duplex=False)
+        process = context.Process(target=_run_job, args=(child_conn, SANDBOX_ADDRESS_SPACE_MB, fn, args))
+        try:
+            process.start()
+        except OSError:
+            conn.close()
+            logger.warning("Could not start an extraction process", exc_info=True)
+            if attempt:
+                raise ExtractionError(ERROR_CRASHED, "The extraction worker could not be started.")
+            continue
+        finally:
+            child_conn.close()
+        return process, conn
+
+
+def run_sandboxed(fn, *args, timeout=None):
+    """
+    Run fn(*args) in its own sandbox process and return its result.
+
+    Args:
+        fn (callable): Module-level, picklable function to run.
+        timeout (float, optional): Wall-clock limit in seconds, SANDBOX_TIMEOUT by default,
+            counted from the moment the job starts in its process.
+
+    Raises:
+        ExtractionError: On timeout, memory exhaustion, a crashed worker or a parse error.
+    """
+    timeout = SANDBOX_TIMEOUT if timeout is None else timeout
+    with _slots:
+        process, conn = _start(fn, args)
+        try:
+            started = _wait(process, conn, SANDBOX_STARTUP_TIMEOUT)
+            status, value = _wait(process, conn, timeout) if started[0] == "started" else started
+        except ExtractionError:
+            _kill(process)
+            raise
+        finally:
+            conn.close()
+        process.join()
+
+    if status == "ok":
+        return value
+    if status == "memory":
+        raise ExtractionError(ERROR_MEMORY, "Extraction exceeded the memory limit.")
+    logger.warning("Sandboxed %s failed on %r:\n%s", getattr(fn, "__name__", fn), args[:1], value)
+    raise ExtractionError(ERROR_INVALID_FILE, "Could not read the file.")
+
+
+def extract_content_sandboxed(path, store=None, mode=MODE_FULL):
+    """
+    Sandboxed extract_content: returns the same (text, slides) pair.
+    """
+    return run_sandboxed(extract_content, path, store, mode)
+
+
+def materialize_images_sandboxed(path, slides, store):
+    """
+    Sandboxed materialize_images: returns the slides with every image written to the store.
+    """
+    return run_sandboxed(materialize_images, path, slides, store)
@@ -1,23 +1,28 @@
 """
 Utility module for generating educational content in DOCX, PDF, PPTX, and audio formats.
 Provides functions to format plain text into styled documents and convert it to multimedia resources.
+Embedded images are first scaled to their display box by image_normalizer, and DOCX/PPTX
+outputs are cloned from the pre-styled bases in render_templates.
+
+The render_* functions consume a LessonDocument parsed once by lesson_document.parse_lesson;
+the create_*_from_text helpers parse and render in one call. render_pptx_in_place writes the
+adapted text into a copy of the original deck instead of building a new one.
 https://python-docx.readthedocs.io/en/latest/
 https://python-pptx.readthedocs.io/en/latest/
 https://docs.reportlab.com/
 """
 
+import copy
 import os
 import re
-import textwrap
 import requests
-from docx import Document
-from docx.shared import Pt, RGBColor, Inches
+from xml.sax.saxutils import escape
 from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
 from docx.oxml.ns import qn
 from pptx import Presentation
-from pptx.util import Inches, Pt, Emu
-from pptx.dml.color import RGBColor
-from pptx.enum.shapes import MSO_SHAPE
+from pptx.enum.shapes import PP_PLACEHOLDER
+from pptx.text.text import _Paragraph as _PptxParagraph, _Run
+from pptx.util import Inches, Pt
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import inch
 from reportlab.platypus import (
@@ -27,108 +32,90 @@ from reportlab.platypus import (
 from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
 from reportlab.lib import colors
 
+from learningmaterial.services.image_normalizer import (
+    DOCX_IMAGE_BOX, PDF_IMAGE_BOX, PPTX_IMAGE_BOX, normalize_images
+)
+from learningmaterial.services.lesson_document import BulletList, Heading, ImageSlot, parse_lesson
+from learningmaterial.services.render_templates import (
+    add_content_box, add_titled_slide, new_docx, new_presentation
+)
+
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
 
-def create_docx_from_text(text, path, title=None, images=None):
+def _normalize(images, box):
     """
-    Create a .docx file from plain text, inferring a title if not provided, stripping unwanted tips/reminders,
-    and styling headings ending with a colon.
+    Return {path: normalised path} for every existing image, normalised in one sandbox job.
+    images may be dicts with a 'path' key or plain string filepaths.
     """
-    # Strip trailing tips/reminders
-    body = re.split(r"Tips for Using Tools:", text)[0]
-    body = re.split(r"Remember,", body)[0]
-
-    # Normalize to lines & remove [Heading X] prefixes
-    lines = [re.sub(r"^\[Heading \d+\]\s*", "", l) for l in body.splitlines()]
-
-    # Infer title from first non-empty line if not given
-    if title is None:
-        for i, line in enumerate(lines):
-            if line.strip():
-                title = line.strip()
-                lines.pop(i)
-                break
-
-    # Build document
-    doc = Document()
-    style = doc.styles['Normal']
-    style.font.name = 'Calibri'
-    style.font.size = Pt(11)
+    paths = [img.get('path') if isinstance(img, dict) else img for img in images or []]
+    return normalize_images([p for p in paths if p and os.path.exists(p)], box)
+
+
+def render_docx(document, path, images=None):
+    """
+    Render a LessonDocument to a .docx file: centred title, Heading 2 sections, bold labels,
+    bullets, inline [IMAGE_n] pictures and a trailing "Visual References" page.
+    """
+    # Build document from the pre-styled base
+    doc = new_docx()
+    normalized = _normalize(images, DOCX_IMAGE_BOX)
 
     # Add title
-    if title:
-        p = doc.add_paragraph(title, style='Title')
+    if document.title:
+        p = doc.add_paragraph(document.title, style='Title')
         p.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
         doc.add_paragraph()
 
-    # Process lines
-    for line in lines:
-        stripped = line.strip()
-        if not stripped:
-            doc.add_paragraph()
-            continue
+    for block in document.blocks:
+        if isinstance(block, Heading):
+            doc.add_paragraph(block.text, style='Heading 2')
 
-        # Generic heading: ends with ':'
-        if stripped.endswith(':') and not stripped[0] in ('-', '*', '•'):
-            doc.add_paragraph(stripped.rstrip(':'), style='Heading 2')
-            continue
+        elif isinstance(block, BulletList):
+            for item in block.items:
+                doc.add_paragraph(item, style='List Bullet')
 
-        # Headings: **Heading** or **Heading**:
-        m = re.match(r"^\*\*(.+?)\*\*(?::)?$", stripped)
-        if m:
-            doc.add_paragraph(m.group(1).strip(), style='Heading 2')
-            continue
+        elif isinstance(block, ImageSlot):
+            if images and block.index < len(images) and os.path.exists(images[block.index]['path']):
+                doc.add_picture(normalized[images[block.index]['path']], width=Inches(5.5))
 
-        # Bold label: **Label:** content
-        m = re.match(r"^\*\*(.+?)\*\*:\s*(.*)$", stripped)
-        if m:
+        elif block.label:
+            # Bold label: **Label**: content
             p = doc.add_paragraph()
-            run = p.add_run(f"{m.group(1).strip()}: ")
+            run = p.add_run(f"{block.label}: ")
             run.bold = True
             run.font.size = Pt(12)
-            p.add_run(m.group(2).strip())
-            continue
-
-        # Bullets: -, *, or •
-        m = re.match(r"^[\-\*•]\s+(.*)$", stripped)
-        if m:
-            doc.add_paragraph(m.group(1).strip(), style='List Bullet')
-            continue
+            p.add_run(block.text)
 
-        # Regular paragraph
-        img_match = re.match(r"\[IMAGE_(\d+)\]", stripped)
-        if img_match and images:
-            idx = int(img_match.group(1))
-            if idx < len(images) and os.path.exists(images[idx]['path']):
-                doc.add_picture(images[idx]['path'], width=Inches(5.5))
-            continue
+        elif block.text:
+            doc.add_paragraph(block.text)
 
-        doc.add_paragraph(stripped)
+        else:
+            doc.add_paragraph()
 
     if images:
         doc.add_page_break()
         doc.add_paragraph("Visual References", style='Heading 2')
         for img in images:
             if os.path.exists(img['path']):
-                doc.add_picture(img['path'], width=Inches(5.5))
+                doc.add_picture(normalized[img['path']], width=Inches(5.5))
     doc.save(path)
 
 
-def create_pdf_from_text(text, path, title=None, images=None):
+def create_docx_from_text(text, path, title=None, images=None):
     """
-    Generate a cleanly styled PDF with header line, title, sections, bullets & wrapped text.
+    Create a .docx file from plain text, inferring a title if not provided, stripping unwanted tips/reminders,
+    and styling headings ending with a colon.
     """
-    # Strip off any trailing tips/reminders
-    body = re.split(r"Tips for Using Tools:", text)[0]
-    body = re.split(r"Remember,", body)[0]
-    lines = [l for l in body.splitlines() if l.strip()]
+    render_docx(parse_lesson(text, title), path, images)
 
-    # Infer title if not provided
-    if title is None and lines:
-        title = lines.pop(0).strip()
 
+def render_pdf(document, path, images=None):
+    """
+    Render a LessonDocument to a cleanly styled PDF with header line, title, sections,
+    bullets, wrapped text and a trailing "Visual References" section.
+    """
     # Build a simple doc template with a single frame
     doc = BaseDocTemplate(path, pagesize=A4,
                           leftMargin=inch*0.75, rightMargin=inch*0.75,
@@ -151,65 +138,158 @@ def create_pdf_from_text(text, path, title=None, images=None):
                                 fontName='Helvetica', fontSize=11,
                                 leading=14)
 
+    normalized = _normalize(images, PDF_IMAGE_BOX)
+
+    def image_flowable(img_path):
+        rl_img = RLImage(normalized[img_path], width=4*inch, height=3*inch)
+        rl_img.hAlign = 'CENTER'
+        return rl_img
+
     elements = []
     # Draw a top rule line
     elements.append(HRFlowable(width='100%', thickness=1, color=colors.HexColor(
         '#2E74B5'), spaceBefore=0, spaceAfter=12))
     # Title
-    if title:
-        elements.append(Paragraph(title, title_style))
-
-    # Process remaining lines
-    i = 0
-    while i < len(lines):
-        line = lines[i].strip()
-        # Section headings marked **Heading**
-        m = re.match(r"^\*\*(.+?)\*\*(?::)?$", line)
-        if m:
-            elements.append(Paragraph(m.group(1).strip(), section_style))
-            i += 1
-            continue
+    if document.title:
+        elements.append(Paragraph(escape(document.title), title_style))
 
-        # Bold label paragraphs **Label:** content
-        m = re.match(r"^\*\*(.+?)\*\*:\s*(.*)$", line)
-        if m:
-            label, content = m.groups()
-            wrapped = textwrap.wrap(f"<b>{label}:</b> {content}", width=100)
-            for w in wrapped:
-                elements.append(Paragraph(w, body_style))
-            i += 1
-            continue
+    # Reportlab wraps paragraphs itself; text is escaped since Paragraph parses markup
+    for block in document.blocks:
+        if isinstance(block, Heading):
+            elements.append(Paragraph(escape(block.text), section_style))
 
-        # Bullet lists if line starts with -, *, or •
-        if line and line[0] in ('-', '*', '•'):
-            items = []
-            while i < len(lines) and lines[i].strip()[0] in ('-', '*', '•'):
-                item_text = lines[i].strip()[1:].strip()
-                items.append(ListItem(Paragraph(item_text, body_style)))
-                i += 1
+        elif isinstance(block, BulletList):
+            items = [ListItem(Paragraph(escape(item), body_style)) for item in block.items]
             elements.append(ListFlowable(items, bulletType='bullet',
                             leftIndent=12, spaceBefore=4, spaceAfter=4))
-            continue
 
-        # Regular paragraph
-        wrapped = textwrap.wrap(line, width=100)
-        for w in wrapped:
-            elements.append(Paragraph(w, body_style))
-        i += 1
+        elif isinstance(block, ImageSlot):
+            if images and block.index < len(images) and os.path.exists(images[block.index]['path']):
+                elements.append(Spacer(1, 12))
+                elements.append(image_flowable(images[block.index]['path']))
+
+        elif block.label:
+            elements.append(Paragraph(f"<b>{escape(block.label)}:</b> {escape(block.text)}", body_style))
+
+        elif block.text:
+            elements.append(Paragraph(escape(block.text), body_style))
 
     if images:
         elements.append(Spacer(1, 12))
         elements.append(Paragraph("Visual References", section_style))
         for img in images:
             if os.path.exists(img['path']):
-                rl_img = RLImage(img['path'], width=4*inch, height=3*inch)
-                rl_img.hAlign = 'CENTER'
                 elements.append(Spacer(1, 12))
-                elements.append(rl_img)
+                elements.append(image_flowable(img['path']))
 
     doc.build(elements)
 
 
+def create_pdf_from_text(text, path, title=None, images=None):
+    """
+    Generate a cleanly styled PDF with header line, title, sections, bullets & wrapped text.
+    """
+    render_pdf(parse_lesson(text, title), path, images)
+
+
+def render_pptx(document, path, original_slides=None):
+    """
+    Render a LessonDocument to a .pptx deck, one slide per [Slide] block (or per section),
+    pairing each slide with the images of the matching original slide.
+    """
+    create_pptx_from_text(document.slide_pairs(original_slides), path)
+
+
+def _replace_text(text_frame, lines):
+    """
+    Replace the text of a frame with one paragraph per line, keeping the paragraph and run
+    formatting of its first paragraph.
+    """
+    paragraphs = text_frame._txBody.p_lst
+    prototype = copy.deepcopy(paragraphs[0])
+    for p in paragraphs:
+        text_frame._txBody.remove(p)
+    for run in prototype.r_lst[1:]:
+        prototype.remove(run)
+    for br in prototype.findall(qn('a:br')) + prototype.findall(qn('a:fld')):
+        prototype.remove(br)
+
+    for line in lines or [""]:
+        p = copy.deepcopy(prototype)
+        text_frame._txBody.append(p)
+        if p.r_lst:
+            _Run(p.r_lst[0], None).text = line
+        else:
+            _PptxParagraph(p, None).text = line
+
+
+def _is_title(shape):
+    """
+    Check whether a shape is the slide's title placeholder.
+    """
+    return shape.is_placeholder and shape.placeholder_format.type in (
+        PP_PLACEHOLDER.TITLE, PP_PLACEHOLDER.CENTER_TITLE)
+
+
+def _fill_slide(slide, title, content):
+    """
+    Write an adapted title and content into an existing slide's text frames.
+
+    The title goes into the title placeholder; all content goes into the first other text
+    frame that held text, and remaining text frames are emptied. Pictures, charts, layout
+    and master are left untouched.
+    """
+    lines = [line.strip() for line in content.split("\n") if line.strip()]
+    body = None
+    for shape in slide.shapes:
+        if not shape.has_text_frame:
+            continue
+        if _is_title(shape):
+            _replace_text(shape.text_frame, [title])
+        elif body is None and (shape.text_frame.text.strip() or shape.is_placeholder):
+            body = shape
+            if shape.is_placeholder:
+                # Placeholders bring their own bullets
+                lines = [re.sub(r"^[\-\*•]\s+", "", line) for line in lines]
+            _replace_text(shape.text_frame, lines)
+        elif shape.text_frame.text.strip():
+            _replace_text(shape.text_frame, [])
+
+
+def render_pptx_in_place(document, source_path, path):
+    """
+    Render a LessonDocument into a copy of the original deck instead of a rebuilt one.
+
+    The n-th adapted slide replaces the text of the n-th original slide; existing image
+    parts, layouts and masters are reused as-is, so no media is re-encoded and students
+    keep the original visual layout. Surplus original slides are dropped, and extra
+    adapted slides are added with the layout of the last original slide.
+
+    Args:
+        document (LessonDocument): The parsed adaptation.
+        source_path (str): Path of the original .pptx file.
+        path (str): Output .pptx filepath.
+    """
+    prs = Presentation(source_path)
+    slides = document.to_slides()
+
+    sld_ids = prs.slides._sldIdLst
+    for sld_id in list(sld_ids)[len(slides):]:
+        prs.part.drop_rel(sld_id.rId)
+        sld_ids.remove(sld_id)
+
+    for index, adapted in enumerate(slides):
+        if index < len(prs.slides):
+            slide = prs.slides[index]
+        else:
+            layout = prs.slides[-1].slide_layout if len(prs.slides) else prs.slide_layouts[1]
+            slide = prs.slides.add_slide(layout)
+        _fill_slide(slide, adapted.title, adapted.content)
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    prs.save(path)
+
+
 def create_pptx_from_text(slide_pairs, path):
     """
     slide_pairs: list of tuples (title: str, content: str, images: list).
@@ -217,44 +297,13 @@ def create_pptx_from_text(slide_pairs, path):
                  or plain string filepaths.
     path:       output .pptx filepath.
     """
-    prs = Presentation()
-    title_font_size = Pt(36)
-    content_font_size = Pt(20)
+    prs = new_presentation()
     all_images = []
 
-    # 1) Build content slides and collect all images
+    # 1) Build content slides from the styled prototypes and collect all images
     for idx, (title, content, images) in enumerate(slide_pairs):
-        slide = prs.slides.add_slide(prs.slide_layouts[6])
-
-        # — Title box —
-        title_box = slide.shapes.add_shape(
-            MSO_SHAPE.ROUNDED_RECTANGLE,
-            Inches(0.5), Inches(0.3), Inches(9), Inches(1)
-        )
-        title_box.fill.solid()
-        title_box.fill.fore_color.rgb = RGBColor(91, 155, 213)
-        tb = title_box.text_frame
-        tb.text = title.strip()
-        p = tb.paragraphs[0]
-        p.font.size = title_font_size
-        p.font.bold = True
-        p.font.color.rgb = RGBColor(255, 255, 255)
-
-        # — Content box —
-        content_box = slide.shapes.add_textbox(
-            Inches(0.7), Inches(1.5), Inches(8), Inches(4)
-        )
-        tf = content_box.text_frame
-        tf.word_wrap = True
-        for i, line in enumerate(content.split("\n")):
-            if not line.strip():
-                continue
-            paragraph = tf.add_paragraph() if i else tf.paragraphs[0]
-            paragraph.text = line.strip()
-            paragraph.level = 0
-            paragraph.font.size = content_font_size
-            paragraph.font.name = "Calibri"
-            paragraph.font.color.rgb = RGBColor(50, 50, 50)
+        slide = add_titled_slide(prs, title.strip())
+        add_content_box(slide, content.split("\n"))
 
         # Collect any images for the "Visual References" slides
         if images:
@@ -262,22 +311,6 @@ def create_pptx_from_text(slide_pairs, path):
 
     # 2) After all content slides are done, generate the Visual References slides
     if all_images:
-        def add_image_slide():
-            slide = prs.slides.add_slide(prs.slide_layouts[6])
-            title_box = slide.shapes.add_shape(
-                MSO_SHAPE.ROUNDED_RECTANGLE,
-                Inches(0.5), Inches(0.3), Inches(9), Inches(1)
-            )
-            title_box.fill.solid()
-            title_box.fill.fore_color.rgb = RGBColor(91, 155, 213)
-            tf = title_box.text_frame
-            tf.text = "Visual References"
-            p = tf.paragraphs[0]
-            p.font.size = Pt(36)
-            p.font.bold = True
-            p.font.color.rgb = RGBColor(255, 255, 255)
-            return slide
-
         # layout parameters
         slide_width = prs.slide_width
         slide_height = prs.slide_height
@@ -286,8 +319,10 @@ def create_pptx_from_text(slide_pairs, path):
         top_margin = Inches(1.4)
         spacing = Inches(0.6)
 
+        normalized = _normalize(all_images, PPTX_IMAGE_BOX)
+
         # start first image slide
-        img_slide = add_image_slide()
+        img_slide = add_titled_slide(prs, "Visual References")
         y_offset = top_margin
 
         for img in all_images:
@@ -297,13 +332,13 @@ def create_pptx_from_text(slide_pairs, path):
 
             # only create a new slide if the next image won't fit
             if y_offset + image_height > slide_height - Inches(0.5):
-                img_slide = add_image_slide()
+                img_slide = add_titled_slide(prs, "Visual References")
                 y_offset = top_margin
 
             # center the image horizontally
             left = (slide_width - image_width) // 2
             img_slide.shapes.add_picture(
-                img_path,
+                normalized[img_path],
                 left=left,
                 top=y_offset,
                 width=image_width,
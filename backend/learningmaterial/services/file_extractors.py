@@ -1,61 +1,303 @@
 """
 Utility functions to extract text and image data from PDF, DOCX, and PPTX files.
 These help standardize content input for further AI processing or transformation.
+
+Each extractor supports three modes:
+- MODE_TEXT: text only, embedded images are skipped entirely.
+- MODE_METADATA: text plus a locator for every image (PDF xref or package part name),
+  without decoding or writing any image bytes.
+- MODE_FULL: text plus images written to an ImageStore, each entry carrying a stable 'ref'.
+
+Image bytes for METADATA results are written later by materialize_images, once a renderer
+actually needs them.
+
+iter_pdf_pages, iter_docx_paragraphs and iter_pptx_slides stream a document unit by unit,
+and the extractors write those units straight into one text buffer. iter_content_chunks and
+iter_text_chunks pack units into chunks of at most settings.LESSON_CHUNK_CHARS characters,
+so consumers such as lesson adaptation only handle one bounded chunk at a time. DOCX and
+PPTX are read straight from the zip container by xml_extractors, falling back to the
+python-docx/python-pptx object model for packages that engine does not handle.
 """
 
 import fitz  # PyMuPDF to read pdfs and extract text
 from docx import Document
 from pptx import Presentation
+import io
+import itertools
+import multiprocessing
 import os
 import tempfile
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from django.conf import settings
 from pptx.enum.shapes import PP_PLACEHOLDER
 from docx.opc.constants import RELATIONSHIP_TYPE as RT
 
+from learningmaterial.services.image_store import ImageStore
+from learningmaterial.services.xml_extractors import (
+    UnsupportedPackage, iter_docx_paragraphs_xml, iter_pptx_slides_xml
+)
+
+# Bump whenever the shape of the extracted output changes, so cached extractions are rebuilt
+EXTRACTOR_VERSION = "3"
+
+# Extraction modes, from cheapest to most complete
+MODE_TEXT = "text"
+MODE_METADATA = "metadata"
+MODE_FULL = "full"
+MODE_RANK = {MODE_TEXT: 0, MODE_METADATA: 1, MODE_FULL: 2}
+
+# get_text("dict") flags without TEXT_PRESERVE_IMAGES: image blocks are never used, so skip decoding them
+PDF_TEXT_FLAGS = fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES
+
+# PDFs with at least this many pages are extracted in parallel across PDF_WORKERS processes
+PDF_PARALLEL_MIN_PAGES = 64
+PDF_WORKERS = min(os.cpu_count() or 1, 8)
+_pdf_pool = None
+_pdf_pool_lock = threading.Lock()
+
+# DOCX/PPTX extraction engines: lightweight zip/XML parsing, the python-docx/pptx object
+# model, or XML with automatic fallback to the object model
+ENGINE_XML = "xml"
+ENGINE_OBJECT = "object"
+ENGINE_AUTO = "auto"
+EXTRACTION_ENGINE = ENGINE_AUTO
+
+# Fallback store for callers that do not scope images to a material
 tmp_dir = os.path.join(tempfile.gettempdir(), "pptx_images")
 os.makedirs(tmp_dir, exist_ok=True)
 
-def extract_text_from_pdf(path):
+
+def _image_entry(store, ref, **extra):
     """
-    Extract text and images from a PDF file.
-    Returns a tuple: (text, images)
+    Build the image dict handed to renderers: a stable store reference plus its resolved path.
     """
-    lines = []
-    images = []
-    with fitz.open(path) as doc:
-        for page_index in range(len(doc)):
-            page = doc[page_index]
-            # Get text
-            blocks = page.get_text("dict")["blocks"]
-            for block in blocks:
-                if "lines" in block:
-                    for line in block["lines"]:
-                        sentence = " ".join([span["text"]
-                                            for span in line["spans"]])
-                        lines.append(sentence)
+    return {'ref': ref, 'path': store.path(ref), **extra}
+
+
+def _part_ext(partname):
+    """
+    Return the file extension of an OPC part name such as '/ppt/media/image1.png'.
+    """
+    return partname.rsplit('.', 1)[-1].lower()
 
+
+def _iter_pdf_pages(doc, page_indices, store, mode, seen_xrefs):
+    """
+    Yield (lines, images) for each of the given pages of an open PDF document.
+    """
+    for page_index in page_indices:
+        page = doc[page_index]
+        lines = []
+        images = []
+        # Get text
+        blocks = page.get_text("dict", flags=PDF_TEXT_FLAGS)["blocks"]
+        for block in blocks:
+            if "lines" in block:
+                for line in block["lines"]:
+                    sentence = " ".join([span["text"]
+                                        for span in line["spans"]])
+                    lines.append(sentence)
+
+        if mode != MODE_TEXT:
             # Get images
-            for img_index, img in enumerate(page.get_images(full=True)):
+            for img in page.get_images(full=True):
                 xref = img[0]
+                if xref in seen_xrefs:
+                    continue
+                seen_xrefs.add(xref)
+                if mode == MODE_METADATA:
+                    images.append({'xref': xref})
+                    continue
                 base_image = doc.extract_image(xref)
-                image_bytes = base_image["image"]
-                image_ext = base_image["ext"]
-                image_path = os.path.join(
-                    tmp_dir, f"pdf_img_{page_index}_{img_index}.{image_ext}")
-                with open(image_path, "wb") as f:
-                    f.write(image_bytes)
-                images.append({'path': image_path})
+                ref = store.put(base_image["image"], base_image["ext"])
+                images.append(_image_entry(store, ref, xref=xref))
 
-    return "\n".join(lines), images
+        yield lines, images
 
 
-def extract_text_from_docx(path):
+def _write_lines(buffer, lines, started):
     """
-    Extract text and image paths from a DOCX file.
-    Returns a tuple: (text, images)
+    Append lines to a text buffer, newline-separated as "\\n".join would place them.
+
+    Returns:
+        bool: Whether the buffer now holds at least one line; pass it to the next call.
+    """
+    for line in lines:
+        if started:
+            buffer.write("\n")
+        buffer.write(line)
+        started = True
+    return started
+
+
+def iter_pdf_pages(path, store=None, mode=MODE_FULL):
+    """
+    Stream a PDF one page at a time.
+    Yields a tuple per page: (text, images), with images deduplicated by xref across pages.
+    """
+    store = store or ImageStore(tmp_dir)
+    with fitz.open(path) as doc:
+        for lines, images in _iter_pdf_pages(doc, range(len(doc)), store, mode, set()):
+            yield "\n".join(lines), images
+
+
+def _extract_pdf_pages(doc, page_indices, store, mode, seen_xrefs):
+    """
+    Extract text lines and images from the given pages of an open PDF document.
+    Returns a tuple: (lines, images)
     """
-    doc = Document(path)
     lines = []
     images = []
+    for page_lines, page_images in _iter_pdf_pages(doc, page_indices, store, mode, seen_xrefs):
+        lines.extend(page_lines)
+        images.extend(page_images)
+    return lines, images
+
+
+def _extract_pdf_range(path, start, stop, store_root, mode):
+    """
+    Process pool worker: open the PDF independently and extract pages [start, stop).
+    Returns a tuple: (lines, images)
+    """
+    with fitz.open(path) as doc:
+        return _extract_pdf_pages(doc, range(start, stop), ImageStore(store_root), mode, set())
+
+
+def _get_pdf_pool(workers):
+    """
+    Return the shared process pool used for parallel PDF extraction, creating it on first use.
+
+    Workers are spawned rather than forked, since MuPDF state must not be shared with a
+    threaded parent, and the pool is kept for the life of the process to amortise start-up.
+    """
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is None:
+            _pdf_pool = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        return _pdf_pool
+
+
+def shutdown_pdf_pool():
+    """
+    Stop the parallel PDF extraction pool, if one was started, and wait for its workers.
+    """
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is not None:
+            _pdf_pool.shutdown()
+            _pdf_pool = None
+
+
+def _page_ranges(page_count, chunks):
+    """
+    Split range(page_count) into at most `chunks` contiguous (start, stop) ranges.
+    """
+    size = -(-page_count // chunks)
+    return [(start, min(start + size, page_count)) for start in range(0, page_count, size)]
+
+
+def extract_text_from_pdf(path, store=None, mode=MODE_FULL, parallel=None):
+    """
+    Extract text and images from a PDF file.
+    Images shared between pages (same xref) are decoded and stored only once.
+
+    Documents with at least PDF_PARALLEL_MIN_PAGES pages are split into page ranges and
+    extracted across a process pool, each worker opening the file on its own; results are
+    merged back in page order. Pass parallel=True/False to force either path.
+    Returns a tuple: (text, images)
+    """
+    store = store or ImageStore(tmp_dir)
+    with fitz.open(path) as doc:
+        page_count = len(doc)
+        if parallel is None:
+            parallel = page_count >= PDF_PARALLEL_MIN_PAGES and PDF_WORKERS > 1
+        if not parallel:
+            # Pages are written into the text as they are read; only one page's lines are held
+            text = io.StringIO()
+            images = []
+            started = False
+            for page_lines, page_images in _iter_pdf_pages(doc, range(page_count), store, mode, set()):
+                started = _write_lines(text, page_lines, started)
+                images.extend(page_images)
+            return text.getvalue(), images
+
+    # Twice as many ranges as workers keeps the pool busy when some pages are heavier
+    pool = _get_pdf_pool(PDF_WORKERS)
+    futures = [
+        pool.submit(_extract_pdf_range, path, start, stop, store.root, mode)
+        for start, stop in _page_ranges(page_count, PDF_WORKERS * 2)
+    ]
+    text = io.StringIO()
+    images = []
+    seen_xrefs = set()
+    started = False
+    for future in futures:
+        range_lines, range_images = future.result()
+        started = _write_lines(text, range_lines, started)
+        # The same xref can appear in several ranges; keep its first occurrence
+        for img in range_images:
+            if img['xref'] not in seen_xrefs:
+                seen_xrefs.add(img['xref'])
+                images.append(img)
+
+    return text.getvalue(), images
+
+
+def _with_fallback(xml_units, object_units, engine):
+    """
+    Yield units from the lightweight XML engine, switching to the object model on failure.
+
+    The two engines produce identical units, so after a mid-stream UnsupportedPackage the
+    object-model stream resumes right after the last unit already yielded.
+    """
+    if engine == ENGINE_OBJECT:
+        yield from object_units()
+        return
+    yielded = 0
+    try:
+        for unit in xml_units():
+            yield unit
+            yielded += 1
+        return
+    except UnsupportedPackage:
+        if engine == ENGINE_XML:
+            raise
+    yield from itertools.islice(object_units(), yielded, None)
+
+
+def _xml_engine_args(store, mode):
+    """
+    Translate an extraction mode into the (images, store) arguments of the XML engine.
+    """
+    store = store or ImageStore(tmp_dir)
+    return mode != MODE_TEXT, store if mode == MODE_FULL else None
+
+
+def iter_docx_paragraphs(path, store=None, mode=MODE_FULL, engine=None):
+    """
+    Stream a DOCX file as (text, images) units.
+    Yields one unit per non-empty paragraph (headings prefixed with their style name),
+    followed by one unit per embedded image.
+
+    Uses the zip/XML engine by default and falls back to python-docx for anything unusual;
+    engine may force ENGINE_XML or ENGINE_OBJECT.
+    """
+    images, xml_store = _xml_engine_args(store, mode)
+    return _with_fallback(
+        lambda: iter_docx_paragraphs_xml(path, images, xml_store),
+        lambda: _iter_docx_paragraphs_object(path, store, mode),
+        engine or EXTRACTION_ENGINE)
+
+
+def _iter_docx_paragraphs_object(path, store=None, mode=MODE_FULL):
+    """
+    Object-model (python-docx) implementation of iter_docx_paragraphs.
+    """
+    store = store or ImageStore(tmp_dir)
+    doc = Document(path)
 
     # Text extraction
     for para in doc.paragraphs:
@@ -64,36 +306,64 @@ def extract_text_from_docx(path):
         if not text:
             continue
         if "heading" in style:
-            lines.append(f"[{para.style.name}] {text}")
+            yield f"[{para.style.name}] {text}", []
         else:
-            lines.append(text)
+            yield text, []
+
+    if mode == MODE_TEXT:
+        return
 
     # Image extraction
     rels = doc.part._rels
     for rel in rels.values():
         if rel.reltype == RT.IMAGE:
             image_part = rel.target_part
-            image_data = image_part.blob
-            image_ext = image_part.content_type.split(
-                "/")[-1]  # e.g., image/png
-            img_path = os.path.join(
-                tmp_dir, f"docx_img_{len(images)}.{image_ext}")
-            with open(img_path, "wb") as f:
-                f.write(image_data)
-            images.append({'path': img_path})
+            partname = str(image_part.partname)
+            if mode == MODE_METADATA:
+                yield "", [{'part': partname}]
+                continue
+            ref = store.put(image_part.blob, _part_ext(partname))
+            yield "", [_image_entry(store, ref, part=partname)]
+
+
+def extract_text_from_docx(path, store=None, mode=MODE_FULL, engine=None):
+    """
+    Extract text and image paths from a DOCX file.
+    Returns a tuple: (text, images)
+    """
+    text = io.StringIO()
+    images = []
+    started = False
+    for unit_text, unit_images in iter_docx_paragraphs(path, store, mode, engine):
+        if unit_text:
+            started = _write_lines(text, [unit_text], started)
+        images.extend(unit_images)
+    return text.getvalue(), images
 
-    return "\n".join(lines), images
 
+def iter_pptx_slides(path, store=None, mode=MODE_FULL, engine=None):
+    """
+    Stream a PowerPoint file one slide at a time.
+    Yields a dict per slide with title, content, and image data.
 
-def extract_text_from_pptx(path):
+    Uses the zip/XML engine by default and falls back to python-pptx for anything unusual;
+    engine may force ENGINE_XML or ENGINE_OBJECT.
     """
-    Extract text and image metadata from a PowerPoint file.
-    Returns a list of slides with title, content, and image data.
+    images, xml_store = _xml_engine_args(store, mode)
+    return _with_fallback(
+        lambda: iter_pptx_slides_xml(path, images, xml_store),
+        lambda: _iter_pptx_slides_object(path, store, mode),
+        engine or EXTRACTION_ENGINE)
+
+
+def _iter_pptx_slides_object(path, store=None, mode=MODE_FULL):
     """
+    Object-model (python-pptx) implementation of iter_pptx_slides.
+    """
+    store = store or ImageStore(tmp_dir)
     prs = Presentation(path)
-    slide_data = []
 
-    for idx, slide in enumerate(prs.slides):
+    for slide in prs.slides:
         title = ""
         content = ""
         images = []
@@ -113,25 +383,196 @@ def extract_text_from_pptx(path):
                     content += text + "\n"
 
             # 2) Capture images as before
-            if hasattr(shape, "image"):
-                blob = shape.image.blob
-                ext = shape.image.ext
-                fname = f"slide_{idx}_img_{len(images)}.{ext}"
-                fpath = os.path.join(tmp_dir, fname)
-                with open(fpath, "wb") as f:
-                    f.write(blob)
-                images.append({
-                    "path":   fpath,
+            if mode != MODE_TEXT and hasattr(shape, "image"):
+                image_part = slide.part.related_part(shape._element.blip_rId)
+                partname = str(image_part.partname)
+                entry = {
+                    "part":   partname,
                     "left":   shape.left,
                     "top":    shape.top,
                     "width":  shape.width,
                     "height": shape.height
-                })
+                }
+                if mode == MODE_FULL:
+                    ref = store.put(image_part.blob, _part_ext(partname))
+                    entry = _image_entry(store, ref, **entry)
+                images.append(entry)
 
-        slide_data.append({
+        yield {
             "title":   title,
             "content": content.strip(),
             "images":  images
-        })
+        }
+
+
+def extract_text_from_pptx(path, store=None, mode=MODE_FULL, engine=None):
+    """
+    Extract text and image metadata from a PowerPoint file.
+    Returns a list of slides with title, content, and image data.
+    """
+    return list(iter_pptx_slides(path, store, mode, engine))
+
+
+def slides_to_text(slides):
+    """
+    Flatten extracted PPTX slides into the [Slide] block text used in prompts.
+    """
+    return "\n\n".join(
+        f"[Slide]\nTitle: {s['title']}\nContent: {s['content']}" for s in slides
+    )
+
+
+def extract_content(path, store=None, mode=MODE_FULL):
+    """
+    Dispatch file to appropriate extractor based on extension.
+    Returns a tuple: (text, slides) where slides is the PPTX slide list, or a
+    single-entry list holding the extracted images for PDF and DOCX files.
+    """
+    ext = path.split('.')[-1].lower()
+    if ext == 'pdf':
+        text, images = extract_text_from_pdf(path, store, mode)
+        return text, [{'images': images}]
+    if ext == 'docx':
+        text, images = extract_text_from_docx(path, store, mode)
+        return text, [{'images': images}]
+    if ext == 'pptx':
+        # Slides are rendered into the prompt text as they stream in
+        slides = []
+        text = io.StringIO()
+        for slide in iter_pptx_slides(path, store, mode):
+            if slides:
+                text.write("\n\n")
+            text.write(slides_to_text([slide]))
+            slides.append(slide)
+        return text.getvalue(), slides
+    raise ValueError(f"Unsupported file type: {ext}")
+
+
+def _split_text(text, max_chars):
+    """
+    Split a single unit of text into pieces of at most max_chars, preferring line breaks.
+    """
+    while len(text) > max_chars:
+        cut = text.rfind("\n", 0, max_chars)
+        if cut <= 0:
+            cut = max_chars
+        yield text[:cut]
+        text = text[cut:].lstrip("\n")
+    if text:
+        yield text
+
+
+def iter_chunks(units, max_chars=None, sep="\n"):
+    """
+    Pack a stream of (text, images) units into chunks of bounded text length.
+
+    Only the chunk being filled is held in memory. Units longer than max_chars are split,
+    preferring line breaks.
+
+    Args:
+        units (iterable): (text, images) pairs in document order.
+        max_chars (int, optional): Upper bound on the text length of each chunk,
+            settings.LESSON_CHUNK_CHARS by default.
+        sep (str): Separator placed between units within a chunk.
+
+    Yields:
+        dict: {'index': int, 'text': str, 'images': list}.
+    """
+    max_chars = max_chars or settings.LESSON_CHUNK_CHARS
+    index = 0
+    buffer = []
+    images = []
+    size = 0
+    for text, unit_images in units:
+        for piece in _split_text(text, max_chars):
+            if buffer and size + len(sep) + len(piece) > max_chars:
+                yield {'index': index, 'text': sep.join(buffer), 'images': images}
+                index += 1
+                buffer, images, size = [], [], 0
+            size += len(piece) + (len(sep) if buffer else 0)
+            buffer.append(piece)
+        images.extend(unit_images)
+    if buffer or images:
+        yield {'index': index, 'text': sep.join(buffer), 'images': images}
+
+
+def iter_content_chunks(path, store=None, mode=MODE_TEXT, max_chars=None):
+    """
+    Stream a lesson file as bounded chunks of text, straight from the extractors.
+
+    Pages, paragraphs or slides are pulled from the streaming extractors and packed by
+    iter_chunks, so only one chunk is held in memory regardless of document size. PPTX
+    slides are rendered as the same [Slide] blocks used in prompts.
+
+    Args:
+        path (str): Filesystem path of the lesson file.
+        store (ImageStore, optional): Store for MODE_FULL images.
+        mode (str): Extraction mode; defaults to text only.
+        max_chars (int, optional): Upper bound on the text length of each chunk,
+            settings.LESSON_CHUNK_CHARS by default.
+
+    Yields:
+        dict: {'index': int, 'text': str, 'images': list} in document order.
+    """
+    ext = path.split('.')[-1].lower()
+    if ext == 'pdf':
+        return iter_chunks(iter_pdf_pages(path, store, mode), max_chars)
+    if ext == 'docx':
+        return iter_chunks(iter_docx_paragraphs(path, store, mode), max_chars)
+    if ext == 'pptx':
+        slides = ((slides_to_text([s]), s['images']) for s in iter_pptx_slides(path, store, mode))
+        return iter_chunks(slides, max_chars, sep="\n\n")
+    raise ValueError(f"Unsupported file type: {ext}")
+
+
+def iter_text_chunks(text, max_chars=None):
+    """
+    Split already extracted text, such as a cached extraction, into chunks of at most
+    max_chars characters (settings.LESSON_CHUNK_CHARS by default), breaking between
+    paragraphs or [Slide] blocks where possible.
+
+    Yields:
+        str: The text of each chunk, in order.
+    """
+    blocks = ((block, []) for block in text.split("\n\n"))
+    for chunk in iter_chunks(blocks, max_chars, sep="\n\n"):
+        yield chunk['text']
+
+
+def materialize_images(path, slides, store):
+    """
+    Write the bytes of every image referenced by a METADATA or FULL extraction into a store.
+
+    Opens the source file once and only decodes images that are missing from the store,
+    using the PDF xref or package part name recorded at extraction time. Each image dict
+    is updated in place with its 'ref' and resolved 'path'.
+
+    Args:
+        path (str): Filesystem path of the source lesson file.
+        slides (list): The slides list returned by extract_content.
+        store (ImageStore): Store the images should be written to.
+
+    Returns:
+        list: The same slides list, with every image materialised.
+    """
+    pending = [
+        img for slide in slides for img in slide.get('images', [])
+        if not (img.get('ref') and store.exists(img['ref']))
+    ]
+    if pending:
+        if path.split('.')[-1].lower() == 'pdf':
+            with fitz.open(path) as doc:
+                for img in pending:
+                    base_image = doc.extract_image(img['xref'])
+                    img['ref'] = store.put(base_image["image"], base_image["ext"])
+        else:
+            # DOCX and PPTX are zip packages; read the image part directly
+            with zipfile.ZipFile(path) as package:
+                for img in pending:
+                    data = package.read(img['part'].lstrip('/'))
+                    img['ref'] = store.put(data, _part_ext(img['part']))
 
-    return slide_data
+    for slide in slides:
+        for img in slide.get('images', []):
+            img['path'] = store.path(img['ref'])
+    return slides
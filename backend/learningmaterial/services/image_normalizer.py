@@ -0,0 +1,191 @@
+"""
+Resize and recompress extracted images to the box each renderer displays them in.
+
+Extracted images keep their original resolution, but the renderers in file_creators.py
+always draw them into a fixed box (4x3in in PDFs, 5.5in wide in DOCX, 6.5x4.5in in PPTX).
+normalize_images downsamples images to that box at IMAGE_DPI and recompresses them, so every
+student's output embeds a small copy instead of the full-size original.
+
+Images come from untrusted uploads, so they are decoded in the extraction sandbox rather
+than the web process, one job per render, and PIL refuses images over MAX_IMAGE_PIXELS (decompression bombs).
+
+Results are cached on disk under MEDIA_ROOT/normalized_images/, keyed by the sha256 of the
+source image and the target pixel size, so a class of students shares one normalised copy.
+clear_normalized_images drops a material's copies once it is deleted.
+"""
+
+import glob
+import hashlib
+import io
+import os
+import re
+import tempfile
+
+from django.conf import settings
+from PIL import Image, UnidentifiedImageError
+
+from learningmaterial.services.extraction_sandbox import run_sandboxed
+
+# Display boxes used by the renderers, in inches (width, height)
+PDF_IMAGE_BOX = (4, 3)
+DOCX_IMAGE_BOX = (5.5, 9)  # 5.5in wide, height bounded by the printable page
+PPTX_IMAGE_BOX = (6.5, 4.5)
+
+# Target resolution of normalised images and the JPEG quality used for opaque images
+IMAGE_DPI = 150
+JPEG_QUALITY = 82
+
+# Largest image PIL will decode, in pixels (about 7000x7000); set process-wide, so the
+# renderers embedding an original image are bounded too
+MAX_IMAGE_PIXELS = 50_000_000
+Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+
+# Wall-clock limit in seconds per image decoded and resized in the sandbox
+NORMALIZE_TIMEOUT = 30
+
+# Extracted images are stored as "<sha256>.<ext>", which already is their content hash
+_CONTENT_REF = re.compile(r"^([0-9a-f]{64})\.\w+$")
+
+
+def _normalized_root():
+    """
+    Return the directory holding normalised images.
+    """
+    return os.path.join(settings.MEDIA_ROOT, 'normalized_images')
+
+
+def _source_hash(path):
+    """
+    Return the sha256 of an image, reusing the content-addressed file name when there is one.
+    """
+    match = _CONTENT_REF.match(os.path.basename(path))
+    if match:
+        return match.group(1)
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _encode(image):
+    """
+    Recompress an image: JPEG for opaque images, optimised PNG when transparency matters.
+    Returns a tuple: (bytes, extension)
+    """
+    buffer = io.BytesIO()
+    has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+    if has_alpha:
+        image.save(buffer, "PNG", optimize=True)
+        return buffer.getvalue(), "png"
+    image.convert("RGB").save(buffer, "JPEG", quality=JPEG_QUALITY, optimize=True)
+    return buffer.getvalue(), "jpg"
+
+
+def _resize_all(paths, size):
+    """
+    Decode each image and shrink it to fit size; runs in the sandbox.
+    Returns one tuple (bytes, extension) per path, or None where the format cannot be decoded.
+    """
+    resized = []
+    for path in paths:
+        try:
+            with Image.open(path) as image:
+                image.thumbnail(size, Image.LANCZOS)
+                resized.append(_encode(image))
+        except (UnidentifiedImageError, OSError, ValueError):
+            resized.append(None)
+    return resized
+
+
+def _store(root, key, path, data, ext):
+    """
+    Cache a normalised copy and return the path to use for the image.
+    """
+    os.makedirs(root, exist_ok=True)
+    if len(data) >= os.path.getsize(path):
+        data, ext = b"", "orig"
+
+    target = os.path.join(root, f"{key}.{ext}")
+    fd, tmp_path = tempfile.mkstemp(dir=root, suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, target)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return path if ext == "orig" else target
+
+
+def normalize_images(paths, box, dpi=IMAGE_DPI):
+    """
+    Return the paths of copies of images scaled down to fit a display box.
+
+    Images are never upscaled. When neither resizing nor recompression makes a file
+    smaller, or its format cannot be decoded (e.g. WMF/EMF), the original path is used.
+    Images missing from the cache are decoded together in a single sandbox job.
+
+    Args:
+        paths (list): Paths of the extracted images.
+        box (tuple): Display box (width, height) in inches, e.g. PDF_IMAGE_BOX.
+        dpi (int): Target pixels per inch.
+
+    Returns:
+        dict: Path of the normalised image (or the original path) for each path.
+
+    Raises:
+        ExtractionError: If decoding the images exceeds the sandbox limits or MAX_IMAGE_PIXELS.
+    """
+    size = (round(box[0] * dpi), round(box[1] * dpi))
+    root = _normalized_root()
+    normalized, missing = {}, {}
+    for path in dict.fromkeys(paths):
+        key = f"{_source_hash(path)}_{size[0]}x{size[1]}"
+        for ext in ("jpg", "png", "orig"):
+            cached = os.path.join(root, f"{key}.{ext}")
+            if os.path.exists(cached):
+                # ".orig" marks images where the original was already the best choice
+                normalized[path] = path if ext == "orig" else cached
+                break
+        else:
+            missing[path] = key
+
+    if missing:
+        # The time limit is per image, since the job handles the whole batch
+        resized = run_sandboxed(_resize_all, list(missing), size, timeout=NORMALIZE_TIMEOUT * len(missing))
+        for (path, key), result in zip(missing.items(), resized):
+            normalized[path] = path if result is None else _store(root, key, path, *result)
+    return normalized
+
+
+def normalize_image(path, box, dpi=IMAGE_DPI):
+    """
+    Return the path of a copy of one image scaled down to fit a display box.
+
+    See normalize_images, which renderers use to handle all their images in one job.
+    """
+    return normalize_images([path], box, dpi)[path]
+
+
+def clear_normalized_images(refs):
+    """
+    Delete the normalised copies of a deleted material's images.
+
+    Copies are shared by content, so those of an image another material still stores are kept.
+
+    Args:
+        refs (list): The material's image references ("<sha256>.<ext>").
+    """
+    root = _normalized_root()
+    stores = os.path.join(settings.MEDIA_ROOT, 'extracted_images')
+    for ref in refs:
+        match = _CONTENT_REF.match(ref)
+        if not match or glob.glob(os.path.join(stores, '*', f"{match.group(1)}.*")):
+            continue
+        for cached in glob.glob(os.path.join(root, f"{match.group(1)}_*")):
+            try:
+                os.remove(cached)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,92 @@
+"""
+Content-addressed storage for images extracted from uploaded lesson files.
+
+Each learning material gets its own directory under MEDIA_ROOT/extracted_images/<material_id>/,
+and every image is stored once under the sha256 of its bytes. Extractors hand back stable
+references ("<sha256>.<ext>") instead of position-based temp file names, so concurrent
+extractions never overwrite each other and identical images are only written once.
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+
+
+class ImageStore:
+    """
+    A directory of images addressed by the sha256 of their content.
+
+    Attributes:
+        root (str): Directory holding the stored images.
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    @classmethod
+    def for_material(cls, material_id):
+        """
+        Return the image store scoped to a single learning material.
+        """
+        return cls(os.path.join(settings.MEDIA_ROOT, 'extracted_images', str(material_id)))
+
+    def path(self, ref):
+        """
+        Resolve an image reference to its absolute path in this store.
+        """
+        return os.path.join(self.root, ref)
+
+    def exists(self, ref):
+        """
+        Check whether the referenced image has been written to this store.
+        """
+        return os.path.exists(self.path(ref))
+
+    def put(self, data, ext):
+        """
+        Store image bytes and return their content-addressed reference.
+
+        The bytes are only written if no image with the same hash is stored yet. Writes go
+        to a temporary file that is atomically renamed, so readers never see partial files.
+
+        Args:
+            data (bytes): Raw image bytes.
+            ext (str): File extension without the dot, e.g. 'png'.
+
+        Returns:
+            str: The reference '<sha256>.<ext>'.
+        """
+        ref = f"{hashlib.sha256(data).hexdigest()}.{ext.lower()}"
+        target = self.path(ref)
+        if os.path.exists(target):
+            return ref
+
+        os.makedirs(self.root, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, target)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return ref
+
+    def refs(self):
+        """
+        Return the references of every image in this store.
+        """
+        try:
+            return [name for name in os.listdir(self.root) if not name.endswith('.part')]
+        except FileNotFoundError:
+            return []
+
+    def delete(self):
+        """
+        Remove the store and every image in it.
+        """
+        shutil.rmtree(self.root, ignore_errors=True)
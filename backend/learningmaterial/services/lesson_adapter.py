@@ -7,21 +7,20 @@ https://python.langchain.com/docs/concepts/prompt_templates/
 """
 
 import os
-import re
 from langchain_openai import ChatOpenAI
 from langchain.prompts import PromptTemplate
 from langchain.output_parsers import StructuredOutputParser, ResponseSchema
 from dotenv import load_dotenv
 import asyncio
+from asgiref.sync import sync_to_async
 from django.conf import settings
 
-from utils.encryption import decrypt
-from learningmaterial.services.file_extractors import (
-    extract_text_from_pdf, extract_text_from_docx, extract_text_from_pptx
-)
-from learningmaterial.services.file_creators import (
-    create_pdf_from_text, create_docx_from_text, create_pptx_from_text, create_audio_from_text
-)
+from learningmaterial.services.file_extractors import MODE_FULL, MODE_TEXT, iter_text_chunks
+from learningmaterial.services.extraction_cache import get_extracted_content, hash_file
+from learningmaterial.services.extraction_sandbox import ExtractionError
+from learningmaterial.services.file_creators import create_audio_from_text
+from learningmaterial.services.lesson_document import parse_lesson
+from learningmaterial.services.lesson_renderer import download_url, save_adapted_lesson
 
 load_dotenv()
 
@@ -160,40 +159,61 @@ JSON format:
 )
 
 
-def get_base_text(path: str):
+def get_base_text(path: str, material_id=None, mode=MODE_FULL, file_hash=None):
     """
-    Dispatch file to appropriate extractor based on extension and return extracted base text and images.
+    Return extracted base text and images for a lesson file, reusing the extraction cache.
+    Images are resolved against the material's image store when material_id is given;
+    pass MODE_TEXT or MODE_METADATA when the caller does not render image files, and
+    file_hash when the file's sha256 is already known.
+    """
+    return get_extracted_content(path, material_id, mode, file_hash)
+
+
+async def adapt_chunks(chunks, prompt_args):
+    """
+    Adapt a lesson one bounded chunk at a time.
+
+    Each chunk of at most settings.LESSON_CHUNK_CHARS characters is sent in its own
+    adaptation request, so the prompt size does not grow with the document. The first
+    chunk's title and objectives are kept, and the adapted content of every chunk is joined
+    in order.
+
+    Args:
+        chunks (list): Lesson text chunks from file_extractors.iter_text_chunks.
+        prompt_args (dict): Every adapt_prompt variable except text.
+
+    Returns:
+        dict: The parsed adaptation, as for a single request.
     """
-    ext = path.split('.')[-1].lower()
-    if ext == 'pdf':
-        text, images = extract_text_from_pdf(path)
-        return text, [{'images': images}]
-    if ext == 'docx':
-        text, images = extract_text_from_docx(path)
-        return text, [{'images': images}]
-    if ext == 'pptx':
-        slides = extract_text_from_pptx(path)
-        text = "\n\n".join(
-            f"[Slide]\nTitle: {s['title']}\nContent: {s['content']}" for s in slides
-        )
-        return text, slides
-    raise ValueError(f"Unsupported file type: {ext}")
-
-
-async def process_student(material, student, base_text, file_ext, original_slides, return_file):
+    parsed = None
+    for chunk in chunks:
+        adapt_resp = await asyncio.to_thread(llm.invoke, adapt_prompt.format(text=chunk, **prompt_args))
+        part = adapt_parser.parse(adapt_resp.content)
+        if parsed is None:
+            parsed = part
+        else:
+            parsed['adapted_content'] = "\n\n".join(
+                content for content in (parsed.get('adapted_content', ''), part.get('adapted_content', ''))
+                if content)
+    return parsed
+
+
+async def process_student(material, student, base_text, chunks, file_ext, source_hash, return_file):
     """
     Processes a single student's disability information and adapts the lesson accordingly.
 
     This includes classification of the disability, generation of adaptation strategies,
-    creation of adapted content, and optional generation of audio or output files.
+    creation of adapted content, optional generation of audio, and storage of the adaptation
+    for on-demand file rendering.
 
     Args:
         material: The LearningMaterials instance representing the uploaded lesson.
         student: The student object containing disability information.
-        base_text (str): Extracted base text from the original lesson file.
+        base_text (str): Extracted base text from the original lesson file, narrated in full.
+        chunks (list): The same text in bounded chunks, adapted one at a time.
         file_ext (str): The extension of the file (pdf, docx, pptx).
-        original_slides (list or None): Parsed slide data with optional image refs for PPTX.
-        return_file (bool): Whether to create and store adapted output files.
+        source_hash (str): sha256 of the original lesson file.
+        return_file (bool): Whether to store the adaptation and return a download URL.
 
     Returns:
         dict or None: A dictionary with adapted content and metadata, or None if skipped.
@@ -208,6 +228,7 @@ async def process_student(material, student, base_text, file_ext, original_slide
     cls = class_parser.parse(cls_resp.content)
     category = cls['category']
     notes = cls.get('notes', '')
+    await sync_to_async(student.record_disability_category)(category)
 
     # 2. Visual-impairment override
     if category == 'visual_impairment':
@@ -217,16 +238,23 @@ async def process_student(material, student, base_text, file_ext, original_slide
             ' ', '_')
         audio_path = os.path.join(out_dir, fname)
         success = await asyncio.to_thread(create_audio_from_text, base_text, audio_path)
-        return {
-            'student_id': student.id,
-            'disability': info,
-            'category': category,
-            'notes': notes,
+        result = {
             'adapted_title': material.title,
             'adapted_objectives': [],
             'adapted_content': '',
             'audio_url': f"{settings.MEDIA_URL}adapted_output/{fname}" if success else None,
+            'audio_path': f"adapted_output/{fname}" if success else '',
         }
+        if return_file:
+            # Audio-only adaptation: stored so the class bundle includes the track
+            await sync_to_async(save_adapted_lesson)(material, student, result, source_hash)
+        result.update({
+            'student_id': student.id,
+            'disability': info,
+            'category': category,
+            'notes': notes,
+        })
+        return result
 
     # 3. Strategy generation
     strat_input = strategy_prompt.format(category=category, notes=notes)
@@ -246,16 +274,13 @@ async def process_student(material, student, base_text, file_ext, original_slide
         Avoid including any generic tool tips or the original lesson content outside of slide blocks."""
         if file_ext == 'pptx' else ""
     )
-    adapt_input = adapt_prompt.format(
-        disability_info=info,
-        category=category,
-        steps=steps_list,
-        objectives=material.objective or "",
-        text=base_text,
-        slide_instructions=slide_instructions
-    )
-    adapt_resp = await asyncio.to_thread(llm.invoke, adapt_input)
-    parsed = adapt_parser.parse(adapt_resp.content)
+    parsed = await adapt_chunks(chunks, {
+        'disability_info': info,
+        'category': category,
+        'steps': steps_list,
+        'objectives': material.objective or "",
+        'slide_instructions': slide_instructions,
+    })
 
     # 5. Conditional audio
     if any('audio narration' in s.lower() for s in strategy):
@@ -266,48 +291,14 @@ async def process_student(material, student, base_text, file_ext, original_slide
         audio_path = os.path.join(out_dir, fname)
         await asyncio.to_thread(create_audio_from_text, base_text, audio_path)
         parsed['audio_url'] = f"{settings.MEDIA_URL}adapted_output/{fname}"
+        parsed['audio_path'] = f"adapted_output/{fname}"
 
-    # 6. File writing
+    # 6. Store the adaptation; files are rendered on demand by the download endpoint
+    document = parse_lesson(parsed.get('adapted_content', ''))
+    parsed['document'] = document.to_dict()
     if return_file:
-        out_dir = os.path.join(settings.MEDIA_ROOT, 'adapted_output')
-        os.makedirs(out_dir, exist_ok=True)
-        safe_title = material.title.replace(' ', '_').replace('/', '_')
-        user_prefix = f"{student.first_name}_{student.last_name}".replace(
-            ' ', '_').lower()
-        filename = f"{user_prefix}_{safe_title}.{file_ext}"
-        output_path = os.path.join(out_dir, filename)
-        content = parsed.get('adapted_content', '')
-
-        if file_ext == 'pdf':
-            images = original_slides[0]['images'] if original_slides else []
-            await asyncio.to_thread(create_pdf_from_text, content, output_path, images=images)
-
-        elif file_ext == 'docx':
-            images = original_slides[0]['images'] if original_slides else []
-            await asyncio.to_thread(create_docx_from_text, content, output_path, images=images)
-
-        elif file_ext == 'pptx':
-            slides = re.findall(
-                r"\[Slide\]\s*Title:\s*(.*?)\s*Content:\s*(.*?)(?=\n\s*\[Slide\]|\Z)",
-                content,
-                re.DOTALL
-            )
-            slide_pairs = [(t.strip(), c.strip()) for t, c in slides]
-            blacklist = {"Using Support Tools",
-                         "Accessing Audiobooks", "Extended Time Accommodations"}
-            slide_pairs = [(t, c)
-                           for t, c in slide_pairs if t not in blacklist]
-            adapted_slides = []
-            for i, (title, slide_content) in enumerate(slide_pairs):
-                slide_content = slide_content.replace('### Slide', '').strip()
-                images = original_slides[i]['images'] if i < len(
-                    original_slides) else []
-                adapted_slides.append((title, slide_content, images))
-
-            await asyncio.to_thread(create_pptx_from_text, adapted_slides, output_path)
-
-        parsed['file'] = output_path
-        parsed['file_url'] = f"{settings.MEDIA_URL}adapted_output/{filename}"
+        lesson = await sync_to_async(save_adapted_lesson)(material, student, parsed, source_hash)
+        parsed['file_url'] = download_url(lesson, file_ext)
 
     parsed.update({
         'student_id': student.id,
@@ -329,29 +320,31 @@ async def generate_adapted_lessons(material, students, return_file=False):
     Args:
         material: The LearningMaterials instance to adapt.
         students (list): List of student objects assigned to the material.
-        return_file (bool): Whether to generate physical files (PDF/DOCX/PPTX/audio) for each.
+        return_file (bool): Whether to store each adaptation for download (PDF/DOCX/PPTX).
 
     Returns:
-        dict: A mapping of student IDs to their respective adaptation result dictionaries.
+        dict: A mapping of student IDs to their respective adaptation result dictionaries,
+            or {"error", "code"} when the lesson file could not be extracted.
     """
     file_ext = material.file.path.split('.')[-1].lower()
     adapted_lessons = {}
 
-    # If PPTX, extract structured data including images
-    if file_ext == 'pptx':
-        original_slides = extract_text_from_pptx(material.file.path)
-        base_text = "\n\n".join(
-            f"[Slide]\nTitle: {s['title']}\nContent: {s['content']}" for s in original_slides
-        )
-    else:
-        base_text, original_slides = get_base_text(material.file.path)
+    # Cached extraction; only the text is needed here, image bytes are materialised when
+    # a download is first rendered. The file is hashed once, for the cache and the lessons
+    source_hash = await sync_to_async(hash_file)(material.file.path)
+    try:
+        base_text, _ = await sync_to_async(get_base_text)(
+            material.file.path, material.pk, MODE_TEXT, source_hash)
+    except ExtractionError as e:
+        return {"error": e.message, "code": e.code}
+    chunks = list(iter_text_chunks(base_text))
 
     # Run all student adaptations concurrently
     student_tasks = [
-        process_student(material, student, base_text,
-                        file_ext, original_slides, return_file)
+        process_student(material, student, base_text, chunks,
+                        file_ext, source_hash, return_file)
         for student in students
-        if student.disability_info.strip()
+        if student.has_disability_info
     ]
 
     results = await asyncio.gather(*student_tasks)
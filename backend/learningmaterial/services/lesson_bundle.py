@@ -0,0 +1,138 @@
+"""
+Streaming ZIP bundles of a material's adapted lessons.
+
+iter_zip writes a ZIP archive into a small in-memory buffer that is drained after every
+chunk, so the archive is produced while it is being sent: memory use stays flat whatever
+the class size, and nothing is written to a temporary file. Already-compressed formats
+(PDF, DOCX, PPTX, MP3) are stored as-is instead of being deflated a second time.
+
+iter_bundle_entries lists, per student, the adapted lesson (rendered on demand) and the
+narration track, under a per-student folder.
+
+The response has started by the time an entry is reached, so an entry that cannot be
+produced is skipped and listed in errors.txt rather than cutting the archive short.
+"""
+
+import logging
+import os
+import re
+import time
+import zipfile
+
+from django.conf import settings
+
+from learningmaterial.services.extraction_sandbox import ExtractionError
+from learningmaterial.services.lesson_renderer import render_lesson
+
+# Formats that are compressed already; deflating them again only costs CPU
+STORED_EXTENSIONS = {'pdf', 'docx', 'pptx', 'mp3', 'png', 'jpg', 'jpeg', 'zip'}
+
+ZIP_CHUNK_SIZE = 64 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+class _ChunkBuffer:
+    """
+    Write-only, non-seekable file object collecting what zipfile writes until drained.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        """
+        Yield and forget everything written since the last drain.
+        """
+        if self._chunks:
+            data = b"".join(self._chunks)
+            self._chunks = []
+            yield data
+
+
+def _safe_name(value):
+    """
+    Reduce a name to characters that are safe in ZIP entry paths.
+    """
+    return re.sub(r"[^\w.-]+", "_", value).strip("_") or "untitled"
+
+
+def iter_zip(entries, chunk_size=ZIP_CHUNK_SIZE):
+    """
+    Stream a ZIP archive built from (arcname, source) entries.
+
+    Args:
+        entries (iterable): (arcname, source) pairs. A source is a file path, bytes, or a
+            callable returning either; callables run lazily, when their entry is reached.
+            An entry whose callable raises, or whose file cannot be opened, is skipped and
+            listed in errors.txt.
+        chunk_size (int): Read size used when copying files into the archive.
+
+    Yields:
+        bytes: Consecutive pieces of the archive.
+    """
+    buffer = _ChunkBuffer()
+    errors = []
+    with zipfile.ZipFile(buffer, mode='w', allowZip64=True) as archive:
+        for arcname, source in entries:
+            try:
+                if callable(source):
+                    source = source()
+                stream = None if isinstance(source, bytes) else open(source, 'rb')
+            except ExtractionError as e:
+                errors.append(f"{arcname}: {e.message}")
+                continue
+            except Exception:
+                logger.exception("Could not add %s to a lesson bundle", arcname)
+                errors.append(f"{arcname}: This file could not be produced.")
+                continue
+
+            ext = arcname.rsplit('.', 1)[-1].lower()
+            info = zipfile.ZipInfo(arcname, time.localtime()[:6])
+            info.external_attr = 0o644 << 16
+            info.compress_type = zipfile.ZIP_STORED if ext in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+            with archive.open(info, mode='w', force_zip64=True) as entry:
+                if stream is None:
+                    entry.write(source)
+                else:
+                    with stream:
+                        for chunk in iter(lambda: stream.read(chunk_size), b""):
+                            entry.write(chunk)
+                            yield from buffer.drain()
+            yield from buffer.drain()
+
+        if errors:
+            archive.writestr("errors.txt", "\n".join(errors) + "\n")
+    yield from buffer.drain()
+
+
+def iter_bundle_entries(lessons, file_format=None):
+    """
+    Yield (arcname, source) entries for every adapted lesson of a material.
+
+    Each student gets a folder named after them with the adapted lesson rendered in
+    file_format (the material's own format by default) and, when present, the audio track.
+
+    Args:
+        lessons (iterable): AdaptedLesson instances with material and student loaded.
+        file_format (str, optional): One of lesson_renderer.RENDER_FORMATS.
+    """
+    for lesson in lessons:
+        material, student = lesson.material, lesson.student
+        fmt = file_format or material.file.name.rsplit('.', 1)[-1].lower()
+        folder = _safe_name(f"{student.first_name}_{student.last_name}_{student.pk}")
+        title = _safe_name(lesson.adapted_title or material.title)
+
+        if lesson.has_document:
+            yield f"{folder}/{title}.{fmt}", (lambda lesson=lesson, fmt=fmt: render_lesson(lesson, fmt))
+        if lesson.audio_path:
+            audio = os.path.join(settings.MEDIA_ROOT, lesson.audio_path)
+            if os.path.exists(audio):
+                yield f"{folder}/{title}.mp3", audio
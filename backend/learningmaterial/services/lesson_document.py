@@ -0,0 +1,240 @@
+"""
+Typed document tree for adapted lesson content.
+
+The LLM returns adapted_content as loosely formatted text: **Heading** lines, "Label:"
+paragraphs, bullets, [IMAGE_n] placeholders and, for presentations, [Slide] blocks.
+parse_lesson reads that text once into a LessonDocument, which every renderer in
+file_creators.py consumes, so PDF, DOCX and PPTX outputs share one interpretation of it.
+
+A LessonDocument round-trips through to_dict/from_dict, so it can be stored next to the
+adaptation result and rendered again later without re-parsing.
+"""
+
+import re
+from dataclasses import asdict, dataclass, field
+
+# Trailing boilerplate the LLM tends to append after the lesson itself
+TRAILER_PATTERNS = (r"Tips for Using Tools:", r"Remember,")
+
+# Generic slides the LLM adds that do not belong in the student's deck
+SLIDE_BLACKLIST = {"Using Support Tools", "Accessing Audiobooks", "Extended Time Accommodations"}
+
+_HEADING_PREFIX = re.compile(r"^\[Heading \d+\]\s*")
+_BOLD_HEADING = re.compile(r"^\*\*(.+?)\*\*(?::)?$")
+_BOLD_LABEL = re.compile(r"^\*\*(.+?)\*\*:\s*(.*)$")
+_BULLET = re.compile(r"^[\-\*•]\s+(.*)$")
+_IMAGE = re.compile(r"^\[IMAGE_(\d+)\]")
+_SLIDE = re.compile(r"\[Slide\]\s*Title:\s*(.*?)\s*Content:\s*(.*?)(?=\n\s*\[Slide\]|\Z)", re.DOTALL)
+
+
+@dataclass
+class Heading:
+    """
+    A section heading.
+    """
+    text: str
+    kind: str = "heading"
+
+
+@dataclass
+class Paragraph:
+    """
+    A body paragraph, optionally introduced by a bold label. An empty text is a blank line.
+    """
+    text: str
+    label: str = ""
+    kind: str = "paragraph"
+
+
+@dataclass
+class BulletList:
+    """
+    Consecutive bullet points.
+    """
+    items: list = field(default_factory=list)
+    kind: str = "bullets"
+
+
+@dataclass
+class ImageSlot:
+    """
+    Placeholder for the n-th image extracted from the original lesson file.
+    """
+    index: int
+    kind: str = "image"
+
+
+@dataclass
+class Slide:
+    """
+    One presentation slide: a title and its content lines.
+    """
+    title: str
+    content: str
+
+
+BLOCK_TYPES = {cls.kind: cls for cls in (Heading, Paragraph, BulletList, ImageSlot)}
+
+
+@dataclass
+class LessonDocument:
+    """
+    Parsed adapted lesson.
+
+    Attributes:
+        title (str): Document title, inferred from the first line when not given.
+        blocks (list): Heading, Paragraph, BulletList and ImageSlot blocks in reading order.
+        slides (list): Slide blocks when the content was written as [Slide] blocks; empty
+            otherwise, in which case to_slides derives slides from the headings.
+    """
+    title: str = ""
+    blocks: list = field(default_factory=list)
+    slides: list = field(default_factory=list)
+
+    def to_dict(self):
+        """
+        Return a JSON-serialisable representation of the document.
+        """
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Rebuild a document from to_dict output.
+        """
+        return cls(
+            title=data.get("title", ""),
+            blocks=[BLOCK_TYPES[block["kind"]](**block) for block in data.get("blocks", [])],
+            slides=[Slide(**slide) for slide in data.get("slides", [])],
+        )
+
+    def to_slides(self):
+        """
+        Return the document as slides: the explicit [Slide] blocks, or one slide per heading.
+        """
+        if self.slides:
+            return list(self.slides)
+
+        slides = []
+        title, lines = self.title, []
+        for block in self.blocks:
+            if isinstance(block, Heading):
+                if lines or slides:
+                    slides.append(Slide(title, "\n".join(lines)))
+                title, lines = block.text, []
+            elif isinstance(block, Paragraph) and block.text:
+                lines.append(f"{block.label}: {block.text}" if block.label else block.text)
+            elif isinstance(block, BulletList):
+                lines.extend(f"• {item}" for item in block.items)
+        if lines or not slides:
+            slides.append(Slide(title, "\n".join(lines)))
+        return slides
+
+    def slide_pairs(self, original_slides=None):
+        """
+        Return (title, content, images) tuples for create_pptx_from_text, pairing the n-th
+        slide with the images of the n-th original slide.
+        """
+        original_slides = original_slides or []
+        return [
+            (slide.title, slide.content, original_slides[i]['images'] if i < len(original_slides) else [])
+            for i, slide in enumerate(self.to_slides())
+        ]
+
+
+def strip_trailer(text):
+    """
+    Drop the generic tips/reminders the LLM appends after the lesson.
+    """
+    for pattern in TRAILER_PATTERNS:
+        text = re.split(pattern, text)[0]
+    return text
+
+
+def _parse_slides(text):
+    """
+    Return the Slide blocks of [Slide]-formatted content, minus blacklisted generic slides.
+    """
+    slides = []
+    for title, content in _SLIDE.findall(text):
+        title = title.strip()
+        if title in SLIDE_BLACKLIST:
+            continue
+        slides.append(Slide(title, content.strip().replace('### Slide', '').strip()))
+    return slides
+
+
+def _parse_line(line, blocks):
+    """
+    Append the block for one non-blank line, extending a preceding bullet list.
+    """
+    if _HEADING_PREFIX.match(line):
+        blocks.append(Heading(_HEADING_PREFIX.sub("", line)))
+        return
+
+    m = _BOLD_HEADING.match(line)
+    if m:
+        blocks.append(Heading(m.group(1).strip()))
+        return
+
+    m = _BOLD_LABEL.match(line)
+    if m:
+        blocks.append(Paragraph(m.group(2).strip(), label=m.group(1).strip()))
+        return
+
+    # Generic heading: ends with ':'
+    if line.endswith(':') and line[0] not in ('-', '*', '•'):
+        blocks.append(Heading(line.rstrip(':')))
+        return
+
+    m = _BULLET.match(line)
+    if m:
+        if blocks and isinstance(blocks[-1], BulletList):
+            blocks[-1].items.append(m.group(1).strip())
+        else:
+            blocks.append(BulletList([m.group(1).strip()]))
+        return
+
+    m = _IMAGE.match(line)
+    if m:
+        blocks.append(ImageSlot(int(m.group(1))))
+        return
+
+    blocks.append(Paragraph(line))
+
+
+def parse_lesson(text, title=None):
+    """
+    Parse adapted lesson content into a LessonDocument in a single pass.
+
+    Args:
+        text (str): The adapted_content returned by the LLM.
+        title (str, optional): Document title; defaults to the first non-blank line.
+
+    Returns:
+        LessonDocument: The parsed document.
+    """
+    body = strip_trailer(text or "")
+    slides = _parse_slides(body)
+    if slides:
+        # Keep a flowing version of the deck for document formats; the first slide's
+        # title doubles as the document title
+        if title is None:
+            title = slides[0].title
+        body = "\n".join(
+            (f"**{slide.title}**\n" if i else "") + slide.content for i, slide in enumerate(slides))
+
+    blocks = []
+    for raw in body.splitlines():
+        line = raw.strip()
+        if title is None:
+            if line:
+                m = _BOLD_HEADING.match(line)
+                title = m.group(1).strip() if m else _HEADING_PREFIX.sub("", line)
+            continue
+        if not line:
+            blocks.append(Paragraph(""))
+            continue
+        _parse_line(line, blocks)
+
+    return LessonDocument(title=title or "", blocks=blocks, slides=slides)
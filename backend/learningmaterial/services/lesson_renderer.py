@@ -0,0 +1,214 @@
+"""
+Render-on-demand for adapted lessons.
+
+Adaptation stores an AdaptedLesson instead of writing output files. When a download is
+requested, render_lesson turns the stored LessonDocument into the requested format and
+caches the file under MEDIA_ROOT/rendered_lessons/, keyed by the lesson's content hash and
+the format. Identical adaptations share one rendered file, and nothing is rendered for
+lessons nobody opens.
+
+PPTX adaptations of a PPTX lesson are written into a copy of the original deck
+(PPTX_IN_PLACE), keeping its layouts, masters and images; other combinations are rebuilt
+from the extracted images.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core import signing
+from django.urls import reverse
+
+from learningmaterial.models import AdaptedLesson
+from learningmaterial.services.extraction_cache import get_extracted_content
+from learningmaterial.services.file_creators import (
+    render_docx, render_pdf, render_pptx, render_pptx_in_place
+)
+from learningmaterial.services.file_extractors import EXTRACTOR_VERSION, MODE_FULL
+from learningmaterial.services.lesson_document import LessonDocument
+
+# Bump whenever renderer output changes, so previously rendered files are not reused
+RENDER_VERSION = "2"
+
+# Adapt PPTX lessons inside the original deck instead of rebuilding it
+PPTX_IN_PLACE = True
+
+RENDER_FORMATS = ('pdf', 'docx', 'pptx')
+
+# Lifetime in seconds of the signed download links returned by the adapt endpoint
+DOWNLOAD_LINK_MAX_AGE = 60 * 60
+DOWNLOAD_SIGNING_SALT = "learningmaterial.download"
+
+CONTENT_TYPES = {
+    'pdf': 'application/pdf',
+    'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    'pptx': 'application/vnd.openxmlformats-officedocument.presentationml.presentation',
+}
+
+
+def compute_content_hash(document, source_hash):
+    """
+    Return the sha256 identifying the rendered output of an adaptation.
+
+    Args:
+        document (dict): LessonDocument.to_dict() of the adaptation.
+        source_hash (str): sha256 of the original lesson file, which determines its images.
+    """
+    payload = json.dumps({
+        'document': document,
+        'source': source_hash,
+        'extractor': EXTRACTOR_VERSION,
+        'renderer': RENDER_VERSION,
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def save_adapted_lesson(material, student, parsed, source_hash):
+    """
+    Store (or replace) a student's adaptation of a material.
+
+    Args:
+        material (LearningMaterials): The adapted material.
+        student (Student): The student the adaptation is for.
+        parsed (dict): The adaptation result, including the serialised 'document' and, when
+            narration was generated, the MEDIA_ROOT-relative 'audio_path'.
+        source_hash (str): sha256 of the material's file.
+
+    Returns:
+        AdaptedLesson: The saved lesson.
+    """
+    previous = AdaptedLesson.objects.filter(material=material, student=student).values(
+        'content_hash', 'audio_path').first()
+    lesson, _ = AdaptedLesson.objects.update_or_create(
+        material=material,
+        student=student,
+        defaults={
+            'adapted_title': str(parsed.get('adapted_title', ''))[:255],
+            'adapted_objectives': parsed.get('adapted_objectives') or [],
+            'adapted_content': parsed.get('adapted_content', ''),
+            'document': parsed.get('document') or {},
+            'content_hash': compute_content_hash(parsed.get('document') or {}, source_hash),
+            'audio_path': parsed.get('audio_path', ''),
+        }
+    )
+    if previous:
+        # A regenerated lesson no longer needs the files of its previous version
+        discard_lesson_files(
+            previous['content_hash'] if previous['content_hash'] != lesson.content_hash else '',
+            previous['audio_path'] if previous['audio_path'] != lesson.audio_path else '')
+    return lesson
+
+
+def _download_signer():
+    return signing.TimestampSigner(salt=DOWNLOAD_SIGNING_SALT)
+
+
+def download_url(lesson, file_format):
+    """
+    Return a signed API path that serves a lesson in the given format.
+
+    The signature lets a plain browser link (which cannot send the JWT) download this one
+    student's lesson for DOWNLOAD_LINK_MAX_AGE seconds; see check_download_signature.
+    """
+    path = reverse('learning-materials-download', kwargs={
+        'pk': lesson.material_id, 'student_id': lesson.student_id, 'file_format': file_format})
+    signature = _download_signer().sign(f"{lesson.material_id}:{lesson.student_id}").rsplit(':', 2)
+    return f"{path}?{urlencode({'issued': signature[1], 'signature': signature[2]})}"
+
+
+def check_download_signature(material_id, student_id, params):
+    """
+    Return whether the issued/signature query parameters of a download link are valid and
+    unexpired for this material and student.
+    """
+    issued, signature = params.get('issued'), params.get('signature')
+    if not issued or not signature:
+        return False
+    try:
+        _download_signer().unsign(f"{material_id}:{student_id}:{issued}:{signature}",
+                                  max_age=DOWNLOAD_LINK_MAX_AGE)
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def rendered_path(lesson, file_format):
+    """
+    Return where the rendered file for (content hash, format) is cached.
+    """
+    return _rendered_file(lesson.content_hash, file_format)
+
+
+def _rendered_file(content_hash, file_format):
+    return os.path.join(settings.MEDIA_ROOT, 'rendered_lessons', f"{content_hash}.{file_format}")
+
+
+def discard_lesson_files(content_hash='', audio_path=''):
+    """
+    Delete the rendered files of a content hash and a narration track once no stored lesson
+    uses them any more.
+
+    Args:
+        content_hash (str, optional): Content hash whose rendered files may be deleted.
+        audio_path (str, optional): MEDIA_ROOT-relative path of a narration track.
+    """
+    paths = []
+    if content_hash and not AdaptedLesson.objects.filter(content_hash=content_hash).exists():
+        paths += [_rendered_file(content_hash, file_format) for file_format in RENDER_FORMATS]
+    if audio_path and not AdaptedLesson.objects.filter(audio_path=audio_path).exists():
+        paths.append(os.path.join(settings.MEDIA_ROOT, audio_path))
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def render_lesson(lesson, file_format):
+    """
+    Return the path of the lesson rendered in file_format, rendering it on a cache miss.
+
+    Args:
+        lesson (AdaptedLesson): The stored adaptation.
+        file_format (str): One of RENDER_FORMATS.
+
+    Returns:
+        str: Path of the rendered file.
+
+    Raises:
+        ExtractionError: If the original file's images cannot be extracted.
+    """
+    target = rendered_path(lesson, file_format)
+    if os.path.exists(target):
+        return target
+
+    material = lesson.material
+    document = LessonDocument.from_dict(lesson.document)
+    in_place = (PPTX_IN_PLACE and file_format == 'pptx'
+                and material.file.name.lower().endswith('.pptx'))
+    if not in_place:
+        _, original_slides = get_extracted_content(material.file.path, material.pk, MODE_FULL)
+
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target), suffix=f'.{file_format}')
+    os.close(fd)
+    try:
+        if in_place:
+            # No extraction needed: the original deck already holds the images
+            render_pptx_in_place(document, material.file.path, tmp_path)
+        elif file_format == 'pptx':
+            render_pptx(document, tmp_path, original_slides)
+        else:
+            images = [img for slide in original_slides for img in slide.get('images', [])]
+            renderer = render_pdf if file_format == 'pdf' else render_docx
+            renderer(document, tmp_path, images=images)
+        # Concurrent renders of the same lesson produce identical files; last rename wins
+        os.replace(tmp_path, target)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return target
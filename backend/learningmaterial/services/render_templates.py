@@ -0,0 +1,160 @@
+"""
+Pre-styled base documents that the DOCX and PPTX renderers clone for every output.
+
+Rendering a class worth of adapted lessons used to rebuild the same styling for each
+student: a fresh Document() with the Normal style re-applied, and for PPTX every title
+box and content text box created and filled, coloured and sized shape by shape.
+
+This module prepares that styling once per process instead:
+
+- new_docx() opens a copy of a saved, already styled DOCX;
+- new_presentation() opens a copy of a saved base presentation, and add_titled_slide /
+  add_content_box deep-copy prototype shapes whose fill, fonts and colours are already set,
+  so only their text changes per slide.
+"""
+
+import copy
+import functools
+import io
+
+from docx import Document
+from docx.shared import Pt as DocxPt
+from pptx import Presentation
+from pptx.dml.color import RGBColor
+from pptx.enum.shapes import MSO_SHAPE
+from pptx.oxml.ns import qn
+from pptx.text.text import _Run
+from pptx.util import Inches, Pt
+
+# Blank slide layout of the default template
+BLANK_LAYOUT = 6
+
+
+@functools.lru_cache(maxsize=None)
+def _docx_base():
+    """
+    Return the bytes of an empty DOCX with the renderer's Normal style applied.
+    """
+    doc = Document()
+    style = doc.styles['Normal']
+    style.font.name = 'Calibri'
+    style.font.size = DocxPt(11)
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def new_docx():
+    """
+    Return a new python-docx Document cloned from the styled base document.
+    """
+    return Document(io.BytesIO(_docx_base()))
+
+
+class _PptxTemplate:
+    """
+    Base presentation bytes plus the prototype shapes every rendered slide is built from.
+
+    Attributes:
+        base (bytes): An empty presentation using the default slide masters and layouts.
+        title_sp (lxml element): Rounded, filled title box with one formatted run.
+        content_sp (lxml element): Word-wrapped content text box without paragraphs.
+        content_p (lxml element): One formatted content paragraph with a single run.
+    """
+
+    def __init__(self):
+        prs = Presentation()
+        buffer = io.BytesIO()
+        prs.save(buffer)
+        self.base = buffer.getvalue()
+
+        slide = prs.slides.add_slide(prs.slide_layouts[BLANK_LAYOUT])
+        title_box = slide.shapes.add_shape(
+            MSO_SHAPE.ROUNDED_RECTANGLE,
+            Inches(0.5), Inches(0.3), Inches(9), Inches(1)
+        )
+        title_box.fill.solid()
+        title_box.fill.fore_color.rgb = RGBColor(91, 155, 213)
+        tb = title_box.text_frame
+        tb.text = " "
+        p = tb.paragraphs[0]
+        p.font.size = Pt(36)
+        p.font.bold = True
+        p.font.color.rgb = RGBColor(255, 255, 255)
+        self.title_sp = title_box._element
+
+        content_box = slide.shapes.add_textbox(
+            Inches(0.7), Inches(1.5), Inches(8), Inches(4)
+        )
+        tf = content_box.text_frame
+        tf.word_wrap = True
+        paragraph = tf.paragraphs[0]
+        paragraph.text = " "
+        paragraph.level = 0
+        paragraph.font.size = Pt(20)
+        paragraph.font.name = "Calibri"
+        paragraph.font.color.rgb = RGBColor(50, 50, 50)
+        self.content_p = paragraph._p
+        self.content_sp = content_box._element
+        self.content_sp.find(qn('p:txBody')).remove(self.content_p)
+
+
+@functools.lru_cache(maxsize=None)
+def _pptx_template():
+    """
+    Build the PPTX template once per process.
+    """
+    return _PptxTemplate()
+
+
+def new_presentation():
+    """
+    Return a new python-pptx Presentation cloned from the base presentation.
+    """
+    return Presentation(io.BytesIO(_pptx_template().base))
+
+
+def _set_run_text(element, text):
+    """
+    Set the text of the first run in a cloned shape or paragraph.
+    """
+    _Run(element.find('.//' + qn('a:r')), None).text = text
+
+
+def add_titled_slide(prs, title):
+    """
+    Append a blank slide carrying a clone of the styled title box.
+
+    Args:
+        prs (Presentation): Presentation from new_presentation().
+        title (str): Title text; line breaks are flattened to spaces.
+
+    Returns:
+        Slide: The new slide.
+    """
+    slide = prs.slides.add_slide(prs.slide_layouts[BLANK_LAYOUT])
+    title_sp = copy.deepcopy(_pptx_template().title_sp)
+    _set_run_text(title_sp, " ".join(title.split()))
+    slide.shapes._spTree.insert_element_before(title_sp, 'p:extLst')
+    return slide
+
+
+def add_content_box(slide, lines):
+    """
+    Add a clone of the styled content text box holding one paragraph per non-blank line.
+    """
+    template = _pptx_template()
+    content_sp = copy.deepcopy(template.content_sp)
+    tx_body = content_sp.find(qn('p:txBody'))
+    for line in lines:
+        if not line.strip():
+            continue
+        paragraph = copy.deepcopy(template.content_p)
+        _set_run_text(paragraph, line.strip())
+        tx_body.append(paragraph)
+    if tx_body.find(qn('a:p')) is None:
+        # A text body needs at least one paragraph
+        paragraph = copy.deepcopy(template.content_p)
+        paragraph.remove(paragraph.find(qn('a:r')))
+        tx_body.append(paragraph)
+    slide.shapes._spTree.insert_element_before(content_sp, 'p:extLst')
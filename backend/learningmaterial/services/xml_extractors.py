@@ -0,0 +1,329 @@
+"""
+Lightweight DOCX and PPTX extraction straight from the zip container.
+
+Instead of building the full python-docx/python-pptx object model, these extractors read
+word/document.xml and ppt/slides/*.xml with an incremental XML parser and resolve image
+parts through the package relationships. They produce the same units as the object-model
+extractors in file_extractors.py and raise UnsupportedPackage on anything they do not
+understand, so callers can fall back to the object model.
+
+Uploaded documents are untrusted, so their XML is parsed with defusedxml, which rejects
+entity declarations and external references (billion laughs, XXE) with a
+DefusedXmlException; that is never treated as an unsupported package.
+"""
+
+import posixpath
+import zipfile
+
+import defusedxml.ElementTree as ET
+from defusedxml import DefusedXmlException
+
+W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+P = '{http://schemas.openxmlformats.org/presentationml/2006/main}'
+A = '{http://schemas.openxmlformats.org/drawingml/2006/main}'
+R = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+PKG_REL = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+RT_OFFICE_DOCUMENT = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument'
+RT_IMAGE = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/image'
+RT_STYLES = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles'
+
+# Same special-case names python-docx translates from styles.xml to UI names
+UI_STYLE_NAMES = {
+    'caption': 'Caption', 'footer': 'Footer', 'header': 'Header',
+    **{f'heading {level}': f'Heading {level}' for level in range(1, 10)},
+}
+
+
+class UnsupportedPackage(Exception):
+    """
+    Raised when a package uses a feature the lightweight extractors do not handle.
+    """
+
+
+def _rels_path(partname):
+    """
+    Return the zip member holding the relationships of a part, e.g. word/_rels/document.xml.rels.
+    """
+    directory, name = posixpath.split(partname.lstrip('/'))
+    return posixpath.join(directory, '_rels', f'{name}.rels')
+
+
+def _read_rels(package, partname):
+    """
+    Parse a part's relationships into {rId: (type, target partname)}, in document order.
+    External targets are kept as None.
+    """
+    try:
+        root = ET.fromstring(package.read(_rels_path(partname)))
+    except KeyError:
+        return {}
+    base = posixpath.dirname('/' + partname.lstrip('/'))
+    rels = {}
+    for rel in root.iter(f'{PKG_REL}Relationship'):
+        target = None
+        if rel.get('TargetMode') != 'External':
+            target = posixpath.normpath(posixpath.join(base, rel.get('Target')))
+        rels[rel.get('Id')] = (rel.get('Type'), target)
+    return rels
+
+
+def _main_part(package):
+    """
+    Return the partname of the package's main document from the root relationships.
+    """
+    for rel_type, target in _read_rels(package, '/').values():
+        if rel_type == RT_OFFICE_DOCUMENT and target:
+            return target
+    raise UnsupportedPackage("No officeDocument relationship")
+
+
+def _store_image(package, partname, store):
+    """
+    Build an image entry for a package part, writing its bytes when a store is given.
+    """
+    entry = {'part': partname}
+    if store is not None:
+        ref = store.put(package.read(partname.lstrip('/')), partname.rsplit('.', 1)[-1].lower())
+        entry = {'ref': ref, 'path': store.path(ref), **entry}
+    return entry
+
+
+def _open_package(path):
+    """
+    Open a DOCX/PPTX zip container, reporting corrupt archives as unsupported.
+    """
+    try:
+        return zipfile.ZipFile(path)
+    except (zipfile.BadZipFile, OSError) as e:
+        raise UnsupportedPackage(str(e)) from e
+
+
+def _docx_styles(package, document_part):
+    """
+    Map paragraph style ids to UI names and find the default paragraph style name.
+    """
+    styles_part = next(
+        (target for rel_type, target in _read_rels(package, document_part).values() if rel_type == RT_STYLES),
+        None)
+    if styles_part is None:
+        raise UnsupportedPackage("No styles part")
+
+    names = {}
+    default = None
+    for style in ET.fromstring(package.read(styles_part.lstrip('/'))).iter(f'{W}style'):
+        if style.get(f'{W}type', 'paragraph') != 'paragraph':
+            continue
+        name_elm = style.find(f'{W}name')
+        name = name_elm.get(f'{W}val') if name_elm is not None else None
+        name = UI_STYLE_NAMES.get(name, name)
+        names[style.get(f'{W}styleId')] = name
+        # Like python-docx, only an explicitly typed style can be the default
+        if style.get(f'{W}type') == 'paragraph' and style.get(f'{W}default') in ('1', 'true', 'on'):
+            default = name
+    return names, default
+
+
+def _docx_run_text(run):
+    """
+    Return the text of a w:r element the way python-docx renders it.
+    """
+    parts = []
+    for child in run:
+        tag = child.tag
+        if tag == f'{W}t':
+            parts.append(child.text or '')
+        elif tag in (f'{W}tab', f'{W}ptab'):
+            parts.append('\t')
+        elif tag == f'{W}br':
+            parts.append('\n' if child.get(f'{W}type', 'textWrapping') == 'textWrapping' else '')
+        elif tag == f'{W}cr':
+            parts.append('\n')
+        elif tag == f'{W}noBreakHyphen':
+            parts.append('-')
+    return ''.join(parts)
+
+
+def _docx_paragraph(paragraph, styles, default_style):
+    """
+    Return (style name, text) for a body-level w:p element.
+    """
+    style_elm = paragraph.find(f'{W}pPr/{W}pStyle')
+    style_id = style_elm.get(f'{W}val') if style_elm is not None else None
+    style = styles.get(style_id) or default_style
+    if style is None:
+        raise UnsupportedPackage("Paragraph without a resolvable style")
+
+    parts = []
+    for child in paragraph:
+        if child.tag == f'{W}r':
+            parts.append(_docx_run_text(child))
+        elif child.tag == f'{W}hyperlink':
+            parts.extend(_docx_run_text(run) for run in child.findall(f'{W}r'))
+    return style, ''.join(parts)
+
+
+def iter_docx_paragraphs_xml(path, images=True, store=None):
+    """
+    Stream a DOCX file as (text, images) units without python-docx.
+
+    Yields the same units as file_extractors.iter_docx_paragraphs: one per non-empty
+    body paragraph (headings prefixed with their style name), then one per image part.
+
+    Args:
+        path (str): Filesystem path of the DOCX file.
+        images (bool): Whether to yield image units at all.
+        store (ImageStore, optional): Write image bytes to this store; without it only
+            the part name of each image is returned.
+
+    Raises:
+        UnsupportedPackage: If the package cannot be read by this engine.
+    """
+    with _open_package(path) as package:
+        try:
+            document_part = _main_part(package)
+            styles, default_style = _docx_styles(package, document_part)
+            stack = []
+            body = None
+            with package.open(document_part.lstrip('/')) as stream:
+                for event, elem in ET.iterparse(stream, events=('start', 'end')):
+                    if event == 'start':
+                        stack.append(elem.tag)
+                        if elem.tag == f'{W}body' and len(stack) == 2:
+                            body = elem
+                        continue
+                    stack.pop()
+                    if len(stack) != 2 or stack[-1] != f'{W}body':
+                        continue
+                    # A direct child of w:body is complete
+                    if elem.tag == f'{W}p':
+                        style, text = _docx_paragraph(elem, styles, default_style)
+                        text = text.strip()
+                        if text:
+                            yield (f"[{style}] {text}" if "heading" in style.lower() else text), []
+                    body.remove(elem)
+
+            if not images:
+                return
+
+            for rel_type, target in _read_rels(package, document_part).values():
+                if rel_type != RT_IMAGE:
+                    continue
+                if target is None:
+                    raise UnsupportedPackage("Linked (external) image")
+                yield "", [_store_image(package, target, store)]
+        except (KeyError, ET.ParseError) as e:
+            raise UnsupportedPackage(str(e)) from e
+
+
+def _pptx_paragraph_text(paragraph):
+    """
+    Return the text of an a:p element the way python-pptx renders it.
+    """
+    parts = []
+    for child in paragraph:
+        if child.tag in (f'{A}r', f'{A}fld'):
+            t = child.find(f'{A}t')
+            parts.append((t.text or '') if t is not None else '')
+        elif child.tag == f'{A}br':
+            parts.append('\v')
+    return ''.join(parts)
+
+
+def _pptx_picture(pic, slide_rels, package, store):
+    """
+    Return the image entry for a top-level p:pic element, with its position and size.
+    """
+    blip = pic.find(f'{P}blipFill/{A}blip')
+    r_id = blip.get(f'{R}embed') if blip is not None else None
+    xfrm = pic.find(f'{P}spPr/{A}xfrm')
+    if r_id is None or xfrm is None:
+        # Linked images and inherited placeholder geometry need the object model
+        raise UnsupportedPackage("Picture without embedded image or explicit geometry")
+    rel_type, target = slide_rels.get(r_id, (None, None))
+    if target is None:
+        raise UnsupportedPackage("Picture relationship cannot be resolved")
+
+    off, ext = xfrm.find(f'{A}off'), xfrm.find(f'{A}ext')
+    if off is None or ext is None:
+        raise UnsupportedPackage("Incomplete picture geometry")
+    entry = _store_image(package, target, store)
+    entry.update({
+        "left":   int(off.get('x')),
+        "top":    int(off.get('y')),
+        "width":  int(ext.get('cx')),
+        "height": int(ext.get('cy')),
+    })
+    return entry
+
+
+def _pptx_slide(package, slide_part, images, store):
+    """
+    Parse one slide part incrementally into the slide dict used by the extractors.
+    """
+    slide_rels = _read_rels(package, slide_part)
+    title = ""
+    content = ""
+    slide_images = []
+    stack = []
+    with package.open(slide_part.lstrip('/')) as stream:
+        for event, elem in ET.iterparse(stream, events=('start', 'end')):
+            if event == 'start':
+                stack.append(elem.tag)
+                continue
+            stack.pop()
+            # Only top-level shapes: p:sld / p:cSld / p:spTree / <shape>
+            if len(stack) != 3 or stack[-1] != f'{P}spTree':
+                continue
+
+            if elem.tag == f'{P}sp':
+                paragraphs = elem.findall(f'{P}txBody/{A}p')
+                text = "\n".join(
+                    t.strip() for t in map(_pptx_paragraph_text, paragraphs) if t.strip())
+                if text:
+                    ph = elem.find(f'{P}nvSpPr/{P}nvPr/{P}ph')
+                    if ph is not None and ph.get('type', 'obj') == 'title':
+                        title = text
+                    else:
+                        content += text + "\n"
+            elif elem.tag == f'{P}pic' and images:
+                slide_images.append(_pptx_picture(elem, slide_rels, package, store))
+            elem.clear()
+
+    return {
+        "title":   title,
+        "content": content.strip(),
+        "images":  slide_images
+    }
+
+
+def iter_pptx_slides_xml(path, images=True, store=None):
+    """
+    Stream a PowerPoint file one slide at a time without python-pptx.
+
+    Yields the same slide dicts as file_extractors.iter_pptx_slides.
+
+    Args:
+        path (str): Filesystem path of the PPTX file.
+        images (bool): Whether to collect picture shapes.
+        store (ImageStore, optional): Write image bytes to this store; without it only
+            the part name and geometry of each image is returned.
+
+    Raises:
+        UnsupportedPackage: If the package cannot be read by this engine.
+    """
+    with _open_package(path) as package:
+        try:
+            presentation_part = _main_part(package)
+            presentation_rels = _read_rels(package, presentation_part)
+            presentation = ET.fromstring(package.read(presentation_part.lstrip('/')))
+            slide_ids = presentation.findall(f'{P}sldIdLst/{P}sldId')
+            for slide_id in slide_ids:
+                _, slide_part = presentation_rels.get(slide_id.get(f'{R}id'), (None, None))
+                if slide_part is None:
+                    raise UnsupportedPackage("Slide relationship cannot be resolved")
+                yield _pptx_slide(package, slide_part, images, store)
+        except DefusedXmlException:
+            raise
+        except (KeyError, ET.ParseError, TypeError, ValueError) as e:
+            raise UnsupportedPackage(str(e)) from e
@@ -0,0 +1,46 @@
+"""
+Signal handlers for the 'learningmaterial' app.
+
+Removes the files a material or an adapted lesson leaves on disk once it is deleted.
+"""
+
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from .models import AdaptedLesson, LearningMaterials
+from .services.image_normalizer import clear_normalized_images
+from .services.image_store import ImageStore
+from .services.lesson_renderer import discard_lesson_files
+
+
+@receiver(post_delete, sender=LearningMaterials)
+def clean_up_extracted_images(sender, instance, **kwargs):
+    """
+    Signal handler that garbage-collects the material's content-addressed image store and
+    the normalised copies of its images.
+
+    The material's adapted lessons are deleted by cascade, each cleaned up by
+    clean_up_adapted_lesson.
+
+    Args:
+        sender (Model): The model class sending the signal (LearningMaterials).
+        instance (LearningMaterials): The instance that was deleted.
+        **kwargs: Additional keyword arguments.
+    """
+    store = ImageStore.for_material(instance.pk)
+    refs = store.refs()
+    store.delete()
+    clear_normalized_images(refs)
+
+
+@receiver(post_delete, sender=AdaptedLesson)
+def clean_up_adapted_lesson(sender, instance, **kwargs):
+    """
+    Signal handler that deletes the lesson's rendered files and narration track, unless
+    another lesson shares them.
+
+    Args:
+        sender (Model): The model class sending the signal (AdaptedLesson).
+        instance (AdaptedLesson): The instance that was deleted.
+        **kwargs: Additional keyword arguments.
+    """
+    discard_lesson_files(instance.content_hash, instance.audio_path)
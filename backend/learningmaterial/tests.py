@@ -1,3 +1,801 @@
-from django.test import TestCase
+"""
+Tests for the learningmaterial services and endpoints.
 
-# Create your tests here.
+Covers the extraction cache shared by the upload alignment check and lesson adaptation,
+the content-addressed image store, the extraction modes, parallel PDF extraction,
+streaming chunked extraction, the zip/XML DOCX/PPTX engine, the extraction sandbox,
+image normalisation, template-cloned rendering, the lesson document model, on-demand
+adapted lesson downloads and bundles, and the benchmark suite.
+"""
+
+import io
+import os
+import tempfile
+import threading
+import time
+import zipfile
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+import fitz
+from defusedxml import DefusedXmlException
+from django.contrib.auth.models import User
+from django.core.files import File
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from PIL import Image
+from docx import Document
+from pptx import Presentation
+from pptx.enum.shapes import MSO_SHAPE_TYPE
+from pptx.util import Inches
+
+from learningmaterial.benchmarks.corpus import generate_docx, generate_pdf, generate_pptx
+from learningmaterial.benchmarks.suite import compare_results, run_suite
+from classes.models import Classes
+from learningmaterial.models import AdaptedLesson, ExtractedContent, LearningMaterials
+from students.models import Student
+from teachers.models import Teacher
+from learningmaterial.services import (
+    extraction_cache, extraction_sandbox, file_extractors, image_normalizer, lesson_adapter
+)
+from learningmaterial.services.file_extractors import (
+    MODE_FULL, MODE_METADATA, MODE_TEXT, extract_content, extract_text_from_docx, extract_text_from_pdf,
+    extract_text_from_pptx, iter_content_chunks, iter_text_chunks, materialize_images, slides_to_text
+)
+from learningmaterial.services.image_store import ImageStore
+from learningmaterial.services.lesson_renderer import download_url, render_lesson, save_adapted_lesson
+from learningmaterial.services.lesson_document import (
+    BulletList, Heading, ImageSlot, LessonDocument, Paragraph, parse_lesson
+)
+from learningmaterial.services.file_creators import (
+    create_pdf_from_text, create_pptx_from_text, render_pptx_in_place
+)
+from learningmaterial.services.image_normalizer import IMAGE_DPI, PDF_IMAGE_BOX, normalize_image
+from learningmaterial.services.extraction_sandbox import ExtractionError, run_sandboxed
+from learningmaterial.services.xml_extractors import UnsupportedPackage, iter_docx_paragraphs_xml
+
+# 2x2 red PNG used as a repeated "logo"
+PNG_BYTES = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 2, 2), 0).tobytes("png")
+
+
+class ExtractionCacheTest(TestCase):
+    """
+    Test suite for get_extracted_content.
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "lesson.docx")
+        doc = Document()
+        doc.add_heading("Photosynthesis", level=1)
+        doc.add_paragraph("Plants turn light into energy.")
+        doc.save(self.path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_second_call_skips_parsing(self):
+        """
+        Test that a repeated extraction of the same file is served from the cache.
+        """
+        text, slides = extraction_cache.get_extracted_content(self.path)
+        self.assertIn("[Heading 1] Photosynthesis", text)
+        self.assertEqual(ExtractedContent.objects.count(), 1)
+
+        with mock.patch.object(extraction_cache, "extract_content_sandboxed") as extract:
+            cached_text, cached_slides = extraction_cache.get_extracted_content(self.path)
+        extract.assert_not_called()
+        self.assertEqual(cached_text, text)
+        self.assertEqual(cached_slides, slides)
+
+    def test_adaptation_hashes_the_file_once(self):
+        """
+        Test that adapting a lesson hashes its file once for both the cache and the lessons.
+        """
+        material = mock.Mock(pk=None, file=mock.Mock(path=self.path))
+        hash_file = mock.Mock(wraps=extraction_cache.hash_file)
+        with mock.patch.object(extraction_cache, "hash_file", hash_file), \
+                mock.patch.object(lesson_adapter, "hash_file", hash_file):
+            async_to_sync(lesson_adapter.generate_adapted_lessons)(material, [])
+        hash_file.assert_called_once_with(self.path)
+        self.assertEqual(ExtractedContent.objects.get().file_hash, extraction_cache.hash_file(self.path))
+
+    def test_cache_is_keyed_by_content(self):
+        """
+        Test that a copy of the same file under another name reuses the cached row.
+        """
+        extraction_cache.get_extracted_content(self.path)
+        copy_path = os.path.join(self.tmp.name, "copy.docx")
+        with open(self.path, "rb") as src, open(copy_path, "wb") as dst:
+            dst.write(src.read())
+
+        with mock.patch.object(extraction_cache, "extract_content_sandboxed") as extract:
+            extraction_cache.get_extracted_content(copy_path)
+        extract.assert_not_called()
+        self.assertEqual(ExtractedContent.objects.count(), 1)
+
+
+class ImageStoreTest(TestCase):
+    """
+    Test suite for the content-addressed ImageStore.
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = ImageStore(os.path.join(self.tmp.name, "store"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_identical_bytes_share_a_reference(self):
+        """
+        Test that storing the same bytes twice yields one file and one reference.
+        """
+        first = self.store.put(PNG_BYTES, "png")
+        second = self.store.put(PNG_BYTES, "png")
+        self.assertEqual(first, second)
+        self.assertEqual(os.listdir(self.store.root), [first])
+
+    def test_pdf_logo_on_every_page_is_stored_once(self):
+        """
+        Test that an image reused across PDF pages (same xref) is extracted once.
+        """
+        path = os.path.join(self.tmp.name, "logo.pdf")
+        with fitz.open() as doc:
+            xref = 0
+            for _ in range(3):
+                page = doc.new_page()
+                page.insert_text((72, 72), "Page text")
+                xref = page.insert_image(fitz.Rect(0, 0, 20, 20), stream=PNG_BYTES, xref=xref)
+            doc.save(path)
+
+        _, images = extract_text_from_pdf(path, self.store)
+        self.assertEqual(len(images), 1)
+        self.assertEqual(os.listdir(self.store.root), [images[0]['ref']])
+
+
+class ExtractionModeTest(TestCase):
+    """
+    Test suite for the text-only, metadata and full extraction modes.
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = ImageStore(os.path.join(self.tmp.name, "store"))
+        self.path = os.path.join(self.tmp.name, "deck.pptx")
+        logo = os.path.join(self.tmp.name, "logo.png")
+        with open(logo, "wb") as f:
+            f.write(PNG_BYTES)
+        prs = Presentation()
+        slide = prs.slides.add_slide(prs.slide_layouts[5])
+        slide.shapes.title.text = "Cells"
+        slide.shapes.add_picture(logo, Inches(1), Inches(2), Inches(1), Inches(1))
+        prs.save(self.path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_text_mode_skips_images(self):
+        """
+        Test that text-only extraction returns the same text without touching images.
+        """
+        text, slides = extract_content(self.path, self.store, MODE_TEXT)
+        self.assertEqual(slides[0]["images"], [])
+        self.assertFalse(os.path.exists(self.store.root))
+
+        full_text, _ = extract_content(self.path, self.store, MODE_FULL)
+        self.assertEqual(text, full_text)
+
+    def test_metadata_materialises_to_full_references(self):
+        """
+        Test that materialising a metadata extraction yields the same references as a full one.
+        """
+        _, slides = extract_content(self.path, self.store, MODE_METADATA)
+        self.assertNotIn("ref", slides[0]["images"][0])
+        self.assertFalse(os.path.exists(self.store.root))
+
+        materialize_images(self.path, slides, self.store)
+        _, full_slides = extract_content(self.path, self.store, MODE_FULL)
+        self.assertEqual(slides[0]["images"][0]["ref"], full_slides[0]["images"][0]["ref"])
+        self.assertTrue(os.path.exists(slides[0]["images"][0]["path"]))
+
+    def test_cached_metadata_row_is_upgraded_without_reparsing(self):
+        """
+        Test that a FULL request served from a METADATA cache row does not re-extract.
+        """
+        extraction_cache.get_extracted_content(self.path, mode=MODE_METADATA)
+        with mock.patch.object(extraction_cache, "extract_content_sandboxed") as extract:
+            _, slides = extraction_cache.get_extracted_content(self.path, mode=MODE_FULL)
+        extract.assert_not_called()
+        self.assertTrue(os.path.exists(slides[0]["images"][0]["path"]))
+        self.assertEqual(ExtractedContent.objects.get().mode, MODE_FULL)
+
+
+class ParallelPdfExtractionTest(TestCase):
+    """
+    Test suite for page-range parallel PDF extraction.
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = generate_pdf(os.path.join(self.tmp.name, "book.pdf"), pages=9)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_parallel_matches_serial(self):
+        """
+        Test that merging page ranges from the pool gives the same text and images in page order.
+        """
+        serial_store = ImageStore(os.path.join(self.tmp.name, "serial"))
+        parallel_store = ImageStore(os.path.join(self.tmp.name, "parallel"))
+        serial = extract_text_from_pdf(self.path, serial_store, parallel=False)
+        with mock.patch.object(file_extractors, "PDF_WORKERS", 2):
+            parallel = extract_text_from_pdf(self.path, parallel_store, parallel=True)
+
+        self.assertEqual(parallel[0], serial[0])
+        self.assertEqual([img['ref'] for img in parallel[1]], [img['ref'] for img in serial[1]])
+        # Shared logo plus one image per page
+        self.assertEqual(len(serial[1]), 10)
+
+
+@override_settings(LESSON_CHUNK_CHARS=500)
+class StreamingExtractionTest(TestCase):
+    """
+    Test suite for the bounded chunk streams and chunked lesson adaptation.
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "notes.docx")
+        doc = Document()
+        for section in range(20):
+            doc.add_heading(f"Section {section}", level=2)
+            doc.add_paragraph("Energy flows through food chains. " * 5)
+        doc.add_paragraph("x" * 1200)  # A single paragraph longer than the limit
+        doc.save(self.path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_chunks_stay_under_the_configured_limit(self):
+        """
+        Test that file and text chunks never exceed LESSON_CHUNK_CHARS and cover the document.
+        """
+        text, _ = extract_content(self.path, mode=MODE_TEXT)
+        chunks = list(iter_content_chunks(self.path))
+        self.assertGreater(len(chunks), 2)
+        self.assertLessEqual(max(len(chunk['text']) for chunk in chunks), 500)
+        self.assertEqual([chunk['index'] for chunk in chunks], list(range(len(chunks))))
+        self.assertEqual("".join(chunk['text'] for chunk in chunks).replace("\n", ""), text.replace("\n", ""))
+
+        pptx = generate_pptx(os.path.join(self.tmp.name, "deck.pptx"), slides=12, bullets_per_slide=4)
+        pptx_text, _ = extract_content(pptx, mode=MODE_TEXT)
+        text_chunks = list(iter_text_chunks(pptx_text))
+        self.assertLessEqual(max(map(len, text_chunks)), 500)
+        self.assertEqual("\n\n".join(text_chunks), pptx_text)
+
+    def test_adaptation_sends_one_bounded_chunk_per_request(self):
+        """
+        Test that a long lesson is adapted chunk by chunk and the adapted parts are joined.
+        """
+        text, _ = extract_content(self.path, mode=MODE_TEXT)
+        chunks = list(iter_text_chunks(text))
+        sent = []
+
+        def invoke(prompt):
+            sent.append(prompt)
+            return mock.Mock(content=(
+                '{"adapted_title": "T%d", "adapted_objectives": [], "adapted_content": "part %d"}'
+                % (len(sent), len(sent))))
+
+        with mock.patch.object(lesson_adapter, "adapt_prompt", mock.Mock(format=lambda text, **_: text)), \
+                mock.patch.object(lesson_adapter, "llm", mock.Mock(invoke=invoke)):
+            parsed = async_to_sync(lesson_adapter.adapt_chunks)(chunks, {})
+        self.assertEqual(sent, chunks)
+        self.assertLessEqual(max(map(len, sent)), 500)
+        self.assertEqual(parsed["adapted_title"], "T1")
+        self.assertEqual(parsed["adapted_content"], "\n\n".join(f"part {i + 1}" for i in range(len(chunks))))
+
+
+class XmlExtractionEngineTest(TestCase):
+    """
+    Test suite for the zip/XML DOCX and PPTX extraction engine.
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.docx = generate_docx(os.path.join(self.tmp.name, "unit.docx"), sections=4, paragraphs_per_section=3)
+        self.pptx = generate_pptx(os.path.join(self.tmp.name, "unit.pptx"), slides=4, bullets_per_slide=3)
+        self.store = ImageStore(os.path.join(self.tmp.name, "images"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_engines_agree_in_every_mode(self):
+        """
+        Test that the XML engine returns exactly what the object model returns.
+        """
+        for mode in (MODE_TEXT, MODE_METADATA, MODE_FULL):
+            with self.subTest(mode=mode):
+                self.assertEqual(
+                    extract_text_from_docx(self.docx, self.store, mode, file_extractors.ENGINE_XML),
+                    extract_text_from_docx(self.docx, self.store, mode, file_extractors.ENGINE_OBJECT))
+                self.assertEqual(
+                    extract_text_from_pptx(self.pptx, self.store, mode, file_extractors.ENGINE_XML),
+                    extract_text_from_pptx(self.pptx, self.store, mode, file_extractors.ENGINE_OBJECT))
+
+    def test_pptx_content_is_built_while_streaming_slides(self):
+        """
+        Test that extract_content renders the same [Slide] text as the slide list, in one pass.
+        """
+        with mock.patch.object(file_extractors, "slides_to_text", wraps=file_extractors.slides_to_text) as render:
+            text, slides = extract_content(self.pptx, self.store, MODE_TEXT)
+        self.assertEqual(text, slides_to_text(slides))
+        self.assertEqual([len(call.args[0]) for call in render.call_args_list], [1] * len(slides))
+
+    def test_auto_engine_resumes_with_object_model(self):
+        """
+        Test that an unsupported slide mid-stream falls back without repeating earlier slides.
+        """
+        def first_slide_then_fail(*args):
+            yield next(iter_pptx_slides_xml(*args))
+            raise UnsupportedPackage("linked image")
+
+        iter_pptx_slides_xml = file_extractors.iter_pptx_slides_xml
+        expected = extract_text_from_pptx(self.pptx, self.store, MODE_FULL, file_extractors.ENGINE_OBJECT)
+        with mock.patch.object(file_extractors, "iter_pptx_slides_xml", first_slide_then_fail):
+            self.assertEqual(extract_text_from_pptx(self.pptx, self.store, MODE_FULL), expected)
+            with self.assertRaises(UnsupportedPackage):
+                extract_text_from_pptx(self.pptx, self.store, MODE_FULL, file_extractors.ENGINE_XML)
+
+    def test_entity_declarations_are_rejected(self):
+        """
+        Test that a document declaring XML entities is refused rather than expanded.
+        """
+        hostile = os.path.join(self.tmp.name, "hostile.docx")
+        with zipfile.ZipFile(self.docx) as source, zipfile.ZipFile(hostile, "w") as target:
+            for item in source.infolist():
+                data = source.read(item)
+                if item.filename == "word/document.xml":
+                    data = data.replace(b"?>", b'?><!DOCTYPE w [<!ENTITY a "aaaaaaaaaa">]>', 1)
+                target.writestr(item, data)
+        with self.assertRaises(DefusedXmlException):
+            list(iter_docx_paragraphs_xml(hostile, images=False))
+
+
+class ExtractionSandboxTest(TestCase):
+    """
+    Test suite for the sandboxed extraction pool.
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_corrupt_file_reports_invalid_file(self):
+        """
+        Test that a parse failure in the worker reaches the caller as a structured error.
+        """
+        path = os.path.join(self.tmp.name, "broken.pdf")
+        with open(path, "wb") as f:
+            f.write(b"%PDF-1.7 not really a pdf")
+
+        with self.assertRaises(ExtractionError) as ctx, self.assertLogs(extraction_sandbox.logger, "WARNING"):
+            extraction_cache.get_extracted_content(path, mode=MODE_TEXT)
+        self.assertEqual(ctx.exception.code, extraction_sandbox.ERROR_INVALID_FILE)
+        self.assertEqual(ctx.exception.message, "Could not read the file.")  # Parser details stay in the log
+        self.assertFalse(ExtractedContent.objects.exists())
+
+    def test_limits_are_enforced_per_job(self):
+        """
+        Test that timeouts, resident memory and the address-space backstop are reported, and
+        that later jobs still run.
+        """
+        with self.assertRaises(ExtractionError) as ctx:
+            run_sandboxed(time.sleep, 30, timeout=1)
+        self.assertEqual(ctx.exception.code, extraction_sandbox.ERROR_TIMEOUT)
+
+        with mock.patch.object(extraction_sandbox, "SANDBOX_MEMORY_MB", 128), \
+                self.assertRaises(ExtractionError) as ctx:
+            run_sandboxed(bytearray, 512 * 1024 * 1024)
+        self.assertEqual(ctx.exception.code, extraction_sandbox.ERROR_MEMORY)
+
+        with mock.patch.object(extraction_sandbox, "SANDBOX_ADDRESS_SPACE_MB", 1024), \
+                self.assertRaises(ExtractionError) as ctx:
+            run_sandboxed(bytearray, 2048 * 1024 * 1024)
+        self.assertEqual(ctx.exception.code, extraction_sandbox.ERROR_MEMORY)
+
+        self.assertEqual(run_sandboxed(bytearray, 16), bytearray(16))
+
+    def test_jobs_are_isolated_and_queueing_is_not_timed(self):
+        """
+        Test that a job killed for its timeout does not affect one running beside it, and
+        that time spent waiting for a free slot does not count against a job's limit.
+        """
+        results = {}
+
+        def run(name, *args, timeout):
+            try:
+                results[name] = run_sandboxed(time.sleep, *args, timeout=timeout)
+            except ExtractionError as e:
+                results[name] = e.code
+
+        threads = [threading.Thread(target=run, args=("slow", 30), kwargs={"timeout": 1}),
+                   threading.Thread(target=run, args=("fine", 2), kwargs={"timeout": 10})]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, {"slow": extraction_sandbox.ERROR_TIMEOUT, "fine": None})
+
+        # One slot: the second job waits 1.5s for it, so its wall time exceeds its 2.5s limit
+        results.clear()
+        with mock.patch.object(extraction_sandbox, "_slots", threading.BoundedSemaphore(1)):
+            threads = [threading.Thread(target=run, args=(name, 1.5), kwargs={"timeout": 2.5}) for name in "ab"]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(results, {"a": None, "b": None})
+
+
+class ImageNormalizerTest(TestCase):
+    """
+    Test suite for normalize_image and its use by the renderers.
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.settings = override_settings(MEDIA_ROOT=self.tmp.name)
+        self.settings.enable()
+        # A noisy 1600x1200 "photo", which compresses poorly as PNG
+        self.photo = os.path.join(self.tmp.name, "photo.png")
+        Image.effect_noise((1600, 1200), 64).convert("RGB").save(self.photo)
+
+    def tearDown(self):
+        self.settings.disable()
+        self.tmp.cleanup()
+
+    def test_image_is_scaled_to_box_and_cached(self):
+        """
+        Test that the normalised copy fits the display box and is reused on later calls.
+        """
+        normalized = normalize_image(self.photo, PDF_IMAGE_BOX)
+        with Image.open(normalized) as image:
+            self.assertLessEqual(image.width, PDF_IMAGE_BOX[0] * IMAGE_DPI)
+            self.assertLessEqual(image.height, PDF_IMAGE_BOX[1] * IMAGE_DPI)
+        self.assertLess(os.path.getsize(normalized), os.path.getsize(self.photo))
+
+        with mock.patch.object(image_normalizer, "run_sandboxed") as sandboxed:
+            self.assertEqual(normalize_image(self.photo, PDF_IMAGE_BOX), normalized)
+        sandboxed.assert_not_called()
+
+    def test_oversized_images_are_refused(self):
+        """
+        Test that a decompression bomb is rejected instead of decoded.
+        """
+        bomb = os.path.join(self.tmp.name, "bomb.png")
+        Image.new("1", (10001, 10001)).save(bomb)
+        with self.assertLogs(extraction_sandbox.logger, "WARNING"), \
+                self.assertRaises(ExtractionError) as ctx:
+            normalize_image(bomb, PDF_IMAGE_BOX)
+        self.assertEqual(ctx.exception.code, extraction_sandbox.ERROR_INVALID_FILE)
+
+    def test_copies_are_cleared_with_their_material(self):
+        """
+        Test that deleting a material removes the normalised copies of its images, keeping
+        those of images another material still stores.
+        """
+        with open(self.photo, "rb") as f:
+            data = f.read()
+        teacher = Teacher.objects.get(user=User.objects.create_user(username="teacher", password="pw"))
+        materials = [LearningMaterials.objects.create(title=title, created_by=teacher, file="lesson.pdf")
+                     for title in ("Plants", "Animals")]
+        refs = [ImageStore.for_material(material.pk).put(data, "png") for material in materials]
+        normalized = normalize_image(ImageStore.for_material(materials[0].pk).path(refs[0]), PDF_IMAGE_BOX)
+
+        materials[0].delete()
+        self.assertTrue(os.path.exists(normalized))
+        materials[1].delete()
+        self.assertFalse(os.path.exists(normalized))
+
+    def test_small_images_are_left_alone(self):
+        """
+        Test that an image already smaller than its box is not upscaled or re-encoded.
+        """
+        icon = os.path.join(self.tmp.name, "icon.png")
+        with open(icon, "wb") as f:
+            f.write(PNG_BYTES)
+        self.assertEqual(normalize_image(icon, PDF_IMAGE_BOX), icon)
+
+    def test_rendered_pdf_embeds_the_small_copy(self):
+        """
+        Test that a rendered PDF is much smaller than one embedding the original photos, and
+        that all its images are normalised in one sandbox job.
+        """
+        second = os.path.join(self.tmp.name, "second.png")
+        Image.effect_noise((1200, 1600), 64).convert("RGB").save(second)
+        images = [{'path': self.photo}, {'path': second}]
+        small = os.path.join(self.tmp.name, "small.pdf")
+        with mock.patch.object(image_normalizer, "run_sandboxed", wraps=image_normalizer.run_sandboxed) as sandboxed:
+            create_pdf_from_text("Lesson\nBody text.", small, images=images)
+        self.assertEqual(sandboxed.call_count, 1)
+        large = os.path.join(self.tmp.name, "large.pdf")
+        with mock.patch("learningmaterial.services.file_creators.normalize_images",
+                        lambda paths, box: {path: path for path in paths}):
+            create_pdf_from_text("Lesson\nBody text.", large, images=images)
+
+        self.assertLess(os.path.getsize(small) * 4, os.path.getsize(large))
+
+
+class BenchmarkSuiteTest(TestCase):
+    """
+    Test suite for the extraction and rendering benchmark suite.
+    """
+
+    def test_suite_runs_and_flags_regressions(self):
+        """
+        Test that a small run records time, heap and resident memory, finds the engines in
+        agreement, and that a slower run is flagged against it.
+        """
+        with tempfile.TemporaryDirectory() as tmp, override_settings(MEDIA_ROOT=tmp):
+            baseline = run_suite(tmp, scale=2, repeat=1, only=["extract.pptx.text", "render.pptx"])
+        self.assertEqual(
+            sorted(baseline["results"]), ["extract.pptx.text.object", "extract.pptx.text.xml", "render.pptx"])
+        self.assertEqual(baseline["mismatches"], [])
+        self.assertTrue(all(result["rss_kib"] >= 0 for result in baseline["results"].values()))
+
+        slower = {"meta": baseline["meta"], "results": {
+            name: {**result, "seconds": result["seconds"] * 2}
+            for name, result in baseline["results"].items()
+        }}
+        self.assertFalse(any(row["regressed"] for row in compare_results(baseline, baseline)))
+        self.assertTrue(all(row["regressed"] for row in compare_results(slower, baseline, threshold=0.5)))
+
+        def run(rss_kib):
+            return {"results": {"extract": {"seconds": 1.0, "peak_kib": 10.0, "rss_kib": rss_kib}}}
+        # Native memory regresses like heap; tiny changes and older baselines without it do not
+        self.assertTrue(compare_results(run(20000), run(10000))[0]["regressed"])
+        self.assertFalse(compare_results(run(500), run(100))[0]["regressed"])
+        self.assertFalse(compare_results(run(20000), run(None))[0]["regressed"])
+
+
+class TemplateRenderingTest(TestCase):
+    """
+    Test suite for PPTX rendering from the cloned prototype shapes.
+    """
+
+    def test_slides_are_styled_and_independent(self):
+        """
+        Test that each slide gets its own styled title box and content, with unique shape ids.
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "out", "lesson.pptx")
+            create_pptx_from_text([("Plants", "Roots\n\nLeaves", []), ("Animals", "", [])], path)
+            prs = Presentation(path)
+
+        first, second = prs.slides
+        title, content = first.shapes
+        self.assertEqual(title.text_frame.text, "Plants")
+        self.assertEqual(title.text_frame.paragraphs[0].font.size.pt, 36)
+        self.assertEqual(content.text_frame.text, "Roots\nLeaves")
+        self.assertEqual(second.shapes[0].text_frame.text, "Animals")
+        self.assertEqual(second.shapes[1].text_frame.text, "")
+        self.assertEqual(len({shape.shape_id for shape in first.shapes}), 2)
+
+    def test_in_place_rendering_keeps_the_original_deck(self):
+        """
+        Test that in-place rendering replaces slide text, keeps pictures and layouts, and
+        matches the slide count of the adaptation.
+        """
+        document = parse_lesson(
+            "[Slide]\nTitle: Plants\nContent: - Roots hold soil.\n- Leaves make food.\n\n"
+            "[Slide]\nTitle: Animals\nContent: Animals eat plants."
+        )
+        with tempfile.TemporaryDirectory() as tmp:
+            source = generate_pptx(os.path.join(tmp, "src", "lesson.pptx"), slides=3)
+            path = os.path.join(tmp, "out", "lesson.pptx")
+            render_pptx_in_place(document, source, path)
+            original, prs = Presentation(source), Presentation(path)
+
+        self.assertEqual(len(prs.slides), 2)
+        first = prs.slides[0]
+        self.assertEqual(first.slide_layout.name, original.slides[0].slide_layout.name)
+        self.assertEqual(first.shapes.title.text_frame.text, "Plants")
+        self.assertEqual(first.placeholders[1].text_frame.text, "Roots hold soil.\nLeaves make food.")
+        self.assertEqual(prs.slides[1].placeholders[1].text_frame.text, "Animals eat plants.")
+        pictures = [shape for shape in first.shapes if shape.shape_type == MSO_SHAPE_TYPE.PICTURE]
+        self.assertEqual(pictures[0].image.sha1, original.slides[0].shapes[-1].image.sha1)
+
+
+class LessonDocumentTest(TestCase):
+    """
+    Test suite for parse_lesson and the LessonDocument tree.
+    """
+
+    CONTENT = (
+        "Food Chains\n"
+        "**Producers**\n"
+        "Plants make their own food.\n"
+        "- Grass\n"
+        "- Trees\n"
+        "[IMAGE_0]\n"
+        "**Key idea**: Energy flows upwards.\n"
+        "Consumers:\n"
+        "Animals eat plants or other animals.\n"
+        "Tips for Using Tools: use the read-aloud button."
+    )
+
+    def test_content_is_parsed_into_typed_blocks(self):
+        """
+        Test that headings, bullets, labels and image slots become blocks, minus the trailer.
+        """
+        document = parse_lesson(self.CONTENT)
+        self.assertEqual(document.title, "Food Chains")
+        self.assertEqual(document.blocks, [
+            Heading("Producers"),
+            Paragraph("Plants make their own food."),
+            BulletList(["Grass", "Trees"]),
+            ImageSlot(0),
+            Paragraph("Energy flows upwards.", label="Key idea"),
+            Heading("Consumers"),
+            Paragraph("Animals eat plants or other animals."),
+        ])
+        self.assertEqual(LessonDocument.from_dict(document.to_dict()), document)
+        self.assertEqual([slide.title for slide in document.to_slides()], ["Producers", "Consumers"])
+
+    def test_slide_blocks_become_slides(self):
+        """
+        Test that [Slide] content yields slides, skipping blacklisted generic slides.
+        """
+        document = parse_lesson(
+            "[Slide]\nTitle: Plants\nContent: Roots hold soil.\n\n"
+            "[Slide]\nTitle: Using Support Tools\nContent: Click the button.\n\n"
+            "[Slide]\nTitle: Animals\nContent: - Fish\n- Birds"
+        )
+        self.assertEqual(document.title, "Plants")
+        self.assertEqual(
+            document.slide_pairs([{'images': ['a.png']}]),
+            [("Plants", "Roots hold soil.", ['a.png']), ("Animals", "- Fish\n- Birds", [])])
+        self.assertIn(BulletList(["Fish", "Birds"]), document.blocks)
+
+
+class AdaptedLessonDownloadTest(TestCase):
+    """
+    Test suite for rendering adapted lessons on demand through the download endpoint.
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.settings = override_settings(MEDIA_ROOT=self.tmp.name)
+        self.settings.enable()
+
+        user = User.objects.create_user(username="teacher", password="pw")
+        teacher = Teacher.objects.get(user=user)  # Created by the teachers post_save signal
+        classroom = Classes.objects.create(teacher=teacher, class_name="Science")
+        self.student = Student.objects.create(
+            first_name="Ada", last_name="Lovelace", year_level=5, student_email="ada@example.com")
+        classroom.students.add(self.student)
+
+        source = generate_docx(os.path.join(self.tmp.name, "src", "lesson.docx"), sections=2)
+        with open(source, "rb") as f:
+            self.material = LearningMaterials.objects.create(
+                title="Food Chains", created_by=teacher, class_assigned=classroom,
+                file=File(f, name="lesson.docx"))
+
+        document = parse_lesson("Food Chains\n**Producers**\nPlants make food.\n[IMAGE_0]")
+        save_adapted_lesson(self.material, self.student, {
+            'adapted_title': "Food Chains", 'adapted_content': "...", 'document': document.to_dict()
+        }, extraction_cache.hash_file(source))
+
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def tearDown(self):
+        self.settings.disable()
+        self.tmp.cleanup()
+
+    def url(self, file_format):
+        return f"/api/learning-materials/{self.material.pk}/download/{self.student.pk}/{file_format}/"
+
+    def test_any_format_is_rendered_once_and_revalidated(self):
+        """
+        Test that a download renders the lesson, later requests reuse the file, and a
+        matching If-None-Match gets a 304 without rendering.
+        """
+        response = self.client.get(self.url("pptx"))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["ETag"])
+        self.assertIn("Last-Modified", response)
+        prs = Presentation(io.BytesIO(b"".join(response.streaming_content)))
+        self.assertEqual(prs.slides[0].shapes[0].text_frame.text, "Producers")
+
+        with mock.patch("learningmaterial.views.render_lesson") as render:
+            not_modified = self.client.get(self.url("pptx"), HTTP_IF_NONE_MATCH=response["ETag"])
+        render.assert_not_called()
+        self.assertEqual(not_modified.status_code, 304)
+
+        self.assertEqual(self.client.get(self.url("pdf")).status_code, 200)
+        self.assertEqual(self.client.get(self.url("txt")).status_code, 400)
+
+    def test_signed_link_downloads_without_a_token(self):
+        """
+        Test that the signed file_url works from a plain browser request, while an unsigned
+        or tampered link needs authentication.
+        """
+        lesson = AdaptedLesson.objects.get(material=self.material, student=self.student)
+        anonymous = APIClient()
+        self.assertEqual(anonymous.get(download_url(lesson, "docx")).status_code, 200)
+        self.assertEqual(anonymous.get(self.url("docx")).status_code, 401)
+        tampered = download_url(lesson, "docx").replace("signature=", "signature=x")
+        self.assertEqual(anonymous.get(tampered).status_code, 401)
+
+    def test_other_teachers_cannot_download(self):
+        """
+        Test that a teacher gets a 404 for a lesson or bundle of another teacher's material.
+        """
+        other = APIClient()
+        other.force_authenticate(User.objects.create_user(username="other", password="pw"))
+        self.assertEqual(other.get(self.url("pdf")).status_code, 404)
+        self.assertEqual(other.get(f"/api/learning-materials/{self.material.pk}/bundle/").status_code, 404)
+
+    def test_bundle_streams_every_file_per_student(self):
+        """
+        Test that the bundle ZIP holds each student's rendered lesson and audio, stored uncompressed.
+        """
+        os.makedirs(os.path.join(self.tmp.name, "adapted_output"))
+        with open(os.path.join(self.tmp.name, "adapted_output", "ada.mp3"), "wb") as f:
+            f.write(b"ID3" + b"\0" * 1024)
+        AdaptedLesson.objects.update(audio_path="adapted_output/ada.mp3")
+
+        response = self.client.get(f"/api/learning-materials/{self.material.pk}/bundle/?file_format=pdf")
+        self.assertEqual(response.status_code, 200)
+        with zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content))) as archive:
+            self.assertIsNone(archive.testzip())
+            folder = f"Ada_Lovelace_{self.student.pk}"
+            self.assertEqual(archive.namelist(), [f"{folder}/Food_Chains.pdf", f"{folder}/Food_Chains.mp3"])
+            self.assertTrue(all(info.compress_type == zipfile.ZIP_STORED for info in archive.infolist()))
+
+    def test_files_are_deleted_with_their_lesson(self):
+        """
+        Test that regenerating a lesson prunes its old rendered files, that shared files
+        survive until their last lesson goes, and that deleting the material removes the rest.
+        """
+        lesson = AdaptedLesson.objects.get()
+        old_pdf = render_lesson(lesson, "pdf")
+        audio = os.path.join(self.tmp.name, "adapted_output", "ada.mp3")
+        os.makedirs(os.path.dirname(audio))
+        open(audio, "wb").close()
+
+        document = parse_lesson("Food Chains\nAnimals eat plants.")
+        source_hash = extraction_cache.hash_file(self.material.file.path)
+        lesson = save_adapted_lesson(self.material, self.student, {
+            'document': document.to_dict(), 'audio_path': "adapted_output/ada.mp3"}, source_hash)
+        self.assertFalse(os.path.exists(old_pdf))
+
+        grace = Student.objects.create(first_name="Grace", year_level=5, student_email="grace@example.com")
+        shared = save_adapted_lesson(self.material, grace, {
+            'document': document.to_dict(), 'audio_path': "adapted_output/ada.mp3"}, source_hash)
+        pdf = render_lesson(lesson, "pdf")
+        shared.delete()
+        self.assertTrue(os.path.exists(pdf) and os.path.exists(audio))
+
+        self.material.delete()
+        self.assertFalse(os.path.exists(pdf) or os.path.exists(audio))
+
+    def test_bundle_lists_failed_entries_instead_of_breaking(self):
+        """
+        Test that an unexpected render failure leaves a valid ZIP listing the entry in errors.txt.
+        """
+        with mock.patch("learningmaterial.services.lesson_bundle.render_lesson", side_effect=RuntimeError("boom")), \
+                self.assertLogs("learningmaterial.services.lesson_bundle"):
+            response = self.client.get(f"/api/learning-materials/{self.material.pk}/bundle/?file_format=pdf")
+            content = b"".join(response.streaming_content)
+        with zipfile.ZipFile(io.BytesIO(content)) as archive:
+            self.assertIsNone(archive.testzip())
+            self.assertEqual(archive.namelist(), ["errors.txt"])
+            self.assertIn(b"Food_Chains.pdf", archive.read("errors.txt"))
+            self.assertNotIn(b"boom", archive.read("errors.txt"))
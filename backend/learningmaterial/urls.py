@@ -6,6 +6,7 @@ Defines RESTful API endpoints for managing learning materials, including:
 - Retrieving, updating, and deleting individual materials by ID
 - Fetching materials by class ID
 - Processing and adapting learning materials via AI-powered endpoints
+- Downloading adapted lessons, rendered on demand in any supported format
 
 """
 
@@ -27,6 +28,10 @@ learning_materials_process = LearningMaterialsViewSet.as_view(
     {'post': 'process'}) # Process material (e.g., AI processing)
 learning_materials_adapt = LearningMaterialsViewSet.as_view(
     {'post': 'adapt'}) # Adapt material (e.g., generate adaptations)
+learning_materials_download = LearningMaterialsViewSet.as_view(
+    {'get': 'download'}) # Download a student's adapted lesson in a given format
+learning_materials_bundle = LearningMaterialsViewSet.as_view(
+    {'get': 'bundle'}) # Download every adapted lesson of a material as one ZIP
 
 urlpatterns = [
     path('', learning_materials_list, 
@@ -41,6 +46,10 @@ urlpatterns = [
          name='learning-materials-process'), # POST to process a specific material
     path('<int:pk>/adapt/', learning_materials_adapt,
          name='learning-materials-adapt'), # POST to adapt a specific material
+    path('<int:pk>/download/<int:student_id>/<str:file_format>/', learning_materials_download,
+         name='learning-materials-download'), # GET an adapted lesson rendered as pdf/docx/pptx
+    path('<int:pk>/bundle/', learning_materials_bundle,
+         name='learning-materials-bundle'), # GET a streamed ZIP of all adapted lessons and audio
 ]
 
 # Serve media files during development only
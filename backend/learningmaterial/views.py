@@ -8,22 +8,41 @@ including specialized endpoints for:
 - Creating materials with automatic text extraction from uploaded files (PDF, DOCX, PPTX).
 - Performing content alignment validation between uploaded file text and provided learning objectives.
 - Adapting lessons for students using AI-generated personalized learning materials and optional audio.
+- Downloading a student's adapted lesson as PDF, DOCX or PPTX, rendered on first request and
+  revalidated through ETag/Last-Modified.
+- Downloading every adapted lesson and audio track of a material as one streamed ZIP.
 
 The ViewSet leverages external services for file text extraction and lesson adaptation using language models.
 """
 
 from rest_framework.decorators import action
 from rest_framework.parsers import MultiPartParser, FormParser
-from rest_framework import status, viewsets
+from rest_framework import viewsets
+from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
-import asyncio
 from asgiref.sync import async_to_sync
+from django.db.models import Q
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 
-from .models import LearningMaterials
+from .models import AdaptedLesson, LearningMaterials
 from .serializers import LearningMaterialsSerializer
-from .services.file_extractors import extract_text_from_pdf, extract_text_from_docx, extract_text_from_pptx
-from .services.lesson_adapter import (generate_adapted_lessons, extract_text_from_pdf,
-                                      extract_text_from_docx, extract_text_from_pptx, alignment_prompt, alignment_parser, llm)
+from .services.extraction_sandbox import ExtractionError
+from .services.file_extractors import MODE_METADATA
+from .services.lesson_adapter import (generate_adapted_lessons, get_base_text,
+                                      alignment_prompt, alignment_parser, llm)
+from .services.lesson_bundle import iter_bundle_entries, iter_zip
+from .services.lesson_renderer import (CONTENT_TYPES, RENDER_FORMATS, check_download_signature,
+                                       render_lesson)
+
+
+def _owned_by(user, prefix=''):
+    """
+    Filter for the learning materials a teacher created or assigned to one of their classes;
+    prefix reaches the material from a related model, e.g. 'material__'.
+    """
+    return Q(**{f'{prefix}created_by__user': user}) | Q(**{f'{prefix}class_assigned__teacher__user': user})
 
 
 class LearningMaterialsViewSet(viewsets.ModelViewSet):
@@ -39,10 +58,13 @@ class LearningMaterialsViewSet(viewsets.ModelViewSet):
     serializer_class = LearningMaterialsSerializer
     parser_classes = (MultiPartParser, FormParser)
 
-    from .services.lesson_adapter import (
-        extract_text_from_pdf, extract_text_from_docx, extract_text_from_pptx,
-        alignment_prompt, alignment_parser, llm
-    )
+    def get_permissions(self):
+        """
+        Downloads are authorised inside the view: by a signed link or by teacher ownership.
+        """
+        if self.action == 'download':
+            return [AllowAny()]
+        return super().get_permissions()
 
     def by_class(self, request, class_id=None, *args, **kwargs):
         """
@@ -86,20 +108,9 @@ class LearningMaterialsViewSet(viewsets.ModelViewSet):
         # Try to extract content and validate alignment
         alignment_info = None
         try:
-            file_path = instance.file.path
-            ext = file_path.split('.')[-1].lower()
-
-            if ext == "pdf":
-                text = extract_text_from_pdf(file_path)
-            elif ext == "docx":
-                text = extract_text_from_docx(file_path)
-            elif ext == "pptx":
-                slides = extract_text_from_pptx(file_path)
-                text = "\n\n".join(
-                    f"[Slide]\nTitle: {s['title']}\nContent: {s['content']}" for s in slides
-                )
-            else:
-                raise ValueError("Unsupported file type for alignment check.")
+            # Text plus image locators: populates the extraction cache without writing any
+            # image bytes, so the first download only has to materialise the images
+            text, _ = get_base_text(instance.file.path, instance.pk, MODE_METADATA)
 
             alignment_input = alignment_prompt.format(
                 objectives=instance.objective or "",
@@ -108,6 +119,12 @@ class LearningMaterialsViewSet(viewsets.ModelViewSet):
             alignment_resp = llm.invoke(alignment_input)
             alignment_info = alignment_parser.parse(alignment_resp.content)
 
+        except ExtractionError as e:
+            alignment_info = {
+                "alignment": "error",
+                "justification": f"Could not process content: {e.message}",
+                "extraction_error": e.as_dict()
+            }
         except Exception as e:
             alignment_info = {
                 "alignment": "error",
@@ -133,7 +150,8 @@ class LearningMaterialsViewSet(viewsets.ModelViewSet):
         Generate adapted lessons for all students in the assigned class.
         """
         material = self.get_object()
-        students = list(material.class_assigned.students.all())
+        # Only students with disability information are adapted for
+        students = list(material.class_assigned.students.with_disability_info())
         adapted_outputs = async_to_sync(generate_adapted_lessons)(
             material, students, return_file=True)
 
@@ -158,3 +176,84 @@ class LearningMaterialsViewSet(viewsets.ModelViewSet):
                 }
 
         return Response(response)
+
+    def download(self, request, pk=None, student_id=None, file_format=None):
+        """
+        Download a student's adapted lesson in the requested format (pdf, docx or pptx).
+
+        Open to a valid signed link (the file_url returned by adapt, usable from a plain
+        browser link) or to the authenticated teacher the material and student belong to;
+        anything else is a 404.
+
+        The file is rendered from the stored adaptation the first time a (content, format)
+        pair is requested and cached afterwards. Responses carry an ETag and Last-Modified,
+        so clients revalidating with If-None-Match / If-Modified-Since get a 304 without
+        any rendering.
+
+        Returns:
+            FileResponse: The rendered file, a 304 Not Modified, or an error response.
+        """
+        if file_format not in RENDER_FORMATS:
+            return Response({"error": f"Format must be one of: {', '.join(RENDER_FORMATS)}."}, status=400)
+
+        lessons = AdaptedLesson.objects.select_related('material').filter(material_id=pk, student_id=student_id)
+        if not check_download_signature(pk, student_id, request.query_params):
+            if not request.user.is_authenticated:
+                return Response({"error": "Authentication credentials were not provided."}, status=401)
+            lessons = lessons.filter(_owned_by(request.user, 'material__'), student__classes__teacher__user=request.user)
+        lesson = lessons.first()
+        if lesson is None:
+            return Response({"error": "No adapted lesson found for this student."}, status=404)
+
+        etag = f'"{lesson.content_hash}-{file_format}"'
+        last_modified = lesson.updated_at.timestamp()
+        not_modified = get_conditional_response(request, etag=etag, last_modified=int(last_modified))
+        if not_modified is None:
+            try:
+                path = render_lesson(lesson, file_format)
+            except ExtractionError as e:
+                return Response({"error": e.message, "code": e.code}, status=422)
+            safe_title = lesson.material.title.replace(' ', '_').replace('/', '_')
+            response = FileResponse(open(path, 'rb'), as_attachment=True,
+                                    filename=f"{safe_title}_{lesson.student_id}.{file_format}",
+                                    content_type=CONTENT_TYPES[file_format])
+        else:
+            response = not_modified
+
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        # Always revalidate: the adaptation can be regenerated at any time
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+    def bundle(self, request, pk=None):
+        """
+        Stream a ZIP of every adapted lesson file and audio track for a material.
+
+        Entries are grouped in one folder per student. Lesson files are rendered on demand
+        while the archive streams, in the material's own format unless ?file_format=pdf|docx|pptx
+        is given. Lessons that cannot be rendered are listed in errors.txt.
+
+        Only the teacher the material belongs to may download it, and only lessons of students
+        in their classes are included.
+
+        Returns:
+            StreamingHttpResponse: The ZIP archive, or an error response.
+        """
+        material = LearningMaterials.objects.filter(_owned_by(request.user), pk=pk).first()
+        if material is None:
+            return Response({"error": "Learning material not found."}, status=404)
+        file_format = request.query_params.get('file_format')
+        if file_format and file_format not in RENDER_FORMATS:
+            return Response({"error": f"Format must be one of: {', '.join(RENDER_FORMATS)}."}, status=400)
+
+        lessons = (material.adapted_lessons.filter(student__classes__teacher__user=request.user)
+                   .select_related('material', 'student').distinct().order_by('student_id'))
+        if not lessons.exists():
+            return Response({"error": "This material has not been adapted yet."}, status=404)
+
+        safe_title = material.title.replace(' ', '_').replace('/', '_')
+        response = StreamingHttpResponse(
+            iter_zip(iter_bundle_entries(lessons.iterator(), file_format)), content_type='application/zip')
+        response['Content-Disposition'] = f'attachment; filename="{safe_title}_adapted.zip"'
+        return response
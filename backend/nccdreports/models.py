@@ -54,9 +54,9 @@ class NCCDreport(models.Model):
     def has_diagonsed_disability(self):
         """
         Dynamically checks if the linked student has a diagnosed disability
-        by evaluating if the disability_info field is non-empty.
+        by evaluating if the disability_info field is non-empty (via its blind index).
         """
-        return bool(self.student.disability_info.strip())
+        return self.student.has_disability_info
 
 
 class LessonEffectivenessRecord(models.Model):
@@ -8,13 +8,16 @@ Includes:
 """
 
 from rest_framework import serializers
+from students.serializers import StudentSerializer
+from utils.serializers import SparseFieldsetsMixin
 from .models import NCCDreport, LessonEffectivenessRecord
 
 
-class NCCDreportSerializer(serializers.ModelSerializer):
+class NCCDreportSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     """
     Serializer for the NCCDreport model. 
     Includes computed fields for evidence URL and disability status.
+    Reads accept ?fields= and ?expand=student (the nested student instead of its id).
     """
     evidence_url = serializers.SerializerMethodField(read_only=True)
     has_diagonsed_disability = serializers.SerializerMethodField(
@@ -38,6 +41,7 @@ class NCCDreportSerializer(serializers.ModelSerializer):
         ]
 
         read_only_fields = ['has_diagonsed_disability', 'evidence_url']
+        expandable_fields = {'student': (StudentSerializer, {})}
 
     def get_evidence_url(self, obj):
         """
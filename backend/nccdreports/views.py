@@ -28,6 +28,7 @@ from students.models import Student
 from classes.models import Classes
 from .serializers import NCCDreportSerializer, LessonEffectivenessRecordSerializer
 from students.serializers import StudentSerializer
+from utils.pagination import paginated_response, parse_bool, parse_int
 
 
 @api_view(['GET'])
@@ -35,17 +36,44 @@ from students.serializers import StudentSerializer
 def get_all_reports(request):
     """
     Retrieve a list of all NCCD reports for students taught by this teacher.
+
+    Query params (all optional):
+        status: Only reports with this status.
+        class_id: Only reports for students in this class.
+        student_id: Only reports for this student.
+        has_evidence: true/false.
+        has_disability: true/false, whether the student has disability information.
+        page_size, cursor, ordering: Opt-in cursor pagination (see utils.pagination);
+            ordering may be status or pk.
+        fields, expand: Sparse fieldset and expand=student (see utils.serializers).
     """
     # only teachers may list reports
     if not hasattr(request.user, 'teacher'):
         return Response({'detail': 'User is not a teacher.'}, status=status.HTTP_403_FORBIDDEN)
     teacher = request.user.teacher
+    classes = Classes.objects.filter(teacher=teacher)
+    class_id = parse_int(request, 'class_id')
+    if class_id is not None:
+        classes = classes.filter(id=class_id)
     reports = NCCDreport.objects.filter(
-        student__classes__teacher=teacher
-    ).distinct()
-
-    serializer = NCCDreportSerializer(reports, many=True, context={'request': request})
-    return Response(serializer.data)
+        student__classes__in=classes
+    ).select_related('student').distinct()
+
+    report_status = request.query_params.get('status')
+    if report_status is not None:
+        reports = reports.filter(status=report_status)
+    student_id = parse_int(request, 'student_id')
+    if student_id is not None:
+        reports = reports.filter(student_id=student_id)
+    has_evidence = parse_bool(request, 'has_evidence')
+    if has_evidence is not None:
+        reports = reports.filter(has_evidence=has_evidence)
+    has_disability = parse_bool(request, 'has_disability')
+    if has_disability is not None:
+        reports = reports.filter(student__has_disability_info=has_disability)
+
+    return paginated_response(request, reports, NCCDreportSerializer,
+                              ordering_fields=('status', 'pk'), context={'request': request})
 
 
 @api_view(['GET', 'PUT', 'DELETE'])
@@ -181,16 +209,13 @@ def ensure_reports_for_class(request, class_id):
         teacher=request.user.teacher
     )
     valid_reports = []
-    from utils.encryption import decrypt
-
-    for student in class_obj.students.all():
-        info = decrypt(student._disability_info) if student._disability_info else ''
-        if info.strip():
-            report, _ = NCCDreport.objects.get_or_create(
-                student=student,
-                defaults={'status': 'NotStart'}
-            )
-            valid_reports.append(report)
+
+    for student in class_obj.students.with_disability_info():
+        report, _ = NCCDreport.objects.get_or_create(
+            student=student,
+            defaults={'status': 'NotStart'}
+        )
+        valid_reports.append(report)
 
     # remove stale
     NCCDreport.objects.filter(
@@ -287,10 +312,9 @@ def students_without_nccd_report(request):
         student__classes__teacher=teacher
     ).values_list('student_id', flat=True)
 
-    candidates = Student.objects.filter(
+    eligible = Student.objects.filter(
         classes__teacher=teacher
-    ).exclude(id__in=reported_ids).distinct()
+    ).with_disability_info().exclude(id__in=reported_ids).distinct()
 
-    eligible = [s for s in candidates if s.disability_info.strip()]
-    serializer = StudentSerializer(eligible, many=True)
+    serializer = StudentSerializer(eligible, many=True, context={'request': request})
     return Response(serializer.data)
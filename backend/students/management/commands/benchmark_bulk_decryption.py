@@ -0,0 +1,79 @@
+"""
+Management command timing StudentSerializer(many=True) over large rosters with per-row
+decryption, inline bulk decryption and pooled bulk decryption.
+
+Rows are unsaved Student instances holding real Fernet tokens, so no database is needed.
+
+Usage:
+    python manage.py benchmark_bulk_decryption --rows 100 1000 10000 --repeat 3
+"""
+
+import time
+from unittest import mock
+
+from django.core.management.base import BaseCommand
+
+from students.models import Student
+from students.serializers import StudentSerializer
+from utils import encryption
+from utils.fields import Ciphertext
+
+
+def _legacy_decrypt(ciphertext):
+    """
+    Pre-memoization behaviour: decrypt on every read.
+    """
+    return encryption.decrypt(ciphertext.token) if ciphertext.stored else ''
+
+
+class Command(BaseCommand):
+    help = "Benchmark per-row, inline bulk and pooled bulk decryption of student lists."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[100, 1000, 10000])
+        parser.add_argument('--repeat', type=int, default=3,
+                            help="Runs per configuration; the best time is reported.")
+
+    def handle(self, *args, **options):
+        scenarios = {
+            'per-row': lambda: mock.patch.multiple(
+                Ciphertext, decrypt=_legacy_decrypt, set_plaintext=lambda self, plaintext: None),
+            'inline': lambda: mock.patch.object(encryption, 'BULK_DECRYPT_THRESHOLD', float('inf')),
+            'pooled': lambda: mock.patch.object(encryption, 'BULK_DECRYPT_THRESHOLD', 0),
+        }
+        self.stdout.write(
+            f"workers={encryption.BULK_DECRYPT_WORKERS} threshold={encryption.BULK_DECRYPT_THRESHOLD}")
+        self.stdout.write(f"{'rows':>6} " + " ".join(f"{name + ' s':>9}" for name in scenarios))
+
+        # Start the pool outside the timings
+        encryption.decrypt_many([encryption.encrypt("warm-up")] * 2)
+        if encryption.BULK_DECRYPT_WORKERS > 1:
+            encryption._get_pool().submit(encryption._decrypt_chunk, []).result()
+
+        for rows in options['rows']:
+            tokens = [
+                (encryption.encrypt(f"First{i}"), encryption.encrypt(f"Last{i}"),
+                 encryption.encrypt("Dyslexia" if i % 2 == 0 else "None recorded"))
+                for i in range(rows)
+            ]
+            timings = [self._best(tokens, scenario, options['repeat']) for scenario in scenarios.values()]
+            self.stdout.write(f"{rows:>6} " + " ".join(f"{seconds:>9.3f}" for seconds in timings))
+
+    @staticmethod
+    def _best(tokens, scenario, repeat):
+        """
+        Return the fastest of `repeat` serializations of fresh, never-decrypted instances.
+        """
+        best = float('inf')
+        for _ in range(repeat):
+            students = [
+                Student(pk=i, first_name=Ciphertext.from_token(first), last_name=Ciphertext.from_token(last),
+                        disability_info=Ciphertext.from_token(info),
+                        year_level=5, student_email=f"s{i}@example.com")
+                for i, (first, last, info) in enumerate(tokens)
+            ]
+            with scenario():
+                start = time.perf_counter()
+                StudentSerializer(students, many=True).data
+                best = min(best, time.perf_counter() - start)
+        return best
@@ -0,0 +1,150 @@
+"""
+Management command counting Fernet decrypt calls per request on the student list,
+students-with-disabilities and lesson adaptation endpoints.
+
+Each endpoint is measured three ways: without memoization (every property read decrypts,
+as before), with the per-instance memo on Student, and with the memo plus the opt-in
+request-scoped cache. All rows are created inside a transaction that is rolled back, and
+the adaptation runs against an offline stand-in for the LLM, so no API calls are made.
+
+Usage:
+    python manage.py benchmark_decryption --students 30
+"""
+
+import json
+import os
+import tempfile
+from contextlib import nullcontext
+from types import SimpleNamespace
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.files import File
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from classes.models import Classes
+from learningmaterial.benchmarks.corpus import generate_docx
+from learningmaterial.models import LearningMaterials
+from learningmaterial.services import lesson_adapter
+from learningmaterial.views import LearningMaterialsViewSet
+from students.models import Student
+from students.views import get_all_students, get_students_with_disabilities
+from teachers.models import Teacher
+from utils import encryption
+from utils.fields import Ciphertext
+
+
+class _CountingFernet:
+    """
+    Fernet wrapper counting decrypt calls.
+    """
+
+    def __init__(self, fernet):
+        self._fernet = fernet
+        self.decrypts = 0
+
+    def decrypt(self, token):
+        self.decrypts += 1
+        return self._fernet.decrypt(token)
+
+    def __getattr__(self, name):
+        return getattr(self._fernet, name)
+
+
+class _OfflineLLM:
+    """
+    Stand-in for the chat model returning fixed, schema-valid answers to each prompt.
+    """
+
+    def invoke(self, prompt):
+        if "disability classification" in prompt:
+            payload = {"category": "dyslexia", "notes": ""}
+        elif "adaptation strategist" in prompt:
+            payload = {"steps": ["Use short sentences"]}
+        else:
+            payload = {"adapted_title": "Lesson", "adapted_objectives": [],
+                       "adapted_content": "**Intro**\nShort sentences."}
+        return SimpleNamespace(content=f"```json\n{json.dumps(payload)}\n```")
+
+
+def _legacy_decrypt(ciphertext):
+    """
+    Pre-memoization behaviour: decrypt on every read.
+    """
+    return encryption.decrypt(ciphertext.token) if ciphertext.stored else ''
+
+
+class Command(BaseCommand):
+    help = "Count decrypt calls per request on the student list and adapt endpoints."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=30,
+                            help="Students in the benchmark class; half have disability info.")
+
+    def handle(self, *args, **options):
+        scenarios = {
+            'before': lambda: mock.patch.object(Ciphertext, 'decrypt', _legacy_decrypt),
+            'memoized': nullcontext,
+            'memo+request': encryption.decryption_cache,
+        }
+        self.stdout.write(f"{'endpoint':>9} {'students':>8} " + " ".join(f"{name:>12}" for name in scenarios))
+
+        with tempfile.TemporaryDirectory() as tmp, override_settings(MEDIA_ROOT=tmp), \
+                mock.patch.object(lesson_adapter, 'llm', _OfflineLLM()), transaction.atomic():
+            user, material = self._fixture(tmp, options['students'])
+            factory = APIRequestFactory()
+            adapt = LearningMaterialsViewSet.as_view({'post': 'adapt'})
+
+            endpoints = {
+                'list': lambda: get_all_students(self._request(factory.get('/api/students/'), user)),
+                'disabled': lambda: get_students_with_disabilities(
+                    self._request(factory.get('/api/students/with-disabilities/'), user)),
+                'adapt': lambda: adapt(self._request(factory.post('/adapt/'), user), pk=material.pk),
+            }
+            for endpoint, call in endpoints.items():
+                counts = [self._count(call, scenario) for scenario in scenarios.values()]
+                self.stdout.write(
+                    f"{endpoint:>9} {options['students']:>8} " + " ".join(f"{count:>12}" for count in counts))
+
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def _request(request, user):
+        force_authenticate(request, user=user)
+        return request
+
+    @staticmethod
+    def _count(call, scenario):
+        """
+        Run one request under a scenario and return the number of Fernet decrypts it made.
+        """
+        counter = _CountingFernet(encryption.fernet)
+        with mock.patch.object(encryption, 'fernet', counter), scenario():
+            response = call()
+            response.render()
+        return counter.decrypts
+
+    @staticmethod
+    def _fixture(tmp, count):
+        """
+        Create a teacher, a class of `count` students and a small DOCX lesson assigned to it.
+        """
+        user = User.objects.create_user(username="benchmark-decryption", password="unused")
+        teacher = Teacher.objects.get(user=user)  # Created by the teachers post_save signal
+        classroom = Classes.objects.create(teacher=teacher, class_name="Benchmark")
+        for number in range(count):
+            student = Student.objects.create(
+                first_name=f"Student{number}", last_name="Benchmark", year_level=5,
+                student_email=f"benchmark-{number}@example.com",
+                disability_info="Dyslexia" if number % 2 == 0 else "")
+            classroom.students.add(student)
+
+        source = generate_docx(os.path.join(tmp, "src", "lesson.docx"), sections=2)
+        with open(source, "rb") as f:
+            material = LearningMaterials.objects.create(
+                title="Benchmark", created_by=teacher, class_assigned=classroom,
+                file=File(f, name="lesson.docx"))
+        return user, material
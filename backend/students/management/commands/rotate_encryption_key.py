@@ -0,0 +1,95 @@
+"""
+Management command re-encrypting every student's encrypted fields under the primary key.
+
+Rotation steps:
+    1. Prepend the new key to FERNET_KEYS (e.g. FERNET_KEYS=<new>,<old>) and deploy; new
+       writes use it and old tokens keep decrypting. FERNET_KEYS requires an explicit
+       BLIND_INDEX_KEY, which must stay the same through every later rotation: the blind
+       indexes are keyed from it, not from the encryption keys.
+    2. python manage.py rotate_encryption_key --batch-size 500 --pause 0.05
+    3. Once it reports completion, drop the old key from FERNET_KEYS.
+
+Rows are processed in primary-key order, one batch per transaction: the batch is locked
+with SELECT ... FOR UPDATE, so concurrent edits are never overwritten with stale values,
+decrypted in one bulk call, and written back with bulk_update, which encrypts it under the
+primary key in the current EncryptedField format; the checkpoint is advanced in the same
+transaction. An interrupted run resumes after the last committed batch. --pause sleeps
+between batches to leave the database room for live traffic.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from students.models import ENCRYPTED_FIELDS, KeyRotationCheckpoint, Student
+from utils import encryption
+
+
+class Command(BaseCommand):
+    help = "Re-encrypt student fields under the primary FERNET_KEYS key, resumably and in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help="Students re-encrypted per transaction.")
+        parser.add_argument('--pause', type=float, default=0.0,
+                            help="Seconds to sleep between batches, to throttle the job.")
+        parser.add_argument('--restart', action='store_true',
+                            help="Ignore the saved checkpoint and start from the first student.")
+
+    def handle(self, *args, **options):
+        key_id = encryption.key_id()
+        checkpoint, _ = KeyRotationCheckpoint.objects.get_or_create(key_id=key_id)
+        if options['restart']:
+            checkpoint.last_pk, checkpoint.rows_rotated, checkpoint.completed_at = 0, 0, None
+            checkpoint.save()
+        elif checkpoint.completed_at:
+            self.stdout.write(f"Rotation to key {key_id} already completed at {checkpoint.completed_at}.")
+            return
+
+        remaining = Student.objects.filter(pk__gt=checkpoint.last_pk).count()
+        self.stdout.write(f"Rotating {remaining} students to key {key_id}, resuming after id {checkpoint.last_pk}.")
+        start = time.perf_counter()
+        invalid = 0
+
+        while True:
+            with transaction.atomic():
+                batch = list(
+                    Student.objects.select_for_update()
+                    .filter(pk__gt=checkpoint.last_pk).order_by('pk')
+                    .only('pk', *ENCRYPTED_FIELDS)[:options['batch_size']])
+                if not batch:
+                    break
+                Student.decrypt_bulk(batch)
+                for student in batch:
+                    for field in ENCRYPTED_FIELDS:
+                        value = getattr(student, field)
+                        if value == encryption.INVALID_TOKEN:
+                            # Unreadable under every key; left untouched for manual repair
+                            invalid += 1
+                        elif value:
+                            # Replace the loaded ciphertext with the plain text, bypassing the
+                            # descriptor (which would keep the unchanged ciphertext), so that
+                            # bulk_update encrypts it under the primary key
+                            student.__dict__[field] = str(value)
+                Student.objects.bulk_update(batch, ENCRYPTED_FIELDS)
+
+                checkpoint.last_pk = batch[-1].pk
+                checkpoint.rows_rotated += len(batch)
+                checkpoint.save(update_fields=['last_pk', 'rows_rotated', 'updated_at'])
+
+            elapsed = time.perf_counter() - start
+            self.stdout.write(f"  up to id {checkpoint.last_pk}: {checkpoint.rows_rotated} rows, {elapsed:.1f}s")
+            if options['pause']:
+                time.sleep(options['pause'])
+
+        checkpoint.completed_at = timezone.now()
+        checkpoint.save(update_fields=['completed_at', 'updated_at'])
+        summary = f"Rotated {checkpoint.rows_rotated} students to key {key_id}."
+        if invalid:
+            summary += f" {invalid} fields could not be decrypted and were left as they were."
+        self.stdout.write(self.style.SUCCESS(summary))
+        self.stdout.write(
+            "The old key can now be dropped from FERNET_KEYS. Keep BLIND_INDEX_KEY unchanged; "
+            "the blind indexes are keyed from it.")
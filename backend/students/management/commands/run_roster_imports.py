@@ -0,0 +1,42 @@
+"""
+Management command running the roster import jobs still pending, e.g. jobs whose
+background thread never started because the server restarted after the upload. Running
+jobs whose heartbeat went stale are requeued and run as well.
+
+Usage:
+    python manage.py run_roster_imports
+    python manage.py run_roster_imports --requeue-running   # also retry every running job
+"""
+
+from django.core.management.base import BaseCommand
+
+from students.models import RosterImportJob
+from students.services.roster_jobs import requeue_stale_jobs, run_import_job
+
+
+class Command(BaseCommand):
+    help = "Run pending CSV roster import jobs in this process."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requeue-running', action='store_true',
+                            help="Reset jobs left running by a crashed worker to pending first. "
+                                 "Only use when no other worker is importing.")
+
+    def handle(self, *args, **options):
+        if options['requeue_running']:
+            requeued = RosterImportJob.objects.filter(status=RosterImportJob.RUNNING).update(
+                status=RosterImportJob.PENDING)
+            self.stdout.write(f"Requeued {requeued} interrupted jobs.")
+        else:
+            requeued = requeue_stale_jobs(start=False)
+            self.stdout.write(f"Requeued {len(requeued)} jobs with a stale heartbeat.")
+
+        pending = RosterImportJob.objects.filter(status=RosterImportJob.PENDING).order_by('pk')
+        for job_id in pending.values_list('pk', flat=True):
+            job = run_import_job(job_id)
+            if job is None:
+                continue
+            self.stdout.write(
+                f"Job {job.pk}: {job.status}, {job.rows_processed} rows, {job.added} added, "
+                f"{job.error_count} rejected.")
+        self.stdout.write(self.style.SUCCESS("No pending roster imports left."))
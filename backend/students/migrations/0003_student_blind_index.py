@@ -0,0 +1,46 @@
+# Generated by Django 5.0.3 on 2026-10-19 10:32
+
+from django.db import migrations, models
+
+from utils.encryption import decrypt_many
+
+BACKFILL_BATCH_SIZE = 500
+
+
+def backfill_has_disability_info(apps, schema_editor):
+    """
+    Set has_disability_info on existing rows, decrypting one keyset-paginated batch at a time.
+    Categories are not known until a student is next classified, so that index starts empty.
+    """
+    Student = apps.get_model('students', 'Student')
+    last_pk = 0
+    while True:
+        batch = list(Student.objects.filter(pk__gt=last_pk).exclude(_disability_info='')
+                     .order_by('pk').only('pk', '_disability_info')[:BACKFILL_BATCH_SIZE])
+        if not batch:
+            break
+        plaintexts = decrypt_many([student._disability_info for student in batch])
+        flagged = [student.pk for student, text in zip(batch, plaintexts) if text.strip()]
+        Student.objects.filter(pk__in=flagged).update(has_disability_info=True)
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0002_alter_student_student_email'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='student',
+            name='disability_category_index',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='student',
+            name='has_disability_info',
+            field=models.BooleanField(db_index=True, default=False, editable=False),
+        ),
+        migrations.RunPython(backfill_has_disability_info, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.0.3 on 2026-10-19 10:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from students.services.name_index import index_names
+from utils.encryption import decrypt_columns
+
+BACKFILL_BATCH_SIZE = 500
+
+
+def backfill_name_tokens(apps, schema_editor):
+    """
+    Index the names of existing students, one keyset-paginated batch at a time.
+    """
+    Student = apps.get_model('students', 'Student')
+    StudentNameToken = apps.get_model('students', 'StudentNameToken')
+    last_pk = 0
+    while True:
+        batch = list(Student.objects.filter(pk__gt=last_pk).order_by('pk')
+                     .only('pk', '_first_name', '_last_name')[:BACKFILL_BATCH_SIZE])
+        if not batch:
+            break
+        names = decrypt_columns({
+            'first': [student._first_name for student in batch],
+            'last': [student._last_name for student in batch],
+        })
+        index_names(StudentNameToken, zip([student.pk for student in batch], names['first'], names['last']))
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0003_student_blind_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentNameToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=64)),
+                ('exact', models.BooleanField(default=False)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='name_tokens', to='students.student')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['token', 'student'], name='students_st_token_ba45c3_idx')],
+                'unique_together': {('student', 'token')},
+            },
+        ),
+        migrations.RunPython(backfill_name_tokens, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.0.3 on 2026-10-19 10:41
+
+from django.db import migrations
+
+import utils.fields
+
+ENCRYPTED_COLUMNS = ('first_name', 'last_name', 'disability_info')
+
+
+def add_version_prefix(apps, schema_editor):
+    """
+    Tag the bare Fernet tokens written before EncryptedField as version-1 ciphertext.
+    One set-based UPDATE per column; tokens are unchanged, so nothing is re-encrypted.
+    """
+    table = apps.get_model('students', 'Student')._meta.db_table
+    with schema_editor.connection.cursor() as cursor:
+        for column in ENCRYPTED_COLUMNS:
+            cursor.execute(
+                f"UPDATE {table} SET {column} = 'enc:v1:' || {column} "
+                f"WHERE {column} <> '' AND {column} NOT LIKE 'enc:%'")
+
+
+def remove_version_prefix(apps, schema_editor):
+    table = apps.get_model('students', 'Student')._meta.db_table
+    with schema_editor.connection.cursor() as cursor:
+        for column in ENCRYPTED_COLUMNS:
+            cursor.execute(
+                f"UPDATE {table} SET {column} = substr({column}, 8) WHERE {column} LIKE 'enc:v1:%'")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0005_keyrotationcheckpoint'),
+    ]
+
+    operations = [
+        migrations.RenameField(model_name='student', old_name='_first_name', new_name='first_name'),
+        migrations.RenameField(model_name='student', old_name='_last_name', new_name='last_name'),
+        migrations.RenameField(model_name='student', old_name='_disability_info', new_name='disability_info'),
+        migrations.AlterField(
+            model_name='student',
+            name='first_name',
+            field=utils.fields.EncryptedField(blank=True, db_column='first_name'),
+        ),
+        migrations.AlterField(
+            model_name='student',
+            name='last_name',
+            field=utils.fields.EncryptedField(blank=True, db_column='last_name'),
+        ),
+        migrations.AlterField(
+            model_name='student',
+            name='disability_info',
+            field=utils.fields.EncryptedField(blank=True, db_column='disability_info'),
+        ),
+        migrations.RunPython(add_version_prefix, remove_version_prefix),
+    ]
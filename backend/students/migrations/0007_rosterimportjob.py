@@ -0,0 +1,37 @@
+# Generated by Django 5.0.3 on 2026-10-19 10:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classes', '0001_initial'),
+        ('students', '0006_encrypted_fields'),
+        ('teachers', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RosterImportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file', models.FileField(blank=True, upload_to='roster_imports/')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], db_index=True, default='pending', max_length=20)),
+                ('total_rows', models.IntegerField(blank=True, null=True)),
+                ('rows_processed', models.IntegerField(default=0)),
+                ('added', models.IntegerField(default=0)),
+                ('already_in_class', models.IntegerField(default=0)),
+                ('created', models.IntegerField(default=0)),
+                ('error_count', models.IntegerField(default=0)),
+                ('error_report', models.FileField(blank=True, null=True, upload_to='roster_imports/errors/')),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('class_obj', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='classes.classes')),
+                ('teacher', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='roster_imports', to='teachers.teacher')),
+            ],
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.0.3 on 2026-10-19 10:53
+
+from django.db import migrations
+
+import utils.fields
+
+
+def normalize_emails(apps, schema_editor):
+    """
+    Trim and lower-case every stored email in one set-based UPDATE, so the unique index on
+    student_email becomes case-insensitive. Student.clean() rejected case-insensitive
+    duplicates, so none should exist; if some do, stop rather than merge students.
+    """
+    table = apps.get_model('students', 'Student')._meta.db_table
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT LOWER(TRIM(student_email)) FROM {table} "
+            f"GROUP BY LOWER(TRIM(student_email)) HAVING COUNT(*) > 1")
+        duplicates = [row[0] for row in cursor.fetchall()]
+        if duplicates:
+            raise RuntimeError(
+                "Students share these emails up to case and must be merged before migrating: "
+                + ", ".join(duplicates))
+        cursor.execute(
+            f"UPDATE {table} SET student_email = LOWER(TRIM(student_email)) "
+            f"WHERE student_email <> LOWER(TRIM(student_email))")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0007_rosterimportjob'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_emails, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='student',
+            name='student_email',
+            field=utils.fields.NormalizedEmailField(default='missing', error_messages={'unique': 'A student with this email already exists (case-insensitive).'}, max_length=100, unique=True),
+        ),
+    ]
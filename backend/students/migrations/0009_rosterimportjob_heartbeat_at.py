@@ -0,0 +1,18 @@
+# Generated by Django 5.0.3 on 2026-10-19 11:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0008_normalized_email'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rosterimportjob',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
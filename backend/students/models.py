@@ -1,38 +1,88 @@
 """
 Student model with encrypted personal and disability information fields.
 
-- Stores first name, last name, and disability info in encrypted form.
-- Provides properties to transparently decrypt/encrypt these fields.
-- Validates uniqueness of student email (case-insensitive).
+- Stores first name, last name, and disability info in EncryptedField columns, which read
+  as plaintext, decrypt lazily at most once, and stay encrypted through bulk ORM operations.
+- Decrypts the fields of many students in one batch (Student.decrypt_bulk).
+- Keeps keyed blind-index columns (has_disability_info, disability_category_index) so
+  disability filters run in SQL without decrypting any row.
+- Maintains a prefix blind index of the names (StudentNameToken) for server-side search.
+- Records key rotation progress (KeyRotationCheckpoint).
+- Tracks background CSV roster imports (RosterImportJob).
+- Stores student emails normalised, so the unique index is case-insensitive.
 - Supports year-level choices (Prep to Year 12).
 """
 
+import re
+
 from django.db import models
-from django.core.exceptions import ValidationError
-from utils.encryption import encrypt, decrypt
+from utils.encryption import blind_index, decrypt_columns
+from utils.fields import EncryptedField, NormalizedEmailField, get_ciphertext
+from students.services.name_index import index_names
+
+# Fields stored as encrypted ciphertext
+ENCRYPTED_FIELDS = ('disability_info', 'first_name', 'last_name')
+
+# Blind-index purpose of the classified disability category
+CATEGORY_INDEX_PURPOSE = "student.disability_category"
 
 # Allowed year levels (Prep = 0, then 1–12)
 YEAR_LEVEL_CHOICES = [(0, 'Prep')] + [(i, str(i)) for i in range(1, 13)]
 
 
+def normalize_category(category):
+    """
+    Normalise a classified disability category, e.g. "Visual Impairment" -> "visual_impairment".
+    """
+    return re.sub(r"[^a-z0-9]+", "_", category.lower()).strip("_")
+
+
+class StudentQuerySet(models.QuerySet):
+    """
+    Disability filters answered from the blind-index columns.
+    """
+
+    def with_disability_info(self):
+        """
+        Students whose disability information is not blank.
+        """
+        return self.filter(has_disability_info=True)
+
+    def with_disability_category(self, category):
+        """
+        Students last classified under the given disability category.
+        """
+        return self.filter(disability_category_index=blind_index(normalize_category(category), CATEGORY_INDEX_PURPOSE))
+
+
 class Student(models.Model):
     """
     Model representing a student with encrypted personal details and disability information.
 
     Attributes:
-        _first_name (str): Encrypted first name.
-        _last_name (str): Encrypted last name.
+        first_name (str): First name, encrypted at rest.
+        last_name (str): Last name, encrypted at rest.
         year_level (int): Year level of the student (Prep=0, then 1-12).
-        student_email (str): Unique email address of the student (case-insensitive uniqueness enforced).
-        _disability_info (str): Encrypted disability information.
+        student_email (str): Unique email address of the student, stored trimmed and lower-cased,
+            so uniqueness and lookups are case-insensitive.
+        disability_info (str): Disability information, encrypted at rest.
+        has_disability_info (bool): Whether the disability information is non-blank.
+        disability_category_index (str): Keyed hash of the disability category the
+            adaptation pipeline last classified the student under; cleared when the
+            disability information changes.
     """
-    _first_name = models.CharField(db_column='first_name', blank=True)
-    _last_name = models.CharField(db_column='last_name', blank=True)
+    first_name = EncryptedField(db_column='first_name', blank=True)
+    last_name = EncryptedField(db_column='last_name', blank=True)
     year_level = models.IntegerField(choices=YEAR_LEVEL_CHOICES)
-    student_email = models.EmailField(
-        max_length=100, default='missing', unique=True)
-    _disability_info = models.TextField(
-        db_column='disability_info', blank=True)
+    student_email = NormalizedEmailField(
+        max_length=100, default='missing', unique=True,
+        error_messages={'unique': "A student with this email already exists (case-insensitive)."})
+    disability_info = EncryptedField(db_column='disability_info', blank=True)
+    has_disability_info = models.BooleanField(default=False, db_index=True, editable=False)
+    disability_category_index = models.CharField(
+        max_length=64, blank=True, default='', db_index=True, editable=False)
+
+    objects = StudentQuerySet.as_manager()
 
     def __str__(self):
         """
@@ -40,77 +90,163 @@ class Student(models.Model):
         """
         return f"{self.first_name} {self.last_name}"
 
-    def clean(self):
+    def changed_encrypted_fields(self):
         """
-        Validate the model before saving.
-
-        Enforces case-insensitive uniqueness on student_email.
-        Raises ValidationError if a student with the same email exists.
+        Return the encrypted fields assigned new plaintext since they were loaded or saved.
         """
-        if Student.objects.exclude(pk=self.pk).filter(student_email__iexact=self.student_email).exists():
-            raise ValidationError(
-                {"student_email": "A student with this email already exists (case-insensitive)."})
+        return {field for field in ENCRYPTED_FIELDS
+                if field in self.__dict__ and get_ciphertext(self, field) is None}
 
     def save(self, *args, **kwargs):
         """
-        Override save to encrypt sensitive fields before saving.
-
-        Encrypts _disability_info, _first_name, and _last_name fields if not already encrypted.
-        Calls full_clean() to validate the model before saving.
-        """
-        if self._disability_info and not self._disability_info.startswith("gAAAA"):
-            self._disability_info = encrypt(self._disability_info)
-        if self._first_name and not self._first_name.startswith("gAAAA"):
-            self._first_name = encrypt(self._first_name)
-        if self._last_name and not self._last_name.startswith("gAAAA"):
-            self._last_name = encrypt(self._last_name)
-        self.full_clean()
+        Override save to keep the blind indexes in step with the encrypted fields.
+
+        Refreshes the disability blind-index columns when the disability information changed,
+        and the name tokens when a name changed. Encryption itself happens in EncryptedField.
+        Calls full_clean() to validate the model before saving; its unique check on the
+        normalised email is an indexed equality lookup.
+        """
+        changed = self.changed_encrypted_fields()
+        if 'disability_info' in changed:
+            self.has_disability_info = bool(self.disability_info.strip())
+            if not self._state.adding:
+                # The previous classification described the old information
+                self.disability_category_index = ''
+        # Unchanged ciphertext needs no validation, and skipping it avoids decrypting it
+        self.full_clean(exclude=[field for field in ENCRYPTED_FIELDS if field not in changed])
         super().save(*args, **kwargs)
+        if changed & {'first_name', 'last_name'}:
+            index_names(StudentNameToken, [(self.pk, self.first_name, self.last_name)])
 
-    @property
-    def disability_info(self):
+    def record_disability_category(self, category):
         """
-        Setter for disability_info property.
-        Stores the raw (unencrypted) value which will be encrypted on save.
+        Store the blind index of the category this student was classified under.
+
+        Args:
+            category (str): Category returned by the classifier, e.g. "dyslexia".
         """
-        return decrypt(self._disability_info) if self._disability_info else ''
+        self.disability_category_index = blind_index(normalize_category(category), CATEGORY_INDEX_PURPOSE)
+        Student.objects.filter(pk=self.pk).update(disability_category_index=self.disability_category_index)
 
-    @property
-    def first_name(self):
+    @classmethod
+    def index_disability_bulk(cls, students):
         """
-        Decrypt and return the first name.
+        Set has_disability_info on many students, for paths that skip save() such as
+        bulk_create; decrypts the disability column in one batch.
 
         Returns:
-            str: Decrypted first name or empty string if none.
+            list: The same students, ready for bulk_create or
+            bulk_update(['has_disability_info']).
         """
-        return decrypt(self._first_name) if self._first_name else ''
-
-    @property
-    def last_name(self):
-        return decrypt(self._last_name) if self._last_name else ''
+        cls.decrypt_bulk(students, fields=('disability_info',))
+        for student in students:
+            student.has_disability_info = bool(student.disability_info.strip())
+        return students
 
-    @disability_info.setter
-    def disability_info(self, value):
-        """
-        Setter for first_name property.
-        Stores the raw (unencrypted) value which will be encrypted on save.
+    @classmethod
+    def decrypt_bulk(cls, students, fields=ENCRYPTED_FIELDS):
         """
-        self._disability_info = value
+        Decrypt the encrypted fields of many students in one batch.
 
-    @first_name.setter
-    def first_name(self, value):
-        """
-        Decrypt and return the last name.
+        Values already decrypted, or not yet encrypted, are skipped, so the call is cheap to
+        repeat. Large batches are spread across utils.encryption's worker pool.
+
+        Args:
+            students (list): Student instances.
+            fields (tuple): Encrypted field names to decrypt.
 
         Returns:
-            str: Decrypted last name or empty string if none.
+            list: The same students.
         """
-        self._first_name = value
+        pending = {field: [] for field in fields}
+        for student in students:
+            for field in fields:
+                ciphertext = get_ciphertext(student, field)
+                if ciphertext is not None and not ciphertext.decrypted:
+                    pending[field].append(ciphertext)
 
-    @last_name.setter
-    def last_name(self, value):
-        """
-        Setter for last_name property.
-        Stores the raw (unencrypted) value which will be encrypted on save.
-        """
-        self._last_name = value
+        plaintexts = decrypt_columns({
+            field: [ciphertext.token for ciphertext in ciphertexts] for field, ciphertexts in pending.items()})
+        for field, ciphertexts in pending.items():
+            for ciphertext, plaintext in zip(ciphertexts, plaintexts[field]):
+                ciphertext.set_plaintext(plaintext)
+        return students
+
+
+class StudentNameToken(models.Model):
+    """
+    One keyed prefix hash of a student's first or last name (see students.services.name_index).
+
+    Attributes:
+        student (Student): The student the name belongs to.
+        token (str): blind_index of a lower-cased name prefix.
+        exact (bool): Whether the prefix is a whole name word.
+    """
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='name_tokens')
+    token = models.CharField(max_length=64)
+    exact = models.BooleanField(default=False)
+
+    class Meta:
+        unique_together = ('student', 'token')
+        indexes = [models.Index(fields=['token', 'student'])]
+
+
+class KeyRotationCheckpoint(models.Model):
+    """
+    Progress of re-encrypting student rows under a new primary Fernet key, so the
+    rotate_encryption_key command can resume after an interruption.
+
+    Attributes:
+        key_id (str): Fingerprint of the primary key rows are being rotated to.
+        last_pk (int): Highest Student id already rotated.
+        rows_rotated (int): Rows re-encrypted so far.
+        completed_at (datetime): When every row was rotated; null while in progress.
+    """
+    key_id = models.CharField(max_length=16, unique=True)
+    last_pk = models.BigIntegerField(default=0)
+    rows_rotated = models.IntegerField(default=0)
+    started_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+
+class RosterImportJob(models.Model):
+    """
+    A CSV roster import run in the background (see students.services.roster_jobs).
+
+    Attributes:
+        teacher (Teacher): Teacher who uploaded the file; rows may only target their classes.
+        class_obj (Classes): Class for rows without a class_name; null when every row names one.
+        file (File): The uploaded CSV, deleted once the import finishes.
+        status (str): pending, running, completed or failed.
+        total_rows (int): Data rows in the file, counted when the job starts.
+        rows_processed (int): Rows read so far, valid or not.
+        added, already_in_class, created, error_count (int): Running totals of the import.
+        error_report (File): CSV of the rejected rows and why, when there were any.
+        error (str): Why the whole import failed, for failed jobs.
+        heartbeat_at (datetime): Last sign of life of a running job, refreshed after every
+            chunk; a running job without one for a while was interrupted and is requeued.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    COMPLETED = 'completed'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(PENDING, 'Pending'), (RUNNING, 'Running'),
+                      (COMPLETED, 'Completed'), (FAILED, 'Failed')]
+
+    teacher = models.ForeignKey('teachers.Teacher', on_delete=models.CASCADE, related_name='roster_imports')
+    class_obj = models.ForeignKey('classes.Classes', on_delete=models.CASCADE, null=True, blank=True)
+    file = models.FileField(upload_to='roster_imports/', blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING, db_index=True)
+    total_rows = models.IntegerField(null=True, blank=True)
+    rows_processed = models.IntegerField(default=0)
+    added = models.IntegerField(default=0)
+    already_in_class = models.IntegerField(default=0)
+    created = models.IntegerField(default=0)
+    error_count = models.IntegerField(default=0)
+    error_report = models.FileField(upload_to='roster_imports/errors/', null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
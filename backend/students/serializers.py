@@ -12,80 +12,54 @@ Includes endpoints to:
 All endpoints require user authentication.
 """
 
+from django.urls import reverse
 from rest_framework import serializers
-from .models import Student
-from cryptography.fernet import Fernet
-from decouple import config
+from utils.serializers import SparseFieldsetsMixin
+from .models import ENCRYPTED_FIELDS, RosterImportJob, Student
 
-# Initialize the Fernet encryption key
-fernet = Fernet(config("FERNET_KEY").encode())
 
+class StudentListSerializer(serializers.ListSerializer):
+    """
+    Serialize many students, decrypting the whole list's fields in one batch first.
+    """
 
-class StudentSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Student
-        fields = '__all__'
-
-    def to_representation(self, instance):
-        """
-        Override default serialization to decrypt sensitive fields.
-
-        Converts the model instance into a dictionary of primitive data types,
-        replacing encrypted fields 'first_name', 'last_name', and 'disability_info'
-        with their decrypted values for readable API output.
-
-        Args:
-            instance (Student): The Student model instance to serialize.
-
-        Returns:
-            dict: Serialized data with decrypted fields.
-        """
-        data = super().to_representation(instance)
-        try:
-            # Use the decrypted properties for display
-            data['first_name'] = instance.first_name
-            data['last_name'] = instance.last_name
-            data['disability_info'] = instance.disability_info
-        except Exception:
-            # In case decryption fails, provide empty strings or handle accordingly
-            data['first_name'] = ""
-            data['last_name'] = ""
-            data['disability_info'] = ""
-        return data
-
-    def to_internal_value(self, data):
+    def to_representation(self, data):
         """
-        Override default deserialization to encrypt sensitive fields before saving.
-
-        Transforms incoming primitive data into validated data suitable for
-        model instance creation or update, encrypting 'first_name', 'last_name',
-        and 'disability_info' fields to ensure data security.
-
-        Args:
-            data (dict): Incoming data from request.
-
-        Returns:
-            dict: Validated and encrypted data ready for model save.
+        Decrypt every student's returned encrypted fields at once, then serialize each row
+        from the already decrypted values.
         """
-        internal_data = super().to_internal_value(data)
-
-        # Encrypt the fields if they are provided
-        if 'first_name' in data:
-            plaintext_first_name = data['first_name']
-            encrypted_first_name = fernet.encrypt(
-                plaintext_first_name.encode()).decode()
-            internal_data['first_name'] = encrypted_first_name
+        students = list(data.all() if hasattr(data, 'all') else data)
+        # Only the encrypted fields being returned (see SparseFieldsetsMixin)
+        Student.decrypt_bulk(students, fields=[field for field in ENCRYPTED_FIELDS if field in self.child.fields])
+        return super().to_representation(students)
+
+
+class StudentSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
+    """
+    Serialize students. first_name, last_name and disability_info are EncryptedFields, so
+    they are read and written as plaintext and encrypted by the model field itself; a read
+    with ?fields= decrypts only the ones it lists.
+    """
+    class Meta:
+        model = Student
+        exclude = ['disability_category_index']
+        list_serializer_class = StudentListSerializer
 
-        if 'last_name' in data:
-            plaintext_last_name = data['last_name']
-            encrypted_last_name = fernet.encrypt(
-                plaintext_last_name.encode()).decode()
-            internal_data['last_name'] = encrypted_last_name
 
-        if 'disability_info' in data:
-            plaintext_disability_info = data['disability_info']
-            encrypted_disability_info = fernet.encrypt(
-                plaintext_disability_info.encode()).decode()
-            internal_data['disability_info'] = encrypted_disability_info
+class RosterImportJobSerializer(serializers.ModelSerializer):
+    """
+    Serialize a background roster import's status and progress. error_report is the URL
+    of the authenticated rejected-rows download, or null when no row was rejected.
+    """
+    error_report = serializers.SerializerMethodField()
 
-        return internal_data
+    class Meta:
+        model = RosterImportJob
+        exclude = ['teacher', 'file']
+
+    def get_error_report(self, job):
+        if not job.error_report:
+            return None
+        url = reverse('roster_import_errors', args=[job.pk])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
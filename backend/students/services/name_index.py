@@ -0,0 +1,99 @@
+"""
+Prefix blind index over encrypted student names.
+
+Names are stored as Fernet ciphertext, so SQL cannot match them. Instead every name word
+contributes one StudentNameToken row per prefix (MIN_PREFIX to MAX_PREFIX characters), each
+holding a keyed HMAC of the lower-cased prefix (utils.encryption.blind_index). A query term
+is hashed the same way, so a case-insensitive prefix search becomes an indexed equality
+lookup and no name is decrypted to find matches.
+
+Rows are rebuilt by Student.save() whenever a name changes; index_names covers bulk paths
+and the backfill migration.
+"""
+
+import re
+
+from django.db.models import Count, Q
+
+from utils.encryption import INVALID_TOKEN, blind_index
+
+NAME_PREFIX_PURPOSE = "student.name_prefix"
+
+# Shortest searchable prefix and longest indexed one; longer query terms are truncated
+MIN_PREFIX = 2
+MAX_PREFIX = 12
+
+_WORD_SEPARATORS = re.compile(r"[\s\-']+")
+
+
+def _words(text):
+    return [word for word in _WORD_SEPARATORS.split(text.lower()) if word]
+
+
+def name_tokens(*names):
+    """
+    Return {token: exact} for every indexed prefix of the given names, where exact marks a
+    prefix that is a whole word.
+    """
+    tokens = {}
+    for name in names:
+        if name == INVALID_TOKEN:
+            continue
+        for word in _words(name or ""):
+            for length in range(MIN_PREFIX, min(len(word), MAX_PREFIX) + 1):
+                token = blind_index(word[:length], NAME_PREFIX_PURPOSE)
+                tokens[token] = tokens.get(token, False) or length == len(word)
+    return tokens
+
+
+def query_tokens(query):
+    """
+    Return the tokens for the searchable terms of a query, ignoring terms shorter than
+    MIN_PREFIX.
+    """
+    return list(dict.fromkeys(
+        blind_index(word[:MAX_PREFIX], NAME_PREFIX_PURPOSE)
+        for word in _words(query) if len(word) >= MIN_PREFIX))
+
+
+def index_names(token_model, rows):
+    """
+    Replace the name tokens of many students.
+
+    Args:
+        token_model: StudentNameToken, or its historical version in a migration.
+        rows (iterable): (student_id, first_name, last_name) plaintext tuples.
+    """
+    rows = list(rows)
+    token_model.objects.filter(student_id__in=[row[0] for row in rows]).delete()
+    token_model.objects.bulk_create([
+        token_model(student_id=student_id, token=token, exact=exact)
+        for student_id, first_name, last_name in rows
+        for token, exact in name_tokens(first_name, last_name).items()
+    ], batch_size=1000)
+
+
+def rank_name_matches(students, query):
+    """
+    Rank students whose first or last name starts with the query terms.
+
+    Students matching more terms come first, then those matching more terms as whole
+    words; ties keep id order, so pages are stable.
+
+    Args:
+        students (QuerySet): Students the search is scoped to.
+        query (str): Space-separated name prefixes.
+
+    Returns:
+        QuerySet: Values rows {'student', 'terms', 'exact'} in rank order.
+    """
+    from students.models import StudentNameToken
+
+    return (
+        StudentNameToken.objects
+        .filter(token__in=query_tokens(query), student__in=students)
+        .values('student')
+        .annotate(terms=Count('token', distinct=True),
+                  exact=Count('token', distinct=True, filter=Q(exact=True)))
+        .order_by('-terms', '-exact', 'student')
+    )
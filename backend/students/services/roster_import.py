@@ -0,0 +1,265 @@
+"""
+Set-based CSV roster import, shared by the student and class upload endpoints.
+
+The file is parsed as a stream and validated row by row in memory. Valid rows are then
+handled in chunks, one transaction each, with a fixed number of queries per chunk:
+
+    1. fetch the students whose emails are already known (one indexed email IN query);
+    2. bulk_create the new students, their PII encrypted by EncryptedField and their
+       disability flag set in memory, then replace their name tokens in bulk;
+    3. fetch the chunk's existing enrolments and bulk insert the missing through-table rows.
+
+Rows are enrolled in the given class, or, when the file has a class_name column and the
+caller passes the candidate classes, in the class that row names. Existing students are
+enrolled as they are; the CSV never overwrites their details, so their year_level column is
+not validated either, and only rows creating a student need a valid one.
+
+Whole-school files are imported in the background by students.services.roster_jobs.
+"""
+
+import codecs
+import csv
+from dataclasses import dataclass, field
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+
+from classes.models import Classes
+from students.models import Student, StudentNameToken
+from students.services.name_index import index_names
+
+# Valid rows handled per transaction
+CHUNK_SIZE = 500
+
+REQUIRED_COLUMNS = ('student_email',)
+
+
+class RosterImportError(Exception):
+    """
+    Raised when the uploaded file as a whole cannot be read as a roster.
+    """
+
+
+@dataclass
+class RosterRow:
+    line: int
+    email: str
+    class_id: int
+    class_name: str
+    first_name: str
+    last_name: str
+    year_level: str
+    disability_info: str
+
+
+@dataclass
+class RosterImportResult:
+    """
+    Outcome of an import.
+
+    Attributes:
+        added (list): Emails enrolled in the class by this import.
+        already_in_class (list): Emails that were already enrolled, or repeated in the file.
+        created (int): Students that did not exist before the import.
+        errors (list): {"line", "email", "class_name", "error"} for every rejected row.
+        rows (int): Rows read from the file so far, including rejected ones.
+    """
+    added: list = field(default_factory=list)
+    already_in_class: list = field(default_factory=list)
+    created: int = 0
+    errors: list = field(default_factory=list)
+    rows: int = 0
+
+    def merge(self, other):
+        self.added += other.added
+        self.already_in_class += other.already_in_class
+        self.created += other.created
+        self.errors += other.errors
+
+
+def _parse_year_level(value):
+    value = (value or "").strip()
+    if value.lower() == "prep":
+        return 0
+    try:
+        year_level = int(value)
+    except ValueError:
+        raise ValidationError("year_level must be Prep or a number from 0 to 12.")
+    if not 0 <= year_level <= 12:
+        raise ValidationError("year_level must be Prep or a number from 0 to 12.")
+    return year_level
+
+
+def parse_roster(csv_file, result, class_obj=None, classes_by_name=None):
+    """
+    Yield a RosterRow for every valid line of an uploaded CSV file, recording invalid lines
+    in result.errors. Emails are lower-cased; repeats of an email already seen in the file
+    for the same class are reported under already_in_class. year_level is left unparsed,
+    since it only matters for rows that create a student (see _import_chunk).
+
+    A row goes to the class named in its class_name column when classes_by_name is given
+    and the column is filled in, and to class_obj otherwise.
+
+    Raises:
+        RosterImportError: If the file is not UTF-8 or lacks a required column.
+    """
+    reader = csv.DictReader(codecs.iterdecode(csv_file, "utf-8-sig"))
+    seen = set()
+    try:
+        missing = [column for column in REQUIRED_COLUMNS if column not in (reader.fieldnames or [])]
+        if missing:
+            raise RosterImportError(f"CSV is missing required columns: {', '.join(missing)}")
+
+        for row in reader:
+            result.rows += 1
+            line = reader.line_num
+            email = (row.get("student_email") or "").strip().lower()
+            class_name = (row.get("class_name") or "").strip()
+            if not email:
+                continue
+            try:
+                if classes_by_name is not None and class_name:
+                    target = classes_by_name.get(class_name.lower())
+                    if target is None:
+                        raise ValidationError(f"Unknown class '{class_name}'.")
+                elif class_obj is not None:
+                    target = class_obj
+                else:
+                    raise ValidationError("class_name is required.")
+                if (email, target.pk) in seen:
+                    result.already_in_class.append(email)
+                    continue
+                validate_email(email)
+                if len(email) > 100:
+                    raise ValidationError("student_email is longer than 100 characters.")
+            except ValidationError as e:
+                result.errors.append(
+                    {"line": line, "email": email, "class_name": class_name, "error": e.messages[0]})
+                continue
+            seen.add((email, target.pk))
+            yield RosterRow(
+                line=line,
+                email=email,
+                class_id=target.pk,
+                class_name=class_name,
+                first_name=(row.get("first_name") or "").strip(),
+                last_name=(row.get("last_name") or "").strip(),
+                year_level=row.get("year_level") or "",
+                disability_info=(row.get("disability_info") or "").strip(),
+            )
+    except UnicodeDecodeError:
+        raise RosterImportError("CSV file must be UTF-8 encoded.")
+
+
+def _import_chunk(rows, result):
+    Enrolment = Classes.students.through
+    first_rows = {}
+    for row in rows:
+        first_rows.setdefault(row.email, row)
+
+    existing = dict(
+        Student.objects.filter(student_email__in=list(first_rows)).values_list("student_email", "id"))
+
+    # Only a row creating a student needs a valid year_level; every row of a student that
+    # cannot be created is rejected with the reason
+    new_students, rejected = [], {}
+    for email, row in first_rows.items():
+        if email in existing:
+            continue
+        try:
+            year_level = _parse_year_level(row.year_level)
+        except ValidationError as e:
+            rejected[email] = e.messages[0]
+            continue
+        new_students.append(Student(
+            student_email=row.email,
+            first_name=row.first_name,
+            last_name=row.last_name,
+            year_level=year_level,
+            disability_info=row.disability_info,
+        ))
+    if rejected:
+        result.errors += [
+            {"line": row.line, "email": row.email, "class_name": row.class_name, "error": rejected[row.email]}
+            for row in rows if row.email in rejected]
+        rows = [row for row in rows if row.email not in rejected]
+
+    Student.index_disability_bulk(new_students)
+    if new_students:
+        Student.objects.bulk_create(new_students)
+        index_names(StudentNameToken, [
+            (student.pk, student.first_name, student.last_name) for student in new_students])
+        existing.update((student.student_email, student.pk) for student in new_students)
+
+    enrolled = set(
+        Enrolment.objects.filter(classes_id__in={row.class_id for row in rows},
+                                 student_id__in=existing.values())
+        .values_list("classes_id", "student_id"))
+    Enrolment.objects.bulk_create([
+        Enrolment(classes_id=row.class_id, student_id=existing[row.email])
+        for row in rows if (row.class_id, existing[row.email]) not in enrolled
+    ], ignore_conflicts=True)
+
+    result.created += len(new_students)
+    for row in rows:
+        if (row.class_id, existing[row.email]) in enrolled:
+            result.already_in_class.append(row.email)
+        else:
+            result.added.append(row.email)
+
+
+def _import_chunk_atomic(rows, result):
+    """
+    Import a chunk in one transaction, retrying once if a concurrent import created one of
+    its students first (the retry then finds that student among the existing ones).
+    """
+    for attempt in range(2):
+        chunk_result = RosterImportResult()
+        try:
+            with transaction.atomic():
+                _import_chunk(rows, chunk_result)
+        except IntegrityError:
+            if attempt:
+                raise
+            continue
+        result.merge(chunk_result)
+        return
+
+
+def import_roster(csv_file, class_obj=None, classes_by_name=None, chunk_size=CHUNK_SIZE, progress=None):
+    """
+    Enrol the students listed in a CSV file in their classes, creating the ones that are new.
+
+    Args:
+        csv_file: Uploaded or stored file (or any iterable of bytes lines) with student_email
+            and year_level columns, and optional first_name, last_name, disability_info and
+            class_name ones.
+        class_obj (Classes): Class for rows that do not name one.
+        classes_by_name (dict): Lower-cased class name -> Classes, the classes a class_name
+            column may refer to; None ignores the column.
+        chunk_size (int): Valid rows handled per transaction.
+        progress (callable): Called with the running RosterImportResult after every chunk.
+
+    Returns:
+        RosterImportResult
+
+    Raises:
+        RosterImportError: If the file cannot be read as a roster.
+    """
+    result = RosterImportResult()
+    chunk = []
+    for row in parse_roster(csv_file, result, class_obj, classes_by_name):
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            _import_chunk_atomic(chunk, result)
+            chunk = []
+            if progress:
+                progress(result)
+    if chunk:
+        _import_chunk_atomic(chunk, result)
+    # Rows rejected while importing a chunk were reported after later lines failed parsing
+    result.errors.sort(key=lambda error: error["line"])
+    if progress:
+        progress(result)
+    return result
@@ -0,0 +1,151 @@
+"""
+Background CSV roster imports.
+
+A whole-school export of several thousand students takes too long to import inside a
+request, so the upload view only stores the file and records a RosterImportJob. Once that
+transaction commits, the job runs on a daemon thread:
+
+- the stored file is streamed from storage into students.services.roster_import, which
+  commits one chunk at a time;
+- after every chunk the job's running totals are saved, so the status endpoint can report
+  progress;
+- rejected rows are written to a CSV error report (line, email, class and reason, never
+  the student's details), and the uploaded file, which holds plaintext PII, is deleted.
+
+A running job refreshes its heartbeat after every chunk. A restart kills the daemon thread
+mid-import and leaves the job running with a stale heartbeat; requeue_stale_jobs, called
+whenever an import is started or its status polled, puts such jobs back to pending and runs
+them again. Chunks the interrupted run committed are found again and reported under
+already_in_class. Jobs left pending, e.g. by a restart before the thread ran, are picked up
+by the run_roster_imports management command.
+"""
+
+import csv
+import io
+import logging
+import threading
+from datetime import timedelta
+
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from classes.models import Classes
+from students.models import RosterImportJob
+from students.services.roster_import import RosterImportError, import_roster
+
+logger = logging.getLogger(__name__)
+
+ERROR_REPORT_COLUMNS = ("line", "email", "class_name", "error")
+
+# A running job whose heartbeat is older than this is taken to have lost its thread
+STALE_AFTER = timedelta(minutes=10)
+
+
+def start_import(job):
+    """
+    Run a pending job on a background thread once the current transaction commits.
+    """
+    transaction.on_commit(
+        lambda: threading.Thread(target=_run_in_thread, args=(job.pk,), daemon=True).start())
+
+
+def _run_in_thread(job_id):
+    try:
+        run_import_job(job_id)
+    finally:
+        # The thread opened its own database connection
+        connection.close()
+
+
+def _stale_running_jobs(jobs):
+    cutoff = timezone.now() - STALE_AFTER
+    return jobs.filter(
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff),
+        status=RosterImportJob.RUNNING)
+
+
+def requeue_stale_jobs(jobs=None, start=True):
+    """
+    Put running jobs whose heartbeat went stale back to pending and start them again.
+
+    Args:
+        jobs (QuerySet): Jobs to check, all jobs by default.
+        start (bool): Start each requeued job on a background thread; without it the jobs
+            are left pending for the caller to run.
+
+    Returns:
+        list: IDs of the requeued jobs.
+    """
+    jobs = RosterImportJob.objects.all() if jobs is None else jobs
+    requeued = []
+    for job_id in _stale_running_jobs(jobs).values_list('pk', flat=True):
+        # Only one poller wins the update, so a job is never started twice
+        if _stale_running_jobs(RosterImportJob.objects.filter(pk=job_id)).update(
+                status=RosterImportJob.PENDING, heartbeat_at=None):
+            logger.warning("Requeued roster import %s after its worker stopped", job_id)
+            if start:
+                start_import(RosterImportJob(pk=job_id))
+            requeued.append(job_id)
+    return requeued
+
+
+def _count_rows(job):
+    with job.file.open("rb") as stored:
+        return max(sum(1 for _ in csv.reader(line.decode("utf-8-sig", "replace") for line in stored)) - 1, 0)
+
+
+def _write_error_report(job, errors):
+    report = io.StringIO()
+    writer = csv.DictWriter(report, fieldnames=ERROR_REPORT_COLUMNS)
+    writer.writeheader()
+    writer.writerows(errors)
+    job.error_report.save(f"roster_import_{job.pk}_errors.csv", ContentFile(report.getvalue().encode()), save=False)
+
+
+def run_import_job(job_id):
+    """
+    Run a pending import job to completion; does nothing if another worker claimed it.
+
+    Returns:
+        RosterImportJob: The finished job, or None if it was not pending.
+    """
+    now = timezone.now()
+    claimed = RosterImportJob.objects.filter(pk=job_id, status=RosterImportJob.PENDING).update(
+        status=RosterImportJob.RUNNING, started_at=now, heartbeat_at=now)
+    if not claimed:
+        return None
+    job = RosterImportJob.objects.select_related('class_obj').get(pk=job_id)
+
+    def save_progress(result):
+        job.rows_processed = result.rows
+        job.added = len(result.added)
+        job.already_in_class = len(result.already_in_class)
+        job.created = result.created
+        job.error_count = len(result.errors)
+        job.heartbeat_at = timezone.now()
+        job.save(update_fields=['rows_processed', 'added', 'already_in_class', 'created', 'error_count',
+                                'heartbeat_at'])
+
+    try:
+        job.total_rows = _count_rows(job)
+        job.heartbeat_at = timezone.now()
+        job.save(update_fields=['total_rows', 'heartbeat_at'])
+        classes_by_name = {
+            cls.class_name.lower(): cls for cls in Classes.objects.filter(teacher_id=job.teacher_id)}
+        with job.file.open("rb") as stored:
+            result = import_roster(stored, job.class_obj, classes_by_name, progress=save_progress)
+        if result.errors:
+            _write_error_report(job, result.errors)
+        job.status = RosterImportJob.COMPLETED
+    except RosterImportError as e:
+        job.status, job.error = RosterImportJob.FAILED, str(e)
+    except Exception:
+        logger.exception("Roster import %s failed", job_id)
+        job.status, job.error = RosterImportJob.FAILED, "The import failed unexpectedly."
+
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'error', 'error_report', 'finished_at'])
+    job.file.delete(save=True)
+    return job
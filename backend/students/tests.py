@@ -1,3 +1,644 @@
-from django.test import TestCase
+"""
+Tests for the Student model's encrypted fields, blind indexes, name search,
+key rotation and roster imports.
+"""
 
-# Create your tests here.
+import copy
+import io
+import os
+import pickle
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from cryptography.fernet import Fernet, MultiFernet
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from classes.models import Classes
+from nccdreports.models import NCCDreport
+from students.models import KeyRotationCheckpoint, RosterImportJob, Student
+from students.serializers import StudentSerializer
+from students.services import roster_jobs
+from students.services.roster_import import import_roster
+from students.services.roster_jobs import run_import_job
+from teachers.models import Teacher
+from utils import encryption
+from utils.fields import Ciphertext, get_ciphertext
+
+
+class StudentDecryptionTest(TestCase):
+    """
+    Test suite for memoized decryption and the request-scoped plaintext cache.
+    """
+
+    def setUp(self):
+        Student.objects.create(
+            first_name="Ada", last_name="Lovelace", year_level=5,
+            student_email="ada@example.com", disability_info="Dyslexia")
+
+    def count_decrypts(self):
+        return mock.patch.object(encryption.fernet, 'decrypt', wraps=encryption.fernet.decrypt)
+
+    def test_fields_are_decrypted_once_per_token(self):
+        """
+        Test that repeated reads decrypt once, that assigned values are encrypted on save
+        without being decrypted again, and that update() and reloads are picked up.
+        """
+        student = Student.objects.get(student_email="ada@example.com")
+        with self.count_decrypts() as decrypt:
+            self.assertEqual([student.first_name, student.first_name, str(student)], ["Ada", "Ada", "Ada Lovelace"])
+            self.assertEqual(decrypt.call_count, 2)
+
+            student.first_name = "Grace"
+            self.assertEqual(student.first_name, "Grace")
+            student.save()
+            self.assertTrue(get_ciphertext(student, "first_name").stored.startswith("enc:v1:gAAAA"))
+            self.assertEqual(student.first_name, "Grace")
+            self.assertEqual(decrypt.call_count, 2)
+
+            Student.objects.filter(pk=student.pk).update(first_name="Alan")
+            student = Student.objects.get(pk=student.pk)
+            self.assertEqual(student.first_name, "Alan")
+            self.assertEqual(decrypt.call_count, 3)
+
+    def test_request_cache_is_shared_across_instances(self):
+        """
+        Test that within decryption_cache separate instances of a row share plaintexts.
+        """
+        with self.count_decrypts() as decrypt:
+            with encryption.decryption_cache():
+                for _ in range(3):
+                    self.assertEqual(Student.objects.get().disability_info, "Dyslexia")
+            self.assertEqual(decrypt.call_count, 1)
+            Student.objects.get().disability_info
+            self.assertEqual(decrypt.call_count, 2)
+
+    def test_list_serializer_decrypts_in_one_batch(self):
+        """
+        Test that serializing many students decrypts every field through one bulk call,
+        inline below the threshold and through the worker pool above it.
+        """
+        Student.objects.create(
+            first_name="Alan", last_name="Turing", year_level=6, student_email="alan@example.com")
+        with mock.patch.object(encryption, 'decrypt_many', wraps=encryption.decrypt_many) as decrypt_many, \
+                mock.patch.object(encryption, 'decrypt', wraps=encryption.decrypt) as decrypt:
+            data = StudentSerializer(Student.objects.order_by('id'), many=True).data
+        self.assertEqual(decrypt_many.call_count, 1)
+        decrypt.assert_not_called()
+        self.assertEqual(
+            [(row['first_name'], row['disability_info']) for row in data], [("Ada", "Dyslexia"), ("Alan", "")])
+
+        tokens = [encryption.encrypt(str(i)) for i in range(4)] + ["", "not-a-token"]
+        with mock.patch.multiple(encryption, BULK_DECRYPT_THRESHOLD=2, BULK_DECRYPT_WORKERS=2):
+            self.assertEqual(
+                encryption.decrypt_many(tokens), ["0", "1", "2", "3", "", encryption.INVALID_TOKEN])
+
+
+class StudentBlindIndexTest(TestCase):
+    """
+    Test suite for the disability blind-index columns.
+    """
+
+    def test_disability_filters_run_on_the_index(self):
+        """
+        Test that save() maintains has_disability_info, that category lookups match the
+        normalised category, and that changed information resets the category.
+        """
+        ada = Student.objects.create(
+            first_name="Ada", year_level=5, student_email="ada@example.com", disability_info="Dyslexia")
+        alan = Student.objects.create(first_name="Alan", year_level=6, student_email="alan@example.com")
+        ada.record_disability_category("Dyslexia")
+
+        with mock.patch.object(encryption.fernet, 'decrypt') as decrypt:
+            self.assertEqual(list(Student.objects.with_disability_info()), [ada])
+            self.assertEqual(list(Student.objects.with_disability_category(" dyslexia ")), [ada])
+            self.assertFalse(Student.objects.with_disability_category("adhd").exists())
+        decrypt.assert_not_called()
+
+        ada = Student.objects.get(pk=ada.pk)
+        ada.save()
+        self.assertTrue(Student.objects.with_disability_category("dyslexia").exists())
+        ada.disability_info = " "
+        ada.save()
+        alan.disability_info = "ADHD"
+        alan.save()
+        self.assertEqual(list(Student.objects.with_disability_info()), [alan])
+        self.assertFalse(Student.objects.with_disability_category("dyslexia").exists())
+
+        rows = Student.index_disability_bulk([
+            Student(disability_info=Ciphertext.from_token(encryption.encrypt("Low vision"))), Student()])
+        self.assertEqual([row.has_disability_info for row in rows], [True, False])
+
+
+class StudentNameSearchTest(TestCase):
+    """
+    Test suite for the name blind index and the search endpoint.
+    """
+
+    def setUp(self):
+        user = User.objects.create_user(username="teacher", password="pw")
+        teacher = Teacher.objects.get(user=user)  # Created by the teachers post_save signal
+        classroom = Classes.objects.create(teacher=teacher, class_name="Maths")
+        for first, last in [("Ada", "Lovelace"), ("Adam", "Smith"), ("Grace", "Adams"), ("Alan", "Turing")]:
+            student = Student.objects.create(
+                first_name=first, last_name=last, year_level=5, student_email=f"{first.lower()}@example.com")
+            classroom.students.add(student)
+        # Not in this teacher's classes
+        Student.objects.create(first_name="Adele", last_name="Other", year_level=5, student_email="adele@example.com")
+
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def search(self, **params):
+        return self.client.get("/api/students/search/", params)
+
+    def test_prefix_search_is_ranked_scoped_and_paginated(self):
+        """
+        Test that prefixes match either name case-insensitively, whole words rank first,
+        other teachers' students are excluded, and results are paginated.
+        """
+        response = self.search(q="ADA")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 3)
+        self.assertEqual([row["first_name"] for row in response.data["results"]], ["Ada", "Adam", "Grace"])
+
+        self.assertEqual([row["last_name"] for row in self.search(q="ada lov").data["results"]][0], "Lovelace")
+        page = self.search(q="ad", page_size=2, page=2).data
+        self.assertEqual((page["count"], len(page["results"])), (3, 1))
+        self.assertEqual(self.search(q="a").status_code, 400)
+
+    def test_renaming_reindexes_the_student(self):
+        """
+        Test that saving a new name replaces the student's tokens.
+        """
+        student = Student.objects.get(student_email="alan@example.com")
+        student.first_name = "Kurt"
+        student.save()
+        self.assertEqual(self.search(q="alan").data["count"], 0)
+        self.assertEqual([row["id"] for row in self.search(q="ku").data["results"]], [student.pk])
+
+
+class KeyRotationTest(TestCase):
+    """
+    Test suite for multi-key encryption and the rotate_encryption_key command.
+    """
+
+    def test_rotation_reencrypts_under_the_new_key_and_resumes(self):
+        """
+        Test that rows written under the old key are re-encrypted under the new primary key
+        in batches, that names stay searchable, and that a finished rotation is not repeated.
+        """
+        for i in range(3):
+            Student.objects.create(
+                first_name=f"Ada{i}", year_level=5, student_email=f"s{i}@example.com", disability_info="Dyslexia")
+
+        new_key = Fernet.generate_key()
+        keys = [new_key, *encryption.FERNET_KEYS]
+        with mock.patch.multiple(encryption, FERNET_KEYS=keys,
+                                 fernet=MultiFernet([Fernet(key) for key in keys])):
+            call_command("rotate_encryption_key", batch_size=2, stdout=io.StringIO())
+            checkpoint = KeyRotationCheckpoint.objects.get(key_id=encryption.key_id())
+            self.assertEqual((checkpoint.rows_rotated, checkpoint.completed_at is not None), (3, True))
+
+            out = io.StringIO()
+            call_command("rotate_encryption_key", stdout=out)
+            self.assertIn("already completed", out.getvalue())
+
+            student = Student.objects.get(student_email="s1@example.com")
+            self.assertEqual(student.first_name, "Ada1")
+            self.assertEqual(Student.objects.with_disability_info().count(), 3)
+        token = get_ciphertext(student, "first_name").token
+        self.assertEqual(Fernet(new_key).decrypt(token.encode()), b"Ada1")
+        self.assertEqual(encryption.decrypt(token), encryption.INVALID_TOKEN)
+
+
+class EncryptedFieldTest(TestCase):
+    """
+    Test suite for EncryptedField storage through bulk ORM operations.
+    """
+
+    def test_bulk_operations_encrypt_exactly_once(self):
+        """
+        Test that bulk_create and bulk_update store versioned ciphertext, that unchanged
+        values keep their ciphertext, and that legacy bare tokens still read.
+        """
+        Student.objects.bulk_create([
+            Student(first_name="Ada", year_level=5, student_email="ada@example.com"),
+            Student(first_name="Alan", year_level=5, student_email="alan@example.com"),
+        ])
+        ada, alan = Student.objects.order_by('student_email')
+        stored = get_ciphertext(ada, "first_name").stored
+        self.assertTrue(stored.startswith("enc:v1:"))
+
+        alan.last_name = "Turing"
+        Student.objects.bulk_update([ada, alan], ["first_name", "last_name"])
+        ada, alan = Student.objects.order_by('student_email')
+        self.assertEqual(get_ciphertext(ada, "first_name").stored, stored)
+        self.assertEqual((ada.first_name, alan.first_name, alan.last_name), ("Ada", "Alan", "Turing"))
+
+        with connection.cursor() as cursor:
+            cursor.execute("UPDATE students_student SET first_name = %s WHERE id = %s",
+                           [encryption.encrypt("Legacy"), ada.pk])
+        ada.refresh_from_db()
+        self.assertEqual((get_ciphertext(ada, "first_name").version, ada.first_name), ("v0", "Legacy"))
+
+    def test_decrypted_values_copy_and_pickle(self):
+        """
+        Test that decrypted values and instances holding them survive copy, deepcopy and a
+        pickle round trip.
+        """
+        Student.objects.create(first_name="Ada", year_level=5, student_email="ada@example.com")
+        student = Student.objects.get()
+        name = student.first_name
+        for value in (copy.copy(name), copy.deepcopy(name), pickle.loads(pickle.dumps(name))):
+            self.assertEqual((type(value), value), (str, "Ada"))
+
+        restored = pickle.loads(pickle.dumps(copy.deepcopy(student)))
+        self.assertEqual(restored.first_name, "Ada")
+        self.assertEqual(get_ciphertext(restored, "first_name"), get_ciphertext(student, "first_name"))
+
+
+class RosterImportTest(TestCase):
+    """
+    Test suite for the set-based CSV roster import behind both upload endpoints.
+    """
+
+    def setUp(self):
+        user = User.objects.create_user(username="teacher", password="pw")
+        teacher = Teacher.objects.get(user=user)  # Created by the teachers post_save signal
+        self.classroom = Classes.objects.create(teacher=teacher, class_name="Maths")
+        enrolled = Student.objects.create(
+            first_name="Ada", last_name="Lovelace", year_level=5, student_email="Ada@Example.com")
+        self.classroom.students.add(enrolled)
+        Student.objects.create(first_name="Grace", last_name="Hopper", year_level=5, student_email="grace@example.com")
+
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def roster(self, count, extra=""):
+        lines = ["student_email,first_name,last_name,year_level,disability_info"]
+        lines += [f"pupil{i}@example.com,Pupil,Number{i},{i % 13},{'Dyslexia' if i % 2 else ''}" for i in range(count)]
+        return io.BytesIO(("\n".join(lines) + "\n" + extra).encode())
+
+    def test_import_uses_a_fixed_number_of_queries(self):
+        """
+        Test that an import costs the same queries per chunk whatever its size, bar the
+        batched inserts (whose batch size depends on the database backend), and that the
+        students are stored encrypted with their blind indexes.
+        """
+        def import_counting_queries(count, classroom):
+            with CaptureQueriesContext(connection) as ctx:
+                result = import_roster(self.roster(count), classroom)
+            inserts = [q for q in ctx.captured_queries if q["sql"].lstrip().upper().startswith("INSERT")]
+            return result, len(ctx.captured_queries) - len(inserts), len(inserts)
+
+        result, small_queries, _ = import_counting_queries(50, self.classroom)
+        self.assertEqual(result.created, 50)
+        other = Classes.objects.create(teacher=self.classroom.teacher, class_name="Science")
+        result, large_queries, large_inserts = import_counting_queries(500, other)
+        self.assertEqual((result.created, len(result.added)), (450, 500))
+        self.assertEqual(large_queries, small_queries)
+        # 450 students, about 5000 name tokens and 500 enrolments, inserted in batches
+        self.assertLess(large_inserts, 50)
+
+        student = Student.objects.get(student_email="pupil7@example.com")
+        self.assertTrue(get_ciphertext(student, 'last_name').stored.startswith("enc:v1:"))
+        self.assertEqual(student.last_name, "Number7")
+        self.assertTrue(student.has_disability_info)
+        self.assertEqual(Student.objects.with_disability_info().count(), 250)
+        self.assertEqual(self.client.get("/api/students/search/", {"q": "number499"}).data["count"], 1)
+
+    def test_endpoints_report_added_existing_and_invalid_rows(self):
+        """
+        Test that both endpoints keep their response shapes, match existing emails
+        case-insensitively, and skip invalid rows.
+        """
+        extra = ("ADA@example.com,Ada,Lovelace,5,\n"
+                 "grace@example.com,Grace,Hopper,5,\n"
+                 "pupil0@example.com,Pupil,Again,1,\n"
+                 "not-an-email,Bad,Row,3,\n"
+                 "bad.year@example.com,Bad,Year,13,\n")
+        csv_file = self.roster(2, extra)
+        csv_file.name = "roster.csv"
+        response = self.client.post(
+            "/api/classes/upload-csv/", {"file": csv_file, "class_id": self.classroom.id}, format="multipart")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["added_to_class"],
+                         ["pupil0@example.com", "pupil1@example.com", "grace@example.com"])
+        self.assertEqual(sorted(response.data["already_in_class"]), ["ada@example.com", "pupil0@example.com"])
+        self.assertEqual([error["line"] for error in response.data["errors"]], [7, 8])
+        self.assertEqual(Student.objects.count(), 4)
+        self.assertEqual(self.classroom.students.count(), 4)
+
+        csv_file = self.roster(3)
+        csv_file.name = "roster.csv"
+        response = self.client.post(
+            "/api/students/classes/upload-csv/", {"file": csv_file, "class_id": self.classroom.id},
+            format="multipart")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data["added"], response.data["duplicates"]),
+                         (1, ["pupil0@example.com", "pupil1@example.com"]))
+
+        csv_file = io.BytesIO(b"email,name\nx@example.com,X\n")
+        csv_file.name = "roster.csv"
+        response = self.client.post(
+            "/api/students/classes/upload-csv/", {"file": csv_file, "class_id": self.classroom.id},
+            format="multipart")
+        self.assertEqual(response.status_code, 400)
+
+    def test_year_level_is_only_required_for_new_students(self):
+        """
+        Test that rows for existing students are enrolled whatever their year_level, while a
+        new student with a missing one is rejected on its line.
+        """
+        csv_file = io.BytesIO(b"student_email,first_name\nada@example.com,Ada\n"
+                              b"grace@example.com,Grace\nnew@example.com,New\n")
+        result = import_roster(csv_file, self.classroom)
+        self.assertEqual((result.added, result.already_in_class), (["grace@example.com"], ["ada@example.com"]))
+        self.assertEqual([(error["line"], error["email"]) for error in result.errors], [(4, "new@example.com")])
+        self.assertIn("year_level", result.errors[0]["error"])
+        self.assertEqual(Student.objects.count(), 2)
+
+
+class RosterImportJobTest(TestCase):
+    """
+    Test suite for background roster imports, their status endpoint and error report.
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.settings = override_settings(MEDIA_ROOT=self.tmp.name)
+        self.settings.enable()
+        user = User.objects.create_user(username="teacher", password="pw")
+        self.teacher = Teacher.objects.get(user=user)  # Created by the teachers post_save signal
+        self.maths = Classes.objects.create(teacher=self.teacher, class_name="Maths")
+        self.science = Classes.objects.create(teacher=self.teacher, class_name="Science")
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def tearDown(self):
+        self.settings.disable()
+        self.tmp.cleanup()
+
+    def upload(self, content, **data):
+        csv_file = io.BytesIO(content.encode())
+        csv_file.name = "school.csv"
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post("/api/students/imports/", {"file": csv_file, **data}, format="multipart")
+        # The background thread would run the job; run it here instead
+        self.assertEqual(len(callbacks), 1)
+        run_import_job(response.data["id"])
+        return response
+
+    def test_rows_are_imported_into_their_named_classes(self):
+        """
+        Test that the job routes rows by class_name (falling back to class_id), reports
+        progress and totals, offers the rejected rows as CSV and deletes the upload.
+        """
+        other_user = User.objects.create_user(username="other", password="pw")
+        Classes.objects.create(teacher=Teacher.objects.get(user=other_user), class_name="History")
+        response = self.upload(
+            "student_email,first_name,last_name,year_level,class_name\n"
+            "ada@example.com,Ada,Lovelace,5,maths\n"
+            "ada@example.com,Ada,Lovelace,5,Science\n"
+            "alan@example.com,Alan,Turing,6,\n"
+            "grace@example.com,Grace,Hopper,5,History\n"
+            "bad,Bad,Email,5,Maths\n",
+            class_id=self.science.id)
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data["status"], RosterImportJob.PENDING)
+
+        job = self.client.get(f"/api/students/imports/{response.data['id']}/").data
+        self.assertEqual(job["status"], RosterImportJob.COMPLETED)
+        self.assertEqual((job["total_rows"], job["rows_processed"], job["added"], job["created"], job["error_count"]),
+                         (5, 5, 3, 2, 2))
+        self.assertEqual(sorted(s.student_email for s in self.maths.students.all()), ["ada@example.com"])
+        self.assertEqual(sorted(s.student_email for s in self.science.students.all()),
+                         ["ada@example.com", "alan@example.com"])
+
+        report = self.client.get(job["error_report"])
+        self.assertEqual(report.status_code, 200)
+        lines = b"".join(report.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], "line,email,class_name,error")
+        self.assertEqual([line.split(",")[0] for line in lines[1:]], ["5", "6"])
+        self.assertIn("Unknown class", lines[1])
+        self.assertFalse(RosterImportJob.objects.get().file)
+        self.assertEqual(os.listdir(os.path.join(self.tmp.name, "roster_imports")), ["errors"])
+
+        self.client.force_authenticate(other_user)
+        self.assertEqual(self.client.get(f"/api/students/imports/{job['id']}/").status_code, 404)
+
+    def test_interrupted_job_is_requeued_when_polled(self):
+        """
+        Test that a running job whose heartbeat went stale is put back to pending and run
+        again on the next poll, while a live one is left alone.
+        """
+        response = self.upload("student_email,year_level\nada@example.com,5\n", class_id=self.maths.id)
+        job = RosterImportJob.objects.get(pk=response.data["id"])
+        # As if the worker had died while importing a second file
+        job.status, job.heartbeat_at = RosterImportJob.RUNNING, timezone.now()
+        job.file.save("again.csv", ContentFile(b"student_email,year_level\nalan@example.com,6\n"))
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.client.get(f"/api/students/imports/{job.pk}/")
+        self.assertEqual(len(callbacks), 0)
+
+        RosterImportJob.objects.filter(pk=job.pk).update(
+            heartbeat_at=timezone.now() - roster_jobs.STALE_AFTER - timedelta(seconds=1))
+        with mock.patch.object(roster_jobs.threading, "Thread") as thread, self.assertLogs(roster_jobs.logger), \
+                self.captureOnCommitCallbacks(execute=True):
+            polled = self.client.get(f"/api/students/imports/{job.pk}/").data
+        self.assertEqual(polled["status"], RosterImportJob.PENDING)
+        thread.assert_called_once()
+        run_import_job(job.pk)
+        self.assertEqual(RosterImportJob.objects.get(pk=job.pk).status, RosterImportJob.COMPLETED)
+        self.assertEqual(sorted(s.student_email for s in self.maths.students.all()),
+                         ["ada@example.com", "alan@example.com"])
+
+    def test_unreadable_file_fails_the_job(self):
+        """
+        Test that a file without the required columns fails with a reason, and that a
+        class_id of another teacher is rejected up front.
+        """
+        response = self.upload("email,name\nx@example.com,X\n", class_id=self.maths.id)
+        job = self.client.get(f"/api/students/imports/{response.data['id']}/").data
+        self.assertEqual(job["status"], RosterImportJob.FAILED)
+        self.assertIn("student_email", job["error"])
+        self.assertIsNone(job["error_report"])
+
+        other = Classes.objects.create(
+            teacher=Teacher.objects.get(user=User.objects.create_user(username="other", password="pw")),
+            class_name="History")
+        csv_file = io.BytesIO(b"student_email,year_level\n")
+        csv_file.name = "school.csv"
+        response = self.client.post("/api/students/imports/", {"file": csv_file, "class_id": other.id},
+                                    format="multipart")
+        self.assertEqual(response.status_code, 404)
+
+
+class StudentListPaginationTest(TestCase):
+    """
+    Test suite for the filters, opt-in cursor pagination and sparse fieldsets of the
+    student listings.
+    """
+
+    def setUp(self):
+        user = User.objects.create_user(username="teacher", password="pw")
+        teacher = Teacher.objects.get(user=user)  # Created by the teachers post_save signal
+        self.maths = Classes.objects.create(teacher=teacher, class_name="Maths")
+        science = Classes.objects.create(teacher=teacher, class_name="Science")
+        for i in range(7):
+            student = Student.objects.create(
+                first_name=f"Pupil{i}", last_name="Test", year_level=i % 2 + 5,
+                student_email=f"pupil{i}@example.com", disability_info="Dyslexia" if i < 3 else "")
+            (self.maths if i < 5 else science).students.add(student)
+
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def test_listing_stays_a_plain_list_unless_pages_are_requested(self):
+        """
+        Test that clients without pagination params still get every student as a list, and
+        that filters apply either way.
+        """
+        response = self.client.get("/api/students/")
+        self.assertEqual(len(response.data), 7)
+        response = self.client.get("/api/students/", {"class_id": self.maths.id, "has_disability": "false"})
+        self.assertEqual(sorted(row["first_name"] for row in response.data), ["Pupil3", "Pupil4"])
+        self.assertEqual(self.client.get("/api/students/", {"has_disability": "maybe"}).status_code, 400)
+
+    def test_cursor_pages_cover_every_student_once(self):
+        """
+        Test that following next links walks every student once in the requested order,
+        decrypting only one page per request.
+        """
+        seen, params = [], {"page_size": 3, "ordering": "-year_level"}
+        url = "/api/students/"
+        while url:
+            with mock.patch.object(encryption.fernet, 'decrypt', wraps=encryption.fernet.decrypt) as decrypt:
+                response = self.client.get(url, params)
+            self.assertLessEqual(len(response.data["results"]), 3)
+            self.assertLessEqual(decrypt.call_count, 3 * 3)
+            seen += [(row["year_level"], row["id"]) for row in response.data["results"]]
+            url, params = response.data["next"], None
+
+        self.assertEqual(len(seen), 7)
+        self.assertEqual(seen, sorted(seen, reverse=True))  # Ties broken by id, same direction
+        self.assertEqual(self.client.get("/api/students/", {"page_size": 3, "ordering": "first_name"}).status_code, 400)
+
+    def test_previous_links_walk_back_over_ties_and_nulls(self):
+        """
+        Test that previous links return the same pages backwards, on an ordering with many
+        ties and NULLs, and that pk is always an accepted ordering.
+        """
+        teacher = self.maths.teacher
+        for i in range(8):
+            Classes.objects.create(teacher=teacher, class_name=f"Group{i}", year_level=None if i % 2 else "7")
+        pages, url, params = [], "/api/classes/", {"page_size": 3, "ordering": "-year_level", "fields": "id,year_level"}
+        while url:
+            response = self.client.get(url, params)
+            pages.append(response.data["results"])
+            url, params = response.data["next"], None
+
+        rows = [row for page in pages for row in page]
+        self.assertEqual(len({row["id"] for row in rows}), 10)
+        self.assertEqual([row["year_level"] for row in rows], ["7"] * 4 + [None] * 6)  # NULLs last
+
+        back, url = [], response.data["previous"]
+        while url:
+            response = self.client.get(url)
+            back.insert(0, response.data["results"])
+            url = response.data["previous"]
+        self.assertEqual(back, pages[:-1])
+        self.assertEqual(self.client.get("/api/students/", {"page_size": 3, "ordering": "-pk"}).status_code, 200)
+
+    def test_sparse_fieldsets_skip_unrequested_fields_and_decryption(self):
+        """
+        Test that fields= trims students, nested class students and reports, that
+        unrequested encrypted fields are not decrypted, and that no ciphertext is returned.
+        """
+        response = self.client.get("/api/students/")
+        self.assertFalse([value for row in response.data for value in row.values()
+                          if isinstance(value, str) and value.startswith("enc:")])
+
+        with mock.patch.object(encryption.fernet, 'decrypt', wraps=encryption.fernet.decrypt) as decrypt:
+            response = self.client.get("/api/students/", {"fields": "id,first_name"})
+        self.assertEqual(set(response.data[0]), {"id", "first_name"})
+        self.assertEqual(decrypt.call_count, 7)
+
+        response = self.client.get("/api/classes/", {"fields": "id,students.first_name"})
+        self.assertEqual(set(response.data[0]), {"id", "students"})
+        self.assertEqual(set(response.data[0]["students"][0]), {"first_name"})
+        self.assertEqual(set(self.client.get("/api/classes/", {"fields": "class_name"}).data[0]), {"class_name"})
+
+        NCCDreport.objects.create(student=self.maths.students.first())
+        response = self.client.get("/api/nccdreports/", {"expand": "student", "fields": "id,student.first_name"})
+        self.assertEqual(response.data, [{"id": response.data[0]["id"], "student": {"first_name": "Pupil0"}}])
+
+
+class StudentEmailTest(TestCase):
+    """
+    Test suite for normalised student emails and the batch lookup endpoint.
+    """
+
+    def setUp(self):
+        self.ada = Student.objects.create(
+            first_name="Ada", last_name="Lovelace", year_level=5, student_email=" Ada@Example.COM ")
+        self.user = User.objects.create_user(username="teacher", password="pw")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_emails_are_stored_normalised_and_matched_by_index(self):
+        """
+        Test that emails are stored lower-cased on every write path, that duplicates
+        differing only in case are rejected, and that lookups are plain equality.
+        """
+        self.assertEqual(self.ada.student_email, "ada@example.com")
+        Student.objects.bulk_create([Student(year_level=5, student_email="Grace@Example.com")])
+        Student.objects.filter(pk=self.ada.pk).update(student_email="ADA.L@example.com")
+        self.assertEqual(sorted(Student.objects.values_list("student_email", flat=True)),
+                         ["ada.l@example.com", "grace@example.com"])
+
+        with self.assertRaises(ValidationError) as raised:
+            Student.objects.create(year_level=5, student_email="GRACE@example.com")
+        self.assertIn("case-insensitive", raised.exception.message_dict["student_email"][0])
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(Student.objects.get(student_email="Ada.L@Example.com").pk, self.ada.pk)
+        self.assertNotIn("UPPER", queries[0]["sql"])
+        self.assertIn("\"student_email\" = ", queries[0]["sql"])
+
+    def test_batch_lookup_finds_many_students_in_one_query(self):
+        """
+        Test that by-emails reports found and missing emails, normalised, in one query, and
+        only finds students in the teacher's own classes.
+        """
+        grace = Student.objects.create(
+            first_name="Grace", last_name="Hopper", year_level=5, student_email="grace@example.com")
+        Student.objects.create(first_name="Alan", last_name="Turing", year_level=5, student_email="alan@example.com")
+        teacher = Teacher.objects.get(user=self.user)  # Created by the teachers post_save signal
+        for name in ("Maths", "Science"):
+            Classes.objects.create(teacher=teacher, class_name=name).students.add(self.ada, grace)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                "/api/students/by-emails/?fields=id,first_name",
+                {"emails": ["ADA@example.com", "grace@example.com ", "nobody@example.com", "ada@example.com",
+                            "alan@example.com"]},
+                format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["found"]["ada@example.com"], {"id": self.ada.id, "first_name": "Ada"})
+        self.assertEqual(sorted(response.data["found"]), ["ada@example.com", "grace@example.com"])
+        self.assertEqual(response.data["missing"], ["nobody@example.com", "alan@example.com"])
+        self.assertEqual(len([q for q in queries if "students_student" in q["sql"]]), 1)
+
+        response = self.client.post("/api/students/by-emails/", {"emails": "ada@example.com"}, format="json")
+        self.assertEqual(response.status_code, 400)
@@ -4,10 +4,12 @@ URL configuration for the students app.
 Defines routes for student management including:
 - Retrieving all students
 - Creating a new student
-- Fetching a student by ID or email
+- Fetching a student by ID or email, or many students by email
 - Updating (full or partial) and deleting a student
 - Listing students by class
 - Bulk uploading students via CSV to a class
+- Importing CSV rosters in the background and polling their progress
+- Searching students by name prefix
 
 Each route maps to a corresponding view function handling the HTTP requests.
 """
@@ -23,8 +25,13 @@ from .views import (
     delete_student,
     get_students_by_class,
     get_student_by_email,
+    get_students_by_emails,
     upload_csv_to_class,
-    get_students_with_disabilities
+    get_students_with_disabilities,
+    search_students,
+    start_roster_import,
+    roster_import_status,
+    roster_import_errors
 )
 
 urlpatterns = [
@@ -37,6 +44,12 @@ urlpatterns = [
     # Retrieve a student by their email address (query param expected)
     path('by-email/', get_student_by_email, name="get_student_by_email"),
 
+    # Look up many students by email in one request (emails list in the body)
+    path('by-emails/', get_students_by_emails, name="get_students_by_emails"),
+
+    # Search the teacher's students by name prefix (q, page, page_size query params)
+    path('search/', search_students, name="search_students"),
+
     # Retrieve details of a student by their ID
     path('<int:student_id>/', get_student, name="get_student"),
 
@@ -54,6 +67,15 @@ urlpatterns = [
     # Upload a CSV file to bulk add students to a class
     path('classes/upload-csv/', upload_csv_to_class, name="upload_csv_to_class"),
 
+    # Queue a background CSV roster import (large files, optional class_name column)
+    path('imports/', start_roster_import, name="start_roster_import"),
+
+    # Status, progress and error report of a background roster import
+    path('imports/<int:job_id>/', roster_import_status, name="roster_import_status"),
+
+    # Download the rejected rows of a background roster import as CSV
+    path('imports/<int:job_id>/errors/', roster_import_errors, name="roster_import_errors"),
+
     # Get list of students with disabilities
     path('with-disabilities/', get_students_with_disabilities,
          name="get_students_with_disabilities"),
@@ -4,8 +4,10 @@ Views module providing API endpoints to manage Student entities.
 Includes functionality to:
 - Retrieve all students associated with the authenticated teacher.
 - Create, update (full and partial), retrieve, and delete individual students.
-- Retrieve students by class and check student existence by email.
+- Retrieve students by class and check student existence by email, one or many at a time.
+- Search the teacher's students by name prefix, ranked and paginated server-side.
 - Bulk upload students to a class via CSV file upload.
+- Import whole-school CSV rosters in the background and report their progress.
 - Retrieve students with decrypted disability information for the authenticated teacher.
 
 Permissions are enforced where necessary to ensure data security.
@@ -13,21 +15,29 @@ Permissions are enforced where necessary to ensure data security.
 Utilizes Django REST Framework decorators and serializers for request handling and response formatting.
 """
 
+from django.http import FileResponse
 from django.shortcuts import render
-import csv
-import io
 
 from rest_framework.decorators import api_view, permission_classes, parser_classes
 from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from rest_framework import status
-from .models import Student
-from .serializers import StudentSerializer
+from .models import RosterImportJob, Student
+from .serializers import RosterImportJobSerializer, StudentSerializer
 from classes.serializers import ClassSerializer
 from classes.models import Classes
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.decorators import permission_classes
+from rest_framework.pagination import PageNumberPagination
 from teachers.models import Teacher
+from utils.fields import normalize_email
+from utils.pagination import paginated_response, parse_bool, parse_int
+from .services.name_index import MIN_PREFIX, rank_name_matches
+from .services.roster_import import RosterImportError, import_roster
+from .services.roster_jobs import requeue_stale_jobs, start_import
+
+# Most emails get_students_by_emails accepts in one request
+MAX_EMAIL_BATCH = 500
 
 
 # Get all students
@@ -37,9 +47,18 @@ def get_all_students(request):
     """
     Retrieve all students associated with the authenticated teacher.
 
+    Query params (all optional):
+        class_id: Only students in this class.
+        year_level: Only students in this year level.
+        has_disability: true/false, answered from the disability blind index.
+        page_size, cursor, ordering: Opt-in cursor pagination (see utils.pagination);
+            ordering may be year_level or pk. Names are encrypted, so cannot be sorted in SQL.
+        fields: Sparse fieldset (see utils.serializers), e.g. id,first_name; encrypted
+            fields left out are not decrypted.
+
     Returns:
-        HTTP 200 with serialized list of students or
-        HTTP 400 if teacher profile not found.
+        HTTP 200 with serialized list of students, or a page of them when requested,
+        HTTP 400 if teacher profile not found or a filter is invalid.
     """
     try:
         # Get the teacher linked to the current user
@@ -47,12 +66,20 @@ def get_all_students(request):
 
         # Find all classes taught by this teacher
         classes = Classes.objects.filter(teacher=teacher)
+        class_id = parse_int(request, 'class_id')
+        if class_id is not None:
+            classes = classes.filter(id=class_id)
 
         # Get students from these classes (distinct to avoid duplicates)
         students = Student.objects.filter(classes__in=classes).distinct()
+        year_level = parse_int(request, 'year_level')
+        if year_level is not None:
+            students = students.filter(year_level=year_level)
+        has_disability = parse_bool(request, 'has_disability')
+        if has_disability is not None:
+            students = students.filter(has_disability_info=has_disability)
 
-        serializer = StudentSerializer(students, many=True)
-        return Response(serializer.data)
+        return paginated_response(request, students, StudentSerializer, ordering_fields=('year_level', 'pk'))
 
     except Teacher.DoesNotExist:
         return Response(
@@ -123,7 +150,7 @@ def get_student(request, student_id):
     except Student.DoesNotExist:
         return Response({"error": "Student not found"}, status=404)
 
-    serializer = StudentSerializer(student)
+    serializer = StudentSerializer(student, context={'request': request})
     return Response(serializer.data)
 
 
@@ -190,7 +217,7 @@ def get_students_by_class(request, class_id):
     """
     try:
         class_obj = Classes.objects.get(id=class_id)
-        serializer = ClassSerializer(class_obj)
+        serializer = ClassSerializer(class_obj, context={'request': request})
         return Response(serializer.data)
     except Classes.DoesNotExist:
         return Response({"error": "Class not found"}, status=404)
@@ -216,14 +243,51 @@ def get_student_by_email(request):
         return Response({"error": "Email is required"}, status=400)
 
     try:
-        student = Student.objects.get(student_email__iexact=email)
-        serializer = StudentSerializer(student)
+        # Emails are stored normalised, so this is an indexed equality lookup
+        student = Student.objects.get(student_email=email)
+        serializer = StudentSerializer(student, context={'request': request})
         return Response(serializer.data)
     except Student.DoesNotExist:
         # Not found, return empty response (not an error)
         return Response({}, status=200)
 
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def get_students_by_emails(request):
+    """
+    Look up many of the teacher's students by email address (case-insensitive) in one query.
+
+    Only students enrolled in one of the requesting teacher's classes are returned; any
+    other email is reported as missing, whether or not such a student exists.
+
+    Expects:
+        emails (list): Up to MAX_EMAIL_BATCH email addresses in the request body.
+
+    Accepts the fields= query parameter to return less of each student.
+
+    Returns:
+        HTTP 200 with {"found": {email: student}, "missing": [email, ...]}, keyed by the
+        normalised (trimmed, lower-cased) emails,
+        HTTP 400 if emails is not a non-empty list of strings or is too long.
+    """
+    emails = request.data.get("emails")
+    if not isinstance(emails, list) or not emails or not all(isinstance(email, str) for email in emails):
+        return Response({"error": "emails must be a non-empty list of email addresses"}, status=400)
+    if len(emails) > MAX_EMAIL_BATCH:
+        return Response({"error": f"At most {MAX_EMAIL_BATCH} emails per request"}, status=400)
+
+    emails = list(dict.fromkeys(normalize_email(email) for email in emails if email.strip()))
+    students = list(Student.objects.filter(
+        student_email__in=emails, classes__teacher__user=request.user).distinct())
+    serializer = StudentSerializer(students, many=True, context={'request': request, 'sparse_fieldsets': True})
+    found = {student.student_email: data for student, data in zip(students, serializer.data)}
+    return Response({
+        "found": found,
+        "missing": [email for email in emails if email not in found],
+    })
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 @parser_classes([MultiPartParser])
@@ -236,10 +300,12 @@ def upload_csv_to_class(request):
         class_id: class ID in POST data.
 
     CSV must include columns: student_email, first_name, last_name, year_level, disability_info.
+    Rows are imported in bulk by students.services.roster_import; invalid rows are skipped
+    and listed under "errors".
 
     Returns:
         HTTP 200 with count of students added and list of duplicates,
-        HTTP 400 if file or class_id missing,
+        HTTP 400 if file or class_id missing, or the file is not a readable CSV,
         HTTP 404 if class not found.
     """
     csv_file = request.FILES.get("file")
@@ -253,37 +319,15 @@ def upload_csv_to_class(request):
     except Classes.DoesNotExist:
         return Response({"error": "Class not found"}, status=404)
 
-    decoded_file = csv_file.read().decode("utf-8")
-    io_string = io.StringIO(decoded_file)
-    reader = csv.DictReader(io_string)
-
-    added_count = 0
-    duplicates = []
-
-    for row in reader:
-        email = row.get("student_email", "").strip().lower()
-        if not email:
-            continue
-
-        # Check if student exists
-        student, created = Student.objects.get_or_create(student_email=email, defaults={
-            "first_name": row.get("first_name", ""),
-            "last_name": row.get("last_name", ""),
-            "year_level": row.get("year_level", ""),
-            "disability_info": row.get("disability_info", ""),
-        })
-
-        # Check if already in class
-        if class_obj.students.filter(id=student.id).exists():
-            duplicates.append(email)
-            continue
-
-        class_obj.students.add(student)
-        added_count += 1
+    try:
+        result = import_roster(csv_file, class_obj)
+    except RosterImportError as e:
+        return Response({"error": str(e)}, status=400)
 
     return Response({
-        "added": added_count,
-        "duplicates": duplicates,
+        "added": len(result.added),
+        "duplicates": result.already_in_class,
+        "errors": result.errors,
     }, status=200)
 
 
@@ -297,22 +341,153 @@ def get_students_with_disabilities(request):
     Returns:
         HTTP 200 with serialized list of students.
     """
-    from utils.encryption import decrypt
-
     try:
         teacher = Teacher.objects.get(user=request.user)
         classes = Classes.objects.filter(teacher=teacher)
-        students = Student.objects.filter(classes__in=classes).distinct()
+        # Filtered on the blind index: no row is decrypted to decide eligibility
+        eligible = Student.objects.filter(classes__in=classes).with_disability_info().distinct()
 
-        eligible = []
-        for student in students:
-            decrypted = decrypt(
-                student._disability_info) if student._disability_info else ''
-            if decrypted.strip():
-                eligible.append(student)
-
-        serializer = StudentSerializer(eligible, many=True)
+        serializer = StudentSerializer(eligible, many=True, context={'request': request})
         return Response(serializer.data)
 
     except Teacher.DoesNotExist:
         return Response({"error": "No teacher profile found for this user"}, status=400)
+
+
+class StudentSearchPagination(PageNumberPagination):
+    """
+    Page size for name search results; clients may ask for up to 100 per page.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def search_students(request):
+    """
+    Search the authenticated teacher's students by first or last name prefix.
+
+    Query params:
+        q: One or more case-insensitive name prefixes, e.g. "ada lov".
+        page, page_size: Pagination of the ranked results.
+
+    Matching runs on the name blind index; only the students on the returned page are
+    decrypted.
+
+    Returns:
+        HTTP 200 with {count, next, previous, results},
+        HTTP 400 if q has no term of at least MIN_PREFIX characters or no teacher profile exists.
+    """
+    query = request.query_params.get('q', '')
+    if not any(len(term) >= MIN_PREFIX for term in query.split()):
+        return Response(
+            {"error": f"Search terms must be at least {MIN_PREFIX} characters long"},
+            status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        teacher = Teacher.objects.get(user=request.user)
+    except Teacher.DoesNotExist:
+        return Response(
+            {"error": "No teacher profile found for this user"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    ranked = rank_name_matches(Student.objects.filter(classes__teacher=teacher), query)
+    paginator = StudentSearchPagination()
+    page = paginator.paginate_queryset(ranked, request)
+    students = Student.objects.in_bulk([row['student'] for row in page])
+    serializer = StudentSerializer([students[row['student']] for row in page], many=True,
+                                   context={'request': request})
+    return paginator.get_paginated_response(serializer.data)
+
+
+@api_view(['POST'])
+@parser_classes([MultiPartParser])
+@permission_classes([IsAuthenticated])
+def start_roster_import(request):
+    """
+    Queue a CSV roster import to run in the background.
+
+    Expects:
+        file: CSV file uploaded with key 'file', with the columns upload_csv_to_class takes
+            and optionally class_name, naming one of the teacher's classes per row.
+        class_id: Optional ID of the teacher's class for rows without a class_name.
+
+    Returns:
+        HTTP 202 with the job; poll roster_import_status for progress,
+        HTTP 400 if the file is missing or no teacher profile exists,
+        HTTP 404 if class_id is not one of the teacher's classes.
+    """
+    csv_file = request.FILES.get("file")
+    if not csv_file:
+        return Response({"error": "CSV file is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        teacher = Teacher.objects.get(user=request.user)
+    except Teacher.DoesNotExist:
+        return Response(
+            {"error": "No teacher profile found for this user"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    class_obj = None
+    class_id = request.POST.get("class_id")
+    if class_id:
+        try:
+            class_obj = Classes.objects.get(id=class_id, teacher=teacher)
+        except (Classes.DoesNotExist, ValueError):
+            return Response({"error": "Class not found"}, status=status.HTTP_404_NOT_FOUND)
+
+    job = RosterImportJob.objects.create(teacher=teacher, class_obj=class_obj, file=csv_file)
+    start_import(job)
+    requeue_stale_jobs(RosterImportJob.objects.filter(teacher=teacher))
+    serializer = RosterImportJobSerializer(job, context={'request': request})
+    return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def roster_import_status(request, job_id):
+    """
+    Report the status and progress of one of the teacher's roster imports.
+
+    A job interrupted by a restart is requeued when it is polled.
+
+    Returns:
+        HTTP 200 with the job: status, total_rows, rows_processed, added, already_in_class,
+        created, error_count, error_report (URL of the rejected-rows CSV) and error,
+        HTTP 404 if the job does not exist or belongs to another teacher.
+    """
+    try:
+        job = RosterImportJob.objects.get(id=job_id, teacher__user=request.user)
+    except RosterImportJob.DoesNotExist:
+        return Response({"error": "Import not found"}, status=status.HTTP_404_NOT_FOUND)
+
+    if requeue_stale_jobs(RosterImportJob.objects.filter(pk=job.pk)):
+        job.refresh_from_db()
+    serializer = RosterImportJobSerializer(job, context={'request': request})
+    return Response(serializer.data)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def roster_import_errors(request, job_id):
+    """
+    Download the rejected rows of one of the teacher's roster imports as CSV, with the line
+    number, email, class_name and reason for each.
+
+    Returns:
+        HTTP 200 with the CSV file,
+        HTTP 404 if the job does not exist, belongs to another teacher or rejected no rows.
+    """
+    try:
+        job = RosterImportJob.objects.get(id=job_id, teacher__user=request.user)
+    except RosterImportJob.DoesNotExist:
+        return Response({"error": "Import not found"}, status=status.HTTP_404_NOT_FOUND)
+    if not job.error_report:
+        return Response({"error": "This import has no rejected rows"}, status=status.HTTP_404_NOT_FOUND)
+
+    return FileResponse(job.error_report.open('rb'), as_attachment=True,
+                        filename=f"roster_import_{job.pk}_errors.csv", content_type='text/csv')
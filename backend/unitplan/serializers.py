@@ -7,9 +7,14 @@ Includes detailed metadata fields like file size, name, and document URL.
 from rest_framework import serializers
 from .models import UnitPlan
 from classes.serializers import ClassSerializer
+from utils.serializers import SparseFieldsetsMixin
 
 
-class UnitPlanSerializer(serializers.ModelSerializer):
+class UnitPlanSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
+    """
+    Serialize a unit plan with its document metadata. Reads accept ?fields= and
+    ?expand=class_instance (the nested class instead of its id).
+    """
     class_name = serializers.ReadOnlyField(source='class_instance.class_name')
     file_size = serializers.SerializerMethodField()
     file_name = serializers.SerializerMethodField()
@@ -24,6 +29,7 @@ class UnitPlanSerializer(serializers.ModelSerializer):
                   'uploaded_at', 'updated_at', 'from_creation_flow']
         read_only_fields = ['file_type', 'uploaded_at',
                             'updated_at', 'file_name', 'document_url']
+        expandable_fields = {'class_instance': (ClassSerializer, {})}
 
     def create(self, validated_data):
         """
@@ -95,7 +101,11 @@ class UnitPlanSerializer(serializers.ModelSerializer):
         return None
 
 
-class UnitPlanListSerializer(serializers.ModelSerializer):
+class UnitPlanListSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
+    """
+    Lighter unit plan representation for list views; accepts the same ?fields= and
+    ?expand= parameters as UnitPlanSerializer.
+    """
     class_name = serializers.ReadOnlyField(source='class_instance.class_name')
     file_name = serializers.SerializerMethodField()
 
@@ -103,6 +113,7 @@ class UnitPlanListSerializer(serializers.ModelSerializer):
         model = UnitPlan
         fields = ['id', 'class_instance', 'class_name',
                   'title', 'file_name', 'file_type', 'uploaded_at']
+        expandable_fields = {'class_instance': (ClassSerializer, {})}
 
     def get_file_name(self, obj):
         """
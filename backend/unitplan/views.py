@@ -22,6 +22,10 @@ class UnitPlanViewSet(viewsets.ModelViewSet):
     serializer_class = UnitPlanSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    # Opt-in cursor pagination of the list action (page_size, cursor and ordering params)
+    ordering = '-uploaded_at'
+    ordering_fields = ('uploaded_at', 'updated_at', 'title', 'pk')
+
     def get_serializer_class(self):
         """
         Return the appropriate serializer class based on the action.
@@ -41,7 +45,12 @@ class UnitPlanViewSet(viewsets.ModelViewSet):
             return UnitPlan.objects.none()
 
         # Get unit plans for classes taught by this teacher
-        return UnitPlan.objects.filter(class_instance__teacher=teacher)
+        queryset = UnitPlan.objects.filter(class_instance__teacher=teacher).select_related('class_instance')
+        if self.action == 'list':
+            year_level = self.request.query_params.get('year_level')
+            if year_level is not None:
+                queryset = queryset.filter(class_instance__year_level=year_level)
+        return queryset
 
     def create(self, request, *args, **kwargs):
         """
@@ -1,8 +1,62 @@
-from cryptography.fernet import Fernet, InvalidToken
+"""
+Fernet encryption helpers for sensitive student fields.
+
+FERNET_KEYS lists every key in use, newest first (falling back to the single FERNET_KEY).
+New tokens are always encrypted with the first key; tokens under any listed key still
+decrypt, and rotate_token re-encrypts them under the first one. The blind indexes are keyed
+from BLIND_INDEX_KEY, which must be set whenever FERNET_KEYS is, so rotating the encryption
+keys never changes it; a deployment with a single FERNET_KEY may leave it unset.
+
+decrypt consults a request-scoped plaintext cache when one is active (see decryption_cache
+and utils.middleware.DecryptionCacheMiddleware), so the same token is only decrypted once
+per request however many model instances or serializers read it.
+
+decrypt_many and decrypt_columns decrypt whole batches, such as the columns of a roster.
+Batches of at least BULK_DECRYPT_THRESHOLD tokens are split across a pool of worker
+processes; smaller ones stay inline, where starting work in the pool costs more than it saves.
+
+blind_index returns keyed HMACs of normalised values, so encrypted fields can be matched
+in SQL without storing or decrypting the plaintext.
+"""
+
+import contextlib
+import contextvars
+import hashlib
+import hmac
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from cryptography.fernet import Fernet, InvalidToken, MultiFernet
 from decouple import config
+from django.core.exceptions import ImproperlyConfigured
+
+FERNET_KEY = config("FERNET_KEY", default="").encode()
+FERNET_KEYS = [key.strip().encode() for key in config("FERNET_KEYS", default="").split(",") if key.strip()] \
+    or [FERNET_KEY]
+fernet = MultiFernet([Fernet(key) for key in FERNET_KEYS])
+
+# Key for blind indexes. Deriving it from a rotating key would silently change it once the
+# old key is dropped, so only a lone FERNET_KEY may stand in for BLIND_INDEX_KEY
+BLIND_INDEX_KEY = config("BLIND_INDEX_KEY", default="").encode()
+if not BLIND_INDEX_KEY:
+    if config("FERNET_KEYS", default="").strip():
+        raise ImproperlyConfigured("BLIND_INDEX_KEY must be set when FERNET_KEYS is used.")
+    BLIND_INDEX_KEY = hmac.new(FERNET_KEY, b"blind-index", hashlib.sha256).digest()
+
+# Batches at least this large go to the worker pool; BULK_DECRYPT_WORKERS <= 1 disables it
+BULK_DECRYPT_THRESHOLD = 3000
+BULK_DECRYPT_WORKERS = min(4, os.cpu_count() or 1)
+
+INVALID_TOKEN = "[Invalid Encrypted Data]"
+
+_pool = None
+_pool_lock = threading.Lock()
 
-FERNET_KEY = config("FERNET_KEY").encode()
-fernet = Fernet(FERNET_KEY)
+# token -> plaintext for the current request; None when no cache is active
+_request_cache = contextvars.ContextVar("decryption_cache", default=None)
 
 
 def encrypt(text: str) -> str:
@@ -10,7 +64,160 @@ def encrypt(text: str) -> str:
 
 
 def decrypt(token: str) -> str:
+    cache = _request_cache.get()
+    if cache is not None and token in cache:
+        return cache[token]
     try:
-        return fernet.decrypt(token.encode()).decode()
+        plaintext = fernet.decrypt(token.encode()).decode()
     except InvalidToken:
         return "[Invalid Encrypted Data]"
+    if cache is not None:
+        cache[token] = plaintext
+    return plaintext
+
+
+def key_id(key: bytes = None) -> str:
+    """
+    Return a short, non-secret fingerprint of a key (the primary key by default).
+    """
+    return hashlib.sha256(key or FERNET_KEYS[0]).hexdigest()[:16]
+
+
+def rotate_token(token: str) -> str:
+    """
+    Re-encrypt a token under the primary key, keeping its original timestamp.
+
+    Raises:
+        InvalidToken: If no configured key decrypts the token.
+    """
+    return fernet.rotate(token.encode()).decode()
+
+
+def blind_index(value: str, purpose: str) -> str:
+    """
+    Return a keyed hash of a value that can be stored and compared in SQL.
+
+    Values are lower-cased with whitespace collapsed first, so equality is case-insensitive.
+    The purpose separates indexes of different fields, so equal values in two fields do not
+    share a hash.
+    """
+    normalized = " ".join(value.split()).lower()
+    return hmac.new(BLIND_INDEX_KEY, f"{purpose}:{normalized}".encode(), hashlib.sha256).hexdigest()
+
+
+@contextlib.contextmanager
+def decryption_cache():
+    """
+    Cache decrypted tokens until the block exits.
+
+    Nested blocks share the outer cache. The cache follows the context into asyncio tasks
+    and sync_to_async/to_thread calls started inside the block.
+    """
+    if _request_cache.get() is not None:
+        yield
+        return
+    reset = _request_cache.set({})
+    try:
+        yield
+    finally:
+        _request_cache.reset(reset)
+
+
+def _init_worker(keys):
+    """
+    Run once in every bulk decryption worker: use the parent's keys.
+    """
+    global fernet
+    fernet = MultiFernet([Fernet(key) for key in keys])
+
+
+def _decrypt_chunk(tokens):
+    """
+    Decrypt a chunk of tokens in a worker, mapping invalid tokens to INVALID_TOKEN.
+    """
+    plaintexts = []
+    for token in tokens:
+        try:
+            plaintexts.append(fernet.decrypt(token.encode()).decode())
+        except InvalidToken:
+            plaintexts.append(INVALID_TOKEN)
+    return plaintexts
+
+
+def _get_pool():
+    """
+    Return the shared bulk decryption pool, starting it on first use.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=BULK_DECRYPT_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(FERNET_KEYS,),
+            )
+        return _pool
+
+
+def _decrypt_pooled(tokens):
+    """
+    Decrypt tokens across the worker pool, falling back to inline if the pool breaks.
+    """
+    global _pool
+    size = -(-len(tokens) // (BULK_DECRYPT_WORKERS * 4))
+    chunks = [tokens[i:i + size] for i in range(0, len(tokens), size)]
+    try:
+        return [text for chunk in _get_pool().map(_decrypt_chunk, chunks) for text in chunk]
+    except BrokenProcessPool:
+        with _pool_lock:
+            _pool = None
+        return _decrypt_chunk(tokens)
+
+
+def decrypt_many(tokens):
+    """
+    Decrypt a batch of tokens.
+
+    Empty tokens decrypt to '' and duplicates are decrypted once. Tokens in the active
+    request cache are reused, and new plaintexts are added to it.
+
+    Args:
+        tokens (list): Fernet tokens, or empty strings.
+
+    Returns:
+        list: Plaintexts in the same order.
+    """
+    cache = _request_cache.get()
+    known = dict(cache) if cache else {}
+    pending = list({token for token in tokens if token and token not in known})
+
+    if len(pending) >= BULK_DECRYPT_THRESHOLD and BULK_DECRYPT_WORKERS > 1:
+        plaintexts = _decrypt_pooled(pending)
+    else:
+        plaintexts = _decrypt_chunk(pending)
+    decrypted = dict(zip(pending, plaintexts))
+    if cache is not None:
+        cache.update((token, text) for token, text in decrypted.items() if text != INVALID_TOKEN)
+    known.update(decrypted)
+
+    return [known[token] if token else '' for token in tokens]
+
+
+def decrypt_columns(columns):
+    """
+    Decrypt several columns of tokens as one batch.
+
+    Args:
+        columns (dict): Column name -> list of tokens.
+
+    Returns:
+        dict: Column name -> list of plaintexts, in the same order.
+    """
+    names = list(columns)
+    flat = decrypt_many([token for name in names for token in columns[name]])
+    result, offset = {}, 0
+    for name in names:
+        result[name] = flat[offset:offset + len(columns[name])]
+        offset += len(columns[name])
+    return result
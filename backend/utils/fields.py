@@ -0,0 +1,218 @@
+"""
+Custom model fields.
+
+NormalizedEmailField stores emails trimmed and lower-cased (see normalize_email), so its
+unique index enforces case-insensitive uniqueness and lookups are plain indexed equality.
+
+EncryptedField: a model field whose column holds versioned Fernet ciphertext.
+
+Stored values look like "enc:v1:<fernet token>"; the version names the encoding, so it can
+change later without guessing from the token. Values without the "enc:" prefix are read as
+version 0, the bare tokens written before this field existed.
+
+On the Python side the attribute always reads as plaintext:
+
+- rows loaded from the database hold a Ciphertext, which the descriptor decrypts on first
+  read and memoizes;
+- a read returns a Plaintext, a str that remembers the Ciphertext it came from, so writing
+  an unchanged value back (full_clean(), bulk_update()) reuses the stored ciphertext instead
+  of encrypting again;
+- any other str assigned to the attribute is new plaintext, encrypted with the primary key
+  when it is saved, whether through save(), bulk_create(), bulk_update() or update().
+
+Only empty-value lookups (e.g. filter(field='')) are meaningful on an encrypted column:
+Fernet ciphertext is randomised, so equal plaintexts never compare equal in SQL. Use a
+blind index (utils.encryption.blind_index) to search.
+"""
+
+from django.db import models
+from django.db.models.query_utils import DeferredAttribute
+
+from utils import encryption
+
+CIPHERTEXT_PREFIX = "enc:"
+CURRENT_VERSION = "v1"
+
+
+class Ciphertext:
+    """
+    A stored encrypted value, decrypted lazily and at most once.
+
+    Attributes:
+        stored (str): The column value, e.g. "enc:v1:gAAAA...", or '' for an empty value.
+    """
+    __slots__ = ('stored', '_plaintext')
+
+    def __init__(self, stored, plaintext=None):
+        self.stored = stored
+        self._plaintext = plaintext
+
+    @classmethod
+    def from_token(cls, token, plaintext=None):
+        """
+        Wrap a Fernet token in the current storage version.
+        """
+        return cls(f"{CIPHERTEXT_PREFIX}{CURRENT_VERSION}:{token}", plaintext)
+
+    @property
+    def version(self):
+        if not self.stored.startswith(CIPHERTEXT_PREFIX):
+            return "v0"
+        return self.stored[len(CIPHERTEXT_PREFIX):].split(":", 1)[0]
+
+    @property
+    def token(self):
+        """
+        The Fernet token inside the stored value.
+        """
+        if self.version == "v0":
+            return self.stored
+        return self.stored.split(":", 2)[2]
+
+    @property
+    def decrypted(self):
+        """
+        Whether the plaintext is already known.
+        """
+        return self._plaintext is not None
+
+    def set_plaintext(self, plaintext):
+        """
+        Record the plaintext, e.g. from a bulk decryption.
+        """
+        self._plaintext = plaintext
+
+    def decrypt(self):
+        """
+        Return the plaintext, decrypting on first use.
+        """
+        if self._plaintext is None:
+            self._plaintext = encryption.decrypt(self.token)
+        return self._plaintext
+
+    def __eq__(self, other):
+        return isinstance(other, Ciphertext) and other.stored == self.stored
+
+    def __hash__(self):
+        return hash(self.stored)
+
+    def __repr__(self):
+        return f"<Ciphertext {self.version}>"
+
+
+class Plaintext(str):
+    """
+    A decrypted value that remembers the Ciphertext it was read from.
+    """
+    __slots__ = ('ciphertext',)
+
+    def __new__(cls, ciphertext):
+        value = super().__new__(cls, ciphertext.decrypt())
+        value.ciphertext = ciphertext
+        return value
+
+    def __reduce__(self):
+        # Copies and pickles are plain strings; only a value read from the model keeps its ciphertext
+        return (str, (str(self),))
+
+
+def get_ciphertext(instance, name):
+    """
+    Return the Ciphertext held for an encrypted attribute, or None when the attribute holds
+    new, unsaved plaintext.
+    """
+    value = instance.__dict__.get(name)
+    return value if isinstance(value, Ciphertext) else None
+
+
+class EncryptedAttribute(DeferredAttribute):
+    """
+    Descriptor returning plaintext for an EncryptedField.
+    """
+
+    def __get__(self, instance, cls=None):
+        if instance is None:
+            return self
+        value = super().__get__(instance, cls)
+        if isinstance(value, Ciphertext):
+            return Plaintext(value)
+        return value
+
+    def __set__(self, instance, value):
+        current = instance.__dict__.get(self.field.attname)
+        if isinstance(value, Plaintext):
+            value = value.ciphertext
+        elif isinstance(current, Ciphertext) and current.decrypted and value == current.decrypt():
+            # Writing back the same plaintext keeps the stored ciphertext
+            value = current
+        instance.__dict__[self.field.attname] = value
+
+
+class EncryptedField(models.TextField):
+    """
+    TextField storing its value as versioned Fernet ciphertext (see the module docstring).
+    """
+    descriptor_class = EncryptedAttribute
+
+    def from_db_value(self, value, expression, connection):
+        if not value:
+            return Ciphertext('', plaintext='')
+        return Ciphertext(value)
+
+    def to_python(self, value):
+        if isinstance(value, (Ciphertext, Plaintext)) or value is None:
+            return value
+        return str(value)
+
+    def get_prep_value(self, value):
+        if isinstance(value, Plaintext):
+            value = value.ciphertext
+        if isinstance(value, Ciphertext):
+            return value.stored
+        if not value:
+            return ''
+        return Ciphertext.from_token(encryption.encrypt(str(value))).stored
+
+    def pre_save(self, model_instance, add):
+        """
+        Encrypt new plaintext once and keep the result on the instance, so a later save
+        writes the same ciphertext and the plaintext stays readable without decrypting.
+        """
+        if self.attname not in model_instance.__dict__:
+            return super().pre_save(model_instance, add)
+        value = model_instance.__dict__[self.attname]
+        if isinstance(value, Plaintext):
+            value = value.ciphertext
+        elif not isinstance(value, Ciphertext):
+            value = (Ciphertext.from_token(encryption.encrypt(str(value)), plaintext=str(value))
+                     if value else Ciphertext('', plaintext=''))
+        model_instance.__dict__[self.attname] = value
+        return value
+
+
+def normalize_email(value):
+    """
+    Return the stored form of an email address: surrounding whitespace removed, lower-cased.
+    """
+    return value.strip().lower() if isinstance(value, str) else value
+
+
+class NormalizedEmailField(models.EmailField):
+    """
+    EmailField storing normalised addresses (see the module docstring).
+
+    Values are normalised on every path to the database: save(), bulk_create(), update()
+    and the right-hand side of lookups, so filter(field=...) and filter(field__in=...)
+    match case-insensitively while using the column's index.
+    """
+
+    def to_python(self, value):
+        return normalize_email(super().to_python(value))
+
+    def get_prep_value(self, value):
+        return normalize_email(super().get_prep_value(value))
+
+    def pre_save(self, model_instance, add):
+        value = normalize_email(getattr(model_instance, self.attname))
+        setattr(model_instance, self.attname, value)
+        return value
@@ -0,0 +1,27 @@
+"""
+Middleware for the shared utilities.
+
+DecryptionCacheMiddleware wraps each request in utils.encryption.decryption_cache, so every
+encrypted student field is decrypted at most once per request. It is opt-in: Django drops
+it unless settings.DECRYPTION_REQUEST_CACHE is enabled.
+"""
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from utils.encryption import decryption_cache
+
+
+class DecryptionCacheMiddleware:
+    """
+    Keep a request-scoped plaintext cache for Fernet tokens.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'DECRYPTION_REQUEST_CACHE', False):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with decryption_cache():
+            return self.get_response(request)
@@ -0,0 +1,230 @@
+"""
+Opt-in keyset (cursor) pagination for list endpoints.
+
+Listings stay unpaginated unless the client asks for a page, so existing clients keep
+receiving a plain list. Sending page_size (or following a next/previous link, which carries
+a cursor) switches to {"next", "previous", "results"} pages of at most MAX_PAGE_SIZE rows.
+
+The optional ordering query parameter picks one of the endpoint's ordering_fields, or pk
+("-" for descending), and the primary key breaks ties in the same direction. A cursor holds
+the (value, pk) pair of the row a page ends on, and the next page is found with
+WHERE (field, pk) > (value, pk), so a deep page costs the same as the first, however many
+rows share a value, and rows inserted meanwhile never shift a page. NULLs sort last in
+either direction.
+
+OptInCursorPagination is the DRF default pagination class, which covers generic views;
+function-based views call paginated_response.
+"""
+
+import base64
+import binascii
+import json
+
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+TRUE_VALUES = ('true', '1', 'yes')
+FALSE_VALUES = ('false', '0', 'no')
+
+
+class OptInCursorPagination(BasePagination):
+    """
+    Keyset pagination on (ordering field, pk), applied only when the request carries
+    page_size or cursor.
+
+    Ordering comes from the view's (or constructor's) ordering and ordering_fields.
+    """
+    page_size = DEFAULT_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = MAX_PAGE_SIZE
+    cursor_query_param = 'cursor'
+    ordering = 'pk'
+    ordering_fields = ()
+    ordering_param = 'ordering'
+    invalid_cursor_message = "Invalid cursor."
+
+    def __init__(self, ordering=None, ordering_fields=None):
+        if ordering is not None:
+            self.ordering = ordering
+        if ordering_fields is not None:
+            self.ordering_fields = ordering_fields
+
+    def is_requested(self, request):
+        params = request.query_params
+        return self.cursor_query_param in params or self.page_size_query_param in params
+
+    def get_page_size(self, request):
+        size = parse_int(request, self.page_size_query_param)
+        if size is None:
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def get_ordering(self, request, view):
+        """
+        Return (field, descending) for the request's ordering.
+        """
+        fields = tuple(getattr(view, 'ordering_fields', None) or self.ordering_fields)
+        if 'pk' not in fields:
+            fields += ('pk',)
+        requested = request.query_params.get(self.ordering_param)
+        if requested:
+            if requested.lstrip('-') not in fields:
+                raise ValidationError({self.ordering_param: f"Ordering must be one of: {', '.join(fields)}."})
+            ordering = requested
+        else:
+            ordering = getattr(view, 'ordering', None) or self.ordering
+        return ordering.lstrip('-'), ordering.startswith('-')
+
+    def decode_cursor(self, request, field):
+        """
+        Return (value, pk, reverse) from the request's cursor, or None on a first page.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            if cursor['o'] != field:
+                raise ValueError(cursor['o'])
+            return cursor['v'], cursor['pk'], bool(cursor['r'])
+        except (binascii.Error, ValueError, TypeError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, row, reverse):
+        value = row.pk if self.field == 'pk' else getattr(row, self.field)
+        if hasattr(value, 'isoformat'):
+            # Full precision: a datetime rounded to milliseconds would skip or repeat rows
+            value = value.isoformat()
+        cursor = json.dumps({'o': self.field, 'v': value, 'pk': row.pk, 'r': int(reverse)})
+        return replace_query_param(self.base_url, self.cursor_query_param,
+                                   base64.urlsafe_b64encode(cursor.encode()).decode())
+
+    def _after(self, value, pk, descending, nulls_last):
+        """
+        Filter for the rows that come after (value, pk) when walking in this direction.
+        """
+        lookup = 'lt' if descending else 'gt'
+        after_pk = Q(**{f'pk__{lookup}': pk})
+        if self.field == 'pk':
+            return after_pk
+        if value is None:
+            null_rows = Q(**{f'{self.field}__isnull': True}) & after_pk
+            return null_rows if nulls_last else null_rows | Q(**{f'{self.field}__isnull': False})
+        rows = Q(**{f'{self.field}__{lookup}': value}) | (Q(**{self.field: value}) & after_pk)
+        return rows | Q(**{f'{self.field}__isnull': True}) if nulls_last else rows
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.is_requested(request):
+            return None
+        self.field, descending = self.get_ordering(request, view)
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request, self.field)
+        reverse = bool(cursor and cursor[2])
+
+        # A previous page is read backwards from the cursor, then put back in order
+        walk_descending, nulls_last = descending != reverse, not reverse
+        order = ['-pk' if walk_descending else 'pk']
+        if self.field != 'pk':
+            sort = F(self.field).desc if walk_descending else F(self.field).asc
+            order.insert(0, sort(nulls_last=True) if nulls_last else sort(nulls_first=True))
+        queryset = queryset.order_by(*order)
+        if cursor:
+            queryset = queryset.filter(self._after(cursor[0], cursor[1], walk_descending, nulls_last))
+
+        rows = list(queryset[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+
+        # Walking forwards there is a previous page once past the first; walking backwards
+        # there is always a next one
+        self.next_link = self.previous_link = None
+        if rows and (has_more or reverse):
+            self.next_link = self.encode_cursor(rows[-1], reverse=False)
+        if rows and (has_more if reverse else cursor is not None):
+            self.previous_link = self.encode_cursor(rows[0], reverse=True)
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.next_link, 'previous': self.previous_link, 'results': data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+def parse_bool(request, name):
+    """
+    Read an optional true/false query parameter.
+
+    Returns:
+        bool or None: None when the parameter is absent.
+
+    Raises:
+        ValidationError: If the value is not a recognised boolean.
+    """
+    value = request.query_params.get(name)
+    if value is None:
+        return None
+    if value.lower() in TRUE_VALUES:
+        return True
+    if value.lower() in FALSE_VALUES:
+        return False
+    raise ValidationError({name: "Must be true or false."})
+
+
+def parse_int(request, name):
+    """
+    Read an optional integer query parameter.
+
+    Returns:
+        int or None: None when the parameter is absent.
+
+    Raises:
+        ValidationError: If the value is not an integer.
+    """
+    value = request.query_params.get(name)
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValidationError({name: "Must be an integer."})
+
+
+def paginated_response(request, queryset, serializer_class, ordering='pk', ordering_fields=(), context=None):
+    """
+    Serialize a listing, one cursor page at a time if the client asked for pages.
+
+    Args:
+        request (Request): The DRF request.
+        queryset (QuerySet): Rows to list, already filtered.
+        serializer_class: Serializer for one row.
+        ordering (str): Default ordering field, e.g. '-pk'.
+        ordering_fields (tuple): Fields the client may order by.
+        context (dict): Extra serializer context; the request is always included.
+
+    Returns:
+        Response: A list, or {"next", "previous", "results"}.
+    """
+    context = {'request': request, **(context or {})}
+    paginator = OptInCursorPagination(ordering=ordering, ordering_fields=ordering_fields)
+    page = paginator.paginate_queryset(queryset, request)
+    if page is None:
+        return Response(serializer_class(queryset, many=True, context=context).data)
+    return paginator.get_paginated_response(serializer_class(page, many=True, context=context).data)
@@ -0,0 +1,92 @@
+"""
+Sparse fieldsets for read endpoints.
+
+Serializers using SparseFieldsetsMixin honour two query parameters on GET requests, and on
+read-only POST lookups whose view sets 'sparse_fieldsets': True in the serializer context:
+
+- fields=id,first_name returns only the listed fields. Nested serializers take dotted
+  names, e.g. fields=id,class_name,students.first_name on a class; a nested field named
+  without a dot keeps all of its own fields.
+- expand=student replaces a related object's id with the nested representation declared in
+  the serializer's Meta.expandable_fields.
+
+Fields that are not returned are never computed, so an encrypted student field left out of
+fields is never decrypted. Without the parameters every serializer keeps its usual output.
+The request is read from the serializer context, so views must pass {'request': request}.
+"""
+
+from rest_framework.permissions import SAFE_METHODS
+
+
+def _query_list(request, name, force=False):
+    if request is None or (request.method not in SAFE_METHODS and not force):
+        return None
+    value = request.query_params.get(name)
+    if not value:
+        return None
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def _names_at(paths, prefix):
+    """
+    Top-level names among dotted paths under a prefix ('' for the root), or None when
+    nothing is listed under the prefix.
+    """
+    if prefix:
+        paths = [path[len(prefix) + 1:] for path in paths if path.startswith(prefix + '.')]
+    names = {path.split('.', 1)[0] for path in paths}
+    return names or None
+
+
+def requested_fields(request, prefix=''):
+    """
+    Return the set of fields the request asks for at a nesting prefix, or None for all.
+
+    Lets views skip work, such as prefetching, for fields that will not be returned.
+    """
+    paths = _query_list(request, 'fields')
+    return _names_at(paths, prefix) if paths else None
+
+
+class SparseFieldsetsMixin:
+    """
+    Serializer mixin applying the fields and expand query parameters (see the module
+    docstring).
+
+    Meta.expandable_fields maps a field name to (serializer class, keyword arguments) used
+    in its place when the field is expanded.
+    """
+
+    @property
+    def field_path(self):
+        """
+        Dotted path of this serializer from the root one, e.g. 'students'; '' at the root.
+        """
+        names, node = [], self
+        while node is not None:
+            if getattr(node, 'field_name', None):
+                names.append(node.field_name)
+            node = getattr(node, 'parent', None)
+        return '.'.join(reversed(names))
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        force = self.context.get('sparse_fieldsets', False)
+        path = self.field_path
+
+        expand = _query_list(request, 'expand', force)
+        if expand:
+            expandable = getattr(self.Meta, 'expandable_fields', {})
+            for name in _names_at(expand, path) or ():
+                if name in expandable and name in fields:
+                    serializer_class, kwargs = expandable[name]
+                    fields[name] = serializer_class(read_only=True, **kwargs)
+
+        paths = _query_list(request, 'fields', force)
+        if paths:
+            wanted = _names_at(paths, path)
+            if wanted is not None:
+                for name in set(fields) - wanted:
+                    fields.pop(name)
+        return fields